@@ -1,4 +1,5 @@
 import os
+from typing import Literal
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,6 +10,87 @@ class Settings(BaseSettings):
     database_url: str = os.getenv("DATABASE_URL", "sqlite:///./usage.db")
     gemini_api_key: str | None = None
     ai_provider: str = "gemini"
+    # Demo org seeding on startup: "off", "background" (serve traffic immediately) or "blocking"
+    demo_seed: str = "background"
+    # Serve large analytics payloads via orjson (skips response_model re-validation)
+    fast_json_responses: bool = True
+    compression_min_bytes: int = 1024
+    # Relative error bound of the per-day session-duration quantile sketches
+    sketch_relative_accuracy: float = 0.01
+    # Longest from/to span accepted by /analytics/retention and /analytics/cohorts
+    cohort_max_days: int = 366
+    # In-process scheduler (intervals in seconds; retention of 0 days keeps data forever)
+    scheduler_enabled: bool = True
+    scheduler_tick_seconds: float = 5.0
+    scheduler_jitter_seconds: float = 30.0
+    scheduler_lease_seconds: int = 900
+    scheduler_max_catchup_days: int = 31
+    rollup_interval_seconds: int = 900
+    prewarm_interval_seconds: int = 300
+    retention_interval_seconds: int = 86400
+    raw_retention_days: int = 0
+    hourly_retention_days: int = 0
+    # Per-plan admission limits: {plan_type: {scope: {org_rate, org_burst, user_rate, user_burst, concurrency}}}
+    # Rates are tokens/second; unknown plan types fall back to "standard"
+    plan_limits: dict[str, dict[str, dict[str, float]]] = {
+        "free": {
+            "ingest": {"org_rate": 20, "org_burst": 40, "user_rate": 5, "user_burst": 10, "concurrency": 4},
+            "ai": {"org_rate": 0.5, "org_burst": 3, "user_rate": 0.5, "user_burst": 3, "concurrency": 1},
+        },
+        "standard": {
+            "ingest": {"org_rate": 200, "org_burst": 400, "user_rate": 50, "user_burst": 100, "concurrency": 16},
+            "ai": {"org_rate": 2, "org_burst": 10, "user_rate": 1, "user_burst": 5, "concurrency": 4},
+        },
+        "enterprise": {
+            "ingest": {"org_rate": 2000, "org_burst": 4000, "user_rate": 200, "user_burst": 400, "concurrency": 64},
+            "ai": {"org_rate": 10, "org_burst": 30, "user_rate": 5, "user_burst": 15, "concurrency": 16},
+        },
+    }
+    plan_cache_seconds: int = 300
+    # Extra tenant shards {name: database_url}; the primary DATABASE_URL is shard "primary".
+    # Orgs are placed with app.utils.move_org and default to the primary.
+    shard_urls: dict[str, str] = {}
+    shard_map_cache_seconds: int = 60
+    # Promoted metadata keys: per-org cap, and how long after promotion the scheduler re-scans
+    # events past the key's watermark
+    max_promoted_keys: int = 20
+    promoted_key_catchup_seconds: int = 30
+    # Reader engines for dashboard GETs: {shard_name: replica_url}. With sqlite_read_replica a
+    # SQLite shard without a replica URL gets a read-only connection to its own file (WAL mode).
+    read_replica_urls: dict[str, str] = {}
+    sqlite_read_replica: bool = False
+    # After a write, the org's reads use the writer for this long (0 disables stickiness)
+    read_your_writes_seconds: float = 5.0
+    # How long a failed reader is skipped before it is tried again
+    reader_retry_seconds: float = 30.0
+    # /ai/anomalies detector. "isolation_forest" fits per org in a process pool off the request
+    # path; until an org's first fit lands, responses fall back to the z-score detector.
+    anomaly_detector: Literal["zscore", "isolation_forest"] = "zscore"
+    isolation_forest_workers: int = 2
+    isolation_forest_trees: int = 100
+    # Each refit adds trees fit on the current data; past the cap the forest is rebuilt
+    isolation_forest_max_trees: int = 300
+    # Refit once the sample count, or any metric's mean (in fit-time std units), moves this much
+    isolation_forest_refit_threshold: float = 0.1
+    # Anomaly score cut-off (0.5 is sklearn's "auto"; scores near 1 are clear outliers)
+    isolation_forest_score_threshold: float = 0.6
+    # Live dashboard stream (/analytics/stream): one producer thread per process polls each
+    # subscribed org's data version every STREAM_POLL_SECONDS and pushes deltas to subscribers
+    stream_poll_seconds: float = 2.0
+    stream_heartbeat_seconds: float = 15.0
+    # Frames buffered per subscriber; a client that falls further behind is resynced with a snapshot
+    stream_queue_size: int = 16
+    stream_anomaly_seconds: float = 30.0
+    stream_max_subscribers_per_org: int = 50
+    # Lifetime of the stream ticket that stands in for the JWT in the EventSource URL
+    stream_ticket_seconds: int = 60
+    # Streaming top-K (Space-Saving) summaries per org for /analytics/top: counters kept per
+    # org, dimension and hour, and how often each process merges its pending counts into the DB
+    topk_capacity: int = 64
+    topk_flush_seconds: int = 10
+    # Ingest flushes inline once this many summaries are pending, or once the oldest pending
+    # count is twice TOPK_FLUSH_SECONDS old (no scheduler, or a stalled flush job)
+    topk_max_pending: int = 10_000
 
     model_config = SettingsConfigDict(env_file=".env", case_sensitive=False)
 
@@ -1,15 +1,164 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, TypeVar
+from fastapi import HTTPException, Request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
 from sqlmodel import Session, SQLModel, create_engine
 from app.config import get_settings
+from app.models.tenant_shard import TenantShard
 
 settings = get_settings()
-connect_args = {"check_same_thread": False} if settings.database_url.startswith("sqlite") else {}
-engine = create_engine(settings.database_url, echo=False, connect_args=connect_args)
+logger = logging.getLogger(__name__)
+T = TypeVar("T")
+
+PRIMARY_SHARD = "primary"
+
+
+def _make_engine(url: str, **kwargs) -> Engine:
+    connect_args = {"check_same_thread": False} if url.startswith("sqlite") else {}
+    return create_engine(url, echo=False, connect_args=connect_args, **kwargs)
+
+
+def _enable_wal(dbapi_connection, _record) -> None:
+    dbapi_connection.execute("PRAGMA journal_mode=WAL")
+
+
+def _make_reader(name: str, writer: Engine) -> Engine | None:
+    url = settings.read_replica_urls.get(name)
+    if url:
+        return _make_engine(url, pool_pre_ping=True)
+    database = writer.url.database
+    if settings.sqlite_read_replica and writer.url.get_backend_name() == "sqlite" and database not in (None, "", ":memory:"):
+        # WAL lets the read-only connection read while the writer commits
+        event.listen(writer, "connect", _enable_wal)
+        return _make_engine(f"sqlite:///file:{database}?mode=ro&uri=true")
+    return None
+
+
+# The primary database is the control plane (organizations, users, features, the shard map,
+# scheduler leases) and also the default shard. Every shard carries the full schema plus
+# copies of its orgs' organization/user/feature rows so foreign keys hold.
+engine = _make_engine(settings.database_url)
+engines: dict[str, Engine] = {PRIMARY_SHARD: engine}
+engines.update({name: _make_engine(url) for name, url in settings.shard_urls.items() if name != PRIMARY_SHARD})
+# Optional per-shard reader engines for dashboard GETs, so heavy reads stay off the writer pool
+readers: dict[str, Engine] = {name: reader for name, writer in engines.items() if (reader := _make_reader(name, writer))}
+
+_shard_cache: dict[int, tuple[float, str]] = {}
+_shard_lock = threading.Lock()
+_recent_writes: dict[int, float] = {}
+_reader_down_until: dict[str, float] = {}
 
 
 def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+    for shard_engine in engines.values():
+        SQLModel.metadata.create_all(shard_engine)
+
+
+def shard_for_org(organization_id: int, use_cache: bool = True) -> str:
+    if len(engines) == 1:
+        return PRIMARY_SHARD
+    now = time.monotonic()
+    cached = _shard_cache.get(organization_id)
+    if use_cache and cached and now - cached[0] < settings.shard_map_cache_seconds:
+        return cached[1]
+    with Session(engine) as session:
+        row = session.get(TenantShard, organization_id)
+    shard = row.shard if row and row.shard in engines else PRIMARY_SHARD
+    with _shard_lock:
+        _shard_cache[organization_id] = (now, shard)
+    return shard
+
+
+def invalidate_shard_cache(organization_id: int | None = None) -> None:
+    with _shard_lock:
+        if organization_id is None:
+            _shard_cache.clear()
+        else:
+            _shard_cache.pop(organization_id, None)
+
+
+def session_for_org(organization_id: int) -> Session:
+    return Session(engines[shard_for_org(organization_id)])
+
+
+def fan_out(fn: Callable[[Session], T]) -> list[T]:
+    """Run ``fn`` against every shard in parallel; results come back in shard order."""
+
+    def run(shard_engine: Engine) -> T:
+        with Session(shard_engine) as session:
+            return fn(session)
+
+    if len(engines) == 1:
+        return [run(engine)]
+    with ThreadPoolExecutor(max_workers=len(engines), thread_name_prefix="shard") as pool:
+        return list(pool.map(run, engines.values()))
+
+
+def mark_written(organization_id: int) -> None:
+    """Pin the org's reads to the writer for READ_YOUR_WRITES_SECONDS (in this process)."""
+    if readers and settings.read_your_writes_seconds > 0:
+        _recent_writes[organization_id] = time.monotonic()
+
+
+def _read_engine(shard: str, organization_id: int | None) -> Engine:
+    reader = readers.get(shard)
+    now = time.monotonic()
+    if reader is None or now < _reader_down_until.get(shard, 0.0):
+        return engines[shard]
+    wrote_at = _recent_writes.get(organization_id) if organization_id is not None else None
+    if wrote_at is not None and now - wrote_at < settings.read_your_writes_seconds:
+        return engines[shard]
+    return reader
+
+
+def _token_org(request: Request) -> int | None:
+    from app.utils.jwt_utils import decode_token
+
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        return None
+    try:
+        return int(decode_token(token)["org"])
+    except (HTTPException, KeyError, TypeError, ValueError):
+        return None  # get_current_user rejects the request with the proper 401
+
+
+def read_session_for_org(organization_id: int) -> Session:
+    """Reader session for background work on an org's data (no per-request fallback)."""
+    return Session(_read_engine(shard_for_org(organization_id), organization_id))
+
+
+def get_session(request: Request):
+    """Session on the shard that owns the authenticated caller's organization."""
+    org_id = _token_org(request) if len(engines) > 1 else None
+    shard_engine = engines[shard_for_org(org_id)] if org_id is not None else engine
+    with Session(shard_engine) as session:
+        yield session
+
+
+def get_read_session(request: Request):
+    """Session on the org's reader, falling back to its writer when the reader is unavailable."""
+    org_id = _token_org(request) if len(engines) > 1 or readers else None
+    shard = shard_for_org(org_id) if org_id is not None else PRIMARY_SHARD
+    read_engine = _read_engine(shard, org_id)
+    session = Session(read_engine)
+    if read_engine is not engines[shard]:
+        try:
+            session.connection()
+        except DBAPIError:
+            logger.warning("Reader for shard %s unavailable; using the writer", shard, exc_info=True)
+            _reader_down_until[shard] = time.monotonic() + settings.reader_retry_seconds
+            session.close()
+            session = Session(engines[shard])
+    with session:
+        yield session
 
 
-def get_session():
+def get_primary_session():
     with Session(engine) as session:
         yield session
@@ -1,8 +1,14 @@
+import logging
+import threading
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from app.config import get_settings
 from app.db.session import init_db
-from app.utils.seed_data import ensure_demo_user
 from app.routes import auth_routes, usage_routes, analytics_routes, ai_routes
+from app.services import scheduler_service, stream_service, topk_service
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Enterprise Usage Monitoring & AI Admin")
 
@@ -15,10 +21,37 @@ app.add_middleware(
 )
 
 
+def _seed_then_schedule() -> None:
+    # Scheduler starts after seeding so its first rollup does not contend with the seed batch
+    from app.utils.seed_data import ensure_demo_user
+
+    try:
+        ensure_demo_user()
+    except Exception:
+        logger.exception("Demo seeding failed")
+    scheduler_service.start()
+
+
 @app.on_event("startup")
 def on_startup():
     init_db()
-    ensure_demo_user()
+    if settings.demo_seed == "blocking":
+        _seed_then_schedule()
+    elif settings.demo_seed == "background":
+        threading.Thread(target=_seed_then_schedule, name="demo-seed", daemon=True).start()
+    else:
+        scheduler_service.start()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    scheduler_service.stop()
+    stream_service.stop()
+    topk_service.flush(scheduler_service.OWNER)
+    if settings.anomaly_detector == "isolation_forest":
+        from app.services import anomaly_model_service
+
+        anomaly_model_service.shutdown()
 
 
 app.include_router(auth_routes.router)
@@ -0,0 +1,11 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class DataVersion(SQLModel, table=True):
+    # One row per org; bumped on ingest and aggregation so readers can cheaply detect change
+    organization_id: int = Field(foreign_key="organization.id", primary_key=True)
+    version: int = Field(default=0)
+    # Bumped when the org's promoted metadata keys change; ingest compares it with its cached key list
+    keys_version: int = Field(default=0)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
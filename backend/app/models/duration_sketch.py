@@ -0,0 +1,13 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import SQLModel, Field
+
+
+class DurationSketch(SQLModel, table=True):
+    # Companion to AggregatedUsage: one serialized DDSketch of session_duration per org+feature+day
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    feature_id: int = Field(foreign_key="feature.id", index=True)
+    aggregation_date: date = Field(index=True)
+    sketch: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
@@ -0,0 +1,35 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Index, UniqueConstraint
+from sqlmodel import SQLModel, Field
+
+
+class PromotedKey(SQLModel, table=True):
+    # Metadata keys an org admin chose to extract from UsageLog.metadata_json at ingest
+    __table_args__ = (UniqueConstraint("organization_id", "key"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    key: str
+    value_type: str = Field(default="string")  # string | number
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    # Largest UsageLog.id of the org when the key was promoted; the catch-up pass re-scans past it
+    watermark: int = Field(default=0)
+    caught_up_at: Optional[datetime] = None
+
+
+class EventMetadata(SQLModel, table=True):
+    # One typed row per (event, promoted key); timestamp is copied from the event so range
+    # filters and retention never touch UsageLog
+    __table_args__ = (
+        Index("ix_eventmetadata_str", "organization_id", "key", "value_str"),
+        Index("ix_eventmetadata_num", "organization_id", "key", "value_num"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id")
+    usage_log_id: int = Field(foreign_key="usagelog.id", index=True)
+    key: str
+    value_str: Optional[str] = None
+    value_num: Optional[float] = None
+    timestamp: datetime = Field(index=True)
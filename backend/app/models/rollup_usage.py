@@ -0,0 +1,29 @@
+from datetime import date, datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class _RollupBase(SQLModel):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    feature_id: int = Field(foreign_key="feature.id", index=True)
+    event_count: int = Field(default=0)
+    # Sums rather than averages so buckets can be merged exactly
+    session_duration_sum: float = Field(default=0.0)
+
+
+class HourlyUsage(_RollupBase, table=True):
+    bucket_start: datetime = Field(index=True)
+    active_users: int = Field(default=0)  # distinct users within the hour
+
+
+class WeeklyUsage(_RollupBase, table=True):
+    bucket_start: date = Field(index=True)  # ISO week start (Monday)
+    user_days: int = Field(default=0)  # sum of daily_active_users over the week
+    active_days: int = Field(default=0)
+
+
+class MonthlyUsage(_RollupBase, table=True):
+    bucket_start: date = Field(index=True)  # first day of the month
+    user_days: int = Field(default=0)
+    active_days: int = Field(default=0)
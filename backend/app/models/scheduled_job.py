@@ -0,0 +1,18 @@
+from datetime import datetime
+from typing import Optional
+from sqlmodel import SQLModel, Field
+
+
+class ScheduledJob(SQLModel, table=True):
+    # Doubles as the leader lease (owner + lease_expires_at) and the job status record
+    name: str = Field(primary_key=True)
+    owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    next_run_at: datetime = Field(default_factory=datetime.utcnow)
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_status: Optional[str] = None  # ok | error
+    last_result: Optional[str] = None
+    run_count: int = Field(default=0)
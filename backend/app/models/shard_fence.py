@@ -0,0 +1,10 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class ShardFence(SQLModel, table=True):
+    # Written on the source shard when an org moves away; ingest that still routes here
+    # (stale shard-map cache) is refused instead of landing on rows about to be deleted
+    organization_id: int = Field(primary_key=True)
+    moved_to: str
+    fenced_at: datetime = Field(default_factory=datetime.utcnow)
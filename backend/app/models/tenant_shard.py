@@ -0,0 +1,9 @@
+from datetime import datetime
+from sqlmodel import SQLModel, Field
+
+
+class TenantShard(SQLModel, table=True):
+    # Lives on the primary database only; orgs without a row are stored on the primary
+    organization_id: int = Field(primary_key=True)
+    shard: str
+    moved_at: datetime = Field(default_factory=datetime.utcnow)
@@ -0,0 +1,15 @@
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import SQLModel, Field
+
+
+class TopKSummary(SQLModel, table=True):
+    # Serialized SpaceSaving summary per org+dimension+hour. source is the ingesting process
+    # (host:pid) for streamed counts, or "rollup" for exact counts rebuilt by aggregate_daily
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    dimension: str = Field(index=True)  # "features" | "users" | "event_types"
+    bucket_start: datetime = Field(index=True)
+    source: str
+    summary: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
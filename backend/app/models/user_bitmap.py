@@ -0,0 +1,25 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import Column, LargeBinary
+from sqlmodel import SQLModel, Field
+
+
+class UserBitmap(SQLModel, table=True):
+    # Serialized RoaringBitmap of the user ids active per org+feature+day; feature_id NULL is the org-wide row
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    feature_id: Optional[int] = Field(default=None, foreign_key="feature.id", index=True)
+    bitmap_date: date = Field(index=True)
+    user_count: int = Field(default=0)
+    users: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
+
+
+class SeenBitmap(SQLModel, table=True):
+    # Running union of UserBitmap rows: every user seen per org(+feature) on any day before
+    # ``seen_before`` (a month start), so first-seen checks read one row plus at most a month of days
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    feature_id: Optional[int] = Field(default=None, foreign_key="feature.id", index=True)
+    seen_before: date = Field(index=True)
+    user_count: int = Field(default=0)
+    users: bytes = Field(sa_column=Column(LargeBinary, nullable=False))
@@ -0,0 +1,14 @@
+from datetime import date
+from typing import Optional
+from sqlalchemy import Column, JSON
+from sqlmodel import SQLModel, Field
+
+
+class UserDailyUsage(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    organization_id: int = Field(foreign_key="organization.id", index=True)
+    user_id: int = Field(foreign_key="user.id", index=True)
+    usage_date: date = Field(index=True)
+    event_count: int = Field(default=0)
+    session_duration_sum: float = Field(default=0.0)
+    event_type_counts: dict = Field(default_factory=dict, sa_column=Column(JSON))
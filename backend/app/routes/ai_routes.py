@@ -1,22 +1,48 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlmodel import Session
-from app.db.session import get_session
+from app.config import get_settings
+from app.db.session import get_read_session
 from app.schemas.analytics_schema import AnomalyResponse, InsightResponse, ChartDataResponse
-from app.services import auth_service, ai_service
+from app.services import auth_service, rate_limit_service, version_service
+from app.utils import fast_json
 
+settings = get_settings()
 router = APIRouter(prefix="/ai", tags=["ai"])
 
 
+def _ai_service():
+    # Deferred so numpy/dask are only imported when an AI endpoint is first hit
+    from app.services import ai_service
+    return ai_service
+
+
 @router.get("/anomalies", response_model=list[AnomalyResponse])
-def anomalies(session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
-    return ai_service.detect_anomalies(session, current_user.organization_id)
+def anomalies(
+    _admit=Depends(rate_limit_service.admit("ai")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    return _ai_service().detect_anomalies(session, current_user.organization_id)
 
 
 @router.get("/usage-insights", response_model=InsightResponse)
-def insights(session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
-    return ai_service.generate_insights(session, current_user.organization_id)
+def insights(
+    _admit=Depends(rate_limit_service.admit("ai")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    return _ai_service().generate_insights(session, current_user.organization_id)
 
 
 @router.get("/chart-data", response_model=ChartDataResponse)
-def chart_data(session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
-    return ai_service.get_chart_data(session, current_user.organization_id)
+def chart_data(
+    request: Request,
+    _etag: str = Depends(version_service.etag_guard),
+    _admit=Depends(rate_limit_service.admit("ai")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    if settings.fast_json_responses:
+        payload = _ai_service().get_chart_payload(session, current_user.organization_id)
+        return fast_json.json_response(request, payload, headers=version_service.etag_headers(_etag))
+    return _ai_service().get_chart_data(session, current_user.organization_id)
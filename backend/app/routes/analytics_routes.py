@@ -1,31 +1,255 @@
-from datetime import date
-from fastapi import APIRouter, Depends
+import csv
+import io
+from datetime import date, datetime, timedelta
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
 from sqlmodel import Session
-from app.db.session import get_session
-from app.schemas.analytics_schema import UsageSummary, FeatureUsage, UserActivity
-from app.services import auth_service, analytics_service, aggregation_service
+from app.config import get_settings
+from app.db.session import fan_out, get_primary_session, get_read_session, get_session
+from app.schemas.analytics_schema import (
+    AdmissionCounters, DashboardResponse, UsageSummary, FeatureUsage, FeatureUsageBucket, Granularity, JobStatus, MetadataUsage,
+    PromotedKeyCreate, PromotedKeyRead, RetentionMatrix, SessionPercentiles, StreamTicket, TopResponse, UserActivity,
+)
+from app.services import auth_service, analytics_service, aggregation_service, cohort_service, dashboard_service, metadata_service, rate_limit_service, scheduler_service, stream_service, topk_service, version_service
+from app.utils import fast_json
 
+settings = get_settings()
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
 
+def _default_range(start: datetime | None, end: datetime | None) -> tuple[datetime, datetime]:
+    # Offsets in from/to are converted so they compare with the naive UTC defaults and columns
+    end = analytics_service._naive_utc(end) if end else datetime.utcnow()
+    start = analytics_service._naive_utc(start) if start else end - timedelta(days=30)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must be before 'to'")
+    return start, end
+
+
+def _default_dates(start: date | None, end: date | None, days: int = 30) -> tuple[date, date]:
+    end = end or date.today() + timedelta(days=1)
+    start = start or end - timedelta(days=days)
+    if start >= end:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="'from' must be before 'to'")
+    return start, end
+
+
 @router.get("/usage-summary", response_model=UsageSummary)
-def usage_summary(session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
+def usage_summary(
+    _etag: str = Depends(version_service.etag_guard),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
     return analytics_service.get_usage_summary(session, current_user.organization_id)
 
 
-@router.get("/feature-usage", response_model=list[FeatureUsage])
-def feature_usage(session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
-    return analytics_service.get_feature_usage(session, current_user.organization_id)
+@router.get("/feature-usage", response_model=list[FeatureUsage] | list[FeatureUsageBucket])
+def feature_usage(
+    request: Request,
+    granularity: Granularity | None = None,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    _etag: str = Depends(version_service.etag_guard_for("hour")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    org_id = current_user.organization_id
+    if granularity is None and start is None and end is None:
+        if settings.fast_json_responses:
+            rows = analytics_service.get_feature_usage_rows(session, org_id)
+            return fast_json.json_response(request, rows, headers=version_service.etag_headers(_etag))
+        return analytics_service.get_feature_usage(session, org_id)
+
+    start, end = _default_range(start, end)
+    rows = analytics_service.get_feature_usage_range_rows(session, org_id, start, end, granularity)
+    if settings.fast_json_responses:
+        return fast_json.json_response(request, rows, headers=version_service.etag_headers(_etag))
+    return [FeatureUsageBucket(**r) for r in rows] if granularity else [FeatureUsage(**r) for r in rows]
+
+
+@router.get("/dashboard", response_model=DashboardResponse, response_model_exclude_none=True)
+def dashboard(
+    request: Request,
+    panels: list[str] = Query(["summary", "feature_usage"], description="Panels to build, repeated or comma-separated"),
+    days: int = Query(30, ge=1, le=365, description="Window for the user_activity panel"),
+    window: Literal["hour", "day", "week"] = Query("day", description="Window for the top panel"),
+    _etag: str = Depends(version_service.etag_guard_for("hour")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    """Several dashboard panels in one round trip, built concurrently from one shared snapshot."""
+    requested = dashboard_service.parse_panels(panels)
+    org_id = current_user.organization_id
+    if any(p in dashboard_service.AI_PANELS for p in requested):
+        # One AI admission covers every AI panel of the request
+        with rate_limit_service.admitted("ai", session, current_user):
+            payload = dashboard_service.build_dashboard(session, org_id, requested, days, window)
+    else:
+        payload = dashboard_service.build_dashboard(session, org_id, requested, days, window)
+    if settings.fast_json_responses:
+        return fast_json.json_response(request, payload, headers=version_service.etag_headers(_etag))
+    return payload
+
+
+@router.get("/session-percentiles", response_model=list[SessionPercentiles])
+def session_percentiles(
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    _etag: str = Depends(version_service.etag_guard_for("day")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    start, end = _default_dates(start, end)
+    return analytics_service.get_session_percentiles(session, current_user.organization_id, start, end)
+
+
+def _cohort_range(start: date | None, end: date | None) -> tuple[date, date]:
+    start, end = _default_dates(start, end)
+    if (end - start).days > settings.cohort_max_days:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Range is limited to {settings.cohort_max_days} days")
+    return start, end
+
+
+@router.get("/retention", response_model=RetentionMatrix)
+def retention(
+    period: Literal["day", "week"] = "day",
+    feature_id: int | None = None,
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    _etag: str = Depends(version_service.etag_guard_for("day")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    """Returning-user retention: for each period's active users, how many were active k periods later."""
+    start, end = _cohort_range(start, end)
+    return cohort_service.get_retention(session, current_user.organization_id, start, end, period, feature_id)
+
+
+@router.get("/cohorts", response_model=RetentionMatrix)
+def cohorts(
+    period: Literal["day", "week"] = "day",
+    feature_id: int | None = None,
+    start: date | None = Query(None, alias="from"),
+    end: date | None = Query(None, alias="to"),
+    _etag: str = Depends(version_service.etag_guard_for("day")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    """Acquisition cohorts: users first seen in each period (org-wide or on ``feature_id``) and their retention."""
+    start, end = _cohort_range(start, end)
+    return cohort_service.get_cohorts(session, current_user.organization_id, start, end, period, feature_id)
+
+
+@router.get("/top", response_model=TopResponse)
+def top(
+    window: Literal["hour", "day", "week"] = "day",
+    k: int = Query(10, ge=1, le=settings.topk_capacity),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    """Heaviest features, users and event types over the window, from the streaming top-K summaries."""
+    return topk_service.get_top(session, current_user.organization_id, window, k)
 
 
 @router.get("/user-activity", response_model=list[UserActivity])
-def user_activity(days: int = 30, session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
+def user_activity(
+    days: int = 30,
+    _etag: str = Depends(version_service.etag_guard_for("day")),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
     return analytics_service.get_user_activity(session, current_user.organization_id, days)
 
 
+@router.get("/metadata-usage", response_model=list[MetadataUsage])
+def metadata_usage(
+    group_by: str,
+    meta: list[str] = Query([], description="Promoted-key filter as key:value; repeat to AND several"),
+    feature_id: int | None = None,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    start, end = _default_range(start, end)
+    return analytics_service.get_metadata_usage(session, current_user.organization_id, group_by, meta, start, end, feature_id)
+
+
+@router.get("/export")
+def export(
+    meta: list[str] = Query([], description="Promoted-key filter as key:value; repeat to AND several"),
+    feature_id: int | None = None,
+    start: datetime | None = Query(None, alias="from"),
+    end: datetime | None = Query(None, alias="to"),
+    limit: int = Query(10000, ge=1, le=100000),
+    session: Session = Depends(get_read_session),
+    current_user=Depends(auth_service.get_current_user),
+):
+    start, end = _default_range(start, end)
+    columns, rows = analytics_service.export_events(session, current_user.organization_id, meta, start, end, feature_id, limit)
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    writer.writerows(rows)
+    return Response(buf.getvalue(), media_type="text/csv", headers={"Content-Disposition": 'attachment; filename="usage_events.csv"'})
+
+
+@router.get("/metadata-keys", response_model=list[PromotedKeyRead])
+def metadata_keys(session: Session = Depends(get_read_session), current_user=Depends(auth_service.get_current_user)):
+    return metadata_service.list_keys(session, current_user.organization_id)
+
+
+@router.post("/metadata-keys", response_model=PromotedKeyRead)
+def promote_metadata_key(payload: PromotedKeyCreate, session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can promote metadata keys")
+    promoted, backfilled = metadata_service.register_key(session, current_user.organization_id, payload.key, payload.value_type)
+    return PromotedKeyRead(key=promoted.key, value_type=promoted.value_type, created_at=promoted.created_at, backfilled=backfilled)
+
+
+@router.delete("/metadata-keys/{key}")
+def demote_metadata_key(key: str, session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can remove metadata keys")
+    metadata_service.delete_key(session, current_user.organization_id, key)
+    return {"deleted": key}
+
+
 @router.post("/aggregate/run")
-def aggregate(target: date | None = None, session: Session = Depends(get_session), current_user=Depends(auth_service.get_current_user)):
+def aggregate(target: date | None = None, current_user=Depends(auth_service.get_current_user)):
     if current_user.role != "admin":
         return {"message": "Only admins can trigger aggregation"}
-    count = aggregation_service.aggregate_daily(session, target)
+    count = sum(fan_out(lambda shard_session: aggregation_service.aggregate_daily(shard_session, target)))
     return {"aggregated": count}
+
+
+@router.get("/jobs", response_model=list[JobStatus])
+def jobs(session: Session = Depends(get_primary_session), current_user=Depends(auth_service.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can view scheduled jobs")
+    return scheduler_service.get_job_statuses(session)
+
+
+@router.get("/admission", response_model=list[AdmissionCounters])
+def admission(current_user=Depends(auth_service.get_current_user)):
+    if current_user.role != "admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Only admins can view admission counters")
+    return rate_limit_service.get_counters()
+
+
+@router.post("/stream/ticket", response_model=StreamTicket)
+def stream_ticket(current_user=Depends(auth_service.get_current_user)):
+    """Short-lived ticket for ``GET /stream?ticket=``, so the access token never goes in a URL."""
+    return StreamTicket(ticket=auth_service.issue_stream_ticket(current_user), expires_in=settings.stream_ticket_seconds)
+
+
+@router.get("/stream")
+async def stream(request: Request, current_user=Depends(auth_service.get_stream_user)):
+    """Server-sent events: a ``snapshot`` frame, then ``delta`` frames whenever the org's data changes."""
+    sub = stream_service.subscribe(current_user.organization_id)
+    return StreamingResponse(
+        stream_service.frames(sub, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
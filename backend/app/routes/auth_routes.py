@@ -1,7 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlmodel import Session
-from app.db.session import get_session
+from app.db.session import get_primary_session
 from app.schemas.auth_schema import UserCreate, UserRead, Token
 from app.services import auth_service
 
@@ -9,13 +9,13 @@ router = APIRouter(prefix="/auth", tags=["auth"])
 
 
 @router.post("/register", response_model=UserRead)
-def register(payload: UserCreate, session: Session = Depends(get_session)):
+def register(payload: UserCreate, session: Session = Depends(get_primary_session)):
     user = auth_service.create_user(payload, session)
     return UserRead.from_orm(user)
 
 
 @router.post("/login", response_model=Token)
-def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_session)):
+def login(form_data: OAuth2PasswordRequestForm = Depends(), session: Session = Depends(get_primary_session)):
     token = auth_service.authenticate(form_data.username, form_data.password, session)
     return Token(access_token=token)
 
@@ -1,5 +1,8 @@
-from typing import List, Optional
-from pydantic import BaseModel
+from datetime import date, datetime
+from typing import List, Literal, Optional
+from pydantic import BaseModel, ConfigDict
+
+Granularity = Literal["hourly", "daily", "weekly", "monthly"]
 
 
 class UsageSummary(BaseModel):
@@ -16,11 +19,112 @@ class FeatureUsage(BaseModel):
     avg_session_duration: float
 
 
+class FeatureUsageBucket(BaseModel):
+    feature_id: int
+    feature_name: Optional[str] = None
+    bucket_start: datetime
+    event_count: int
+    active_users: int  # distinct users for hourly buckets, average DAU for daily and coarser
+    avg_session_duration: float
+
+
+class SessionPercentiles(BaseModel):
+    feature_id: int
+    feature_name: Optional[str] = None
+    event_count: int
+    p50: float
+    p95: float
+    p99: float
+
+
+class RetentionRow(BaseModel):
+    cohort_start: date
+    cohort_size: int
+    retained: List[int]  # cohort members active k periods after cohort_start; retained[0] is the cohort
+    rates: List[float]
+
+
+class RetentionMatrix(BaseModel):
+    basis: Literal["active", "new"]  # cohort = users active in the period, or first seen in it
+    period: Literal["day", "week"]
+    feature_id: Optional[int] = None
+    cohorts: List[RetentionRow]
+    average: List[float]  # cohort-size-weighted rate per offset
+
+
+class TopItem(BaseModel):
+    key: int | str  # feature id, user id or event type
+    name: Optional[str] = None
+    count: int  # upper bound; count - error is a lower bound
+    error: int
+
+
+class TopResponse(BaseModel):
+    window: Literal["hour", "day", "week"]
+    since: datetime
+    features: List[TopItem]
+    users: List[TopItem]
+    event_types: List[TopItem]
+
+
 class UserActivity(BaseModel):
     user_id: int
     email: Optional[str] = None
     event_count: int
     avg_session_duration: float
+    event_types: dict[str, int] = {}
+
+
+class PromotedKeyCreate(BaseModel):
+    key: str
+    value_type: Literal["string", "number"] = "string"
+
+
+class PromotedKeyRead(BaseModel):
+    key: str
+    value_type: str
+    created_at: datetime
+    backfilled: int = 0  # events extracted when the key was (re-)registered
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class MetadataUsage(BaseModel):
+    value: str | float | None
+    event_count: int
+    active_users: int
+    avg_session_duration: float
+
+
+class StreamTicket(BaseModel):
+    ticket: str
+    expires_in: int
+
+
+class JobStatus(BaseModel):
+    name: str
+    owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    next_run_at: datetime
+    last_started_at: Optional[datetime] = None
+    last_finished_at: Optional[datetime] = None
+    last_success_at: Optional[datetime] = None
+    last_duration_ms: Optional[float] = None
+    last_status: Optional[str] = None
+    last_result: Optional[str] = None
+    run_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class AdmissionCounters(BaseModel):
+    scope: str
+    organization_id: int
+    in_flight: int
+    admitted: int
+    rejected_rate: int
+    rejected_concurrency: int
+    peak_in_flight: int
 
 
 class AnomalyResponse(BaseModel):
@@ -70,3 +174,20 @@ class ChartDataResponse(BaseModel):
     std_session: float
     mean_dau: float
     std_dau: float
+
+
+class DashboardPanels(BaseModel):
+    summary: Optional[UsageSummary] = None
+    feature_usage: Optional[List[FeatureUsage]] = None
+    user_activity: Optional[List[UserActivity]] = None
+    top: Optional[TopResponse] = None
+    anomalies: Optional[List[AnomalyResponse]] = None
+    insights: Optional[InsightResponse] = None
+    chart_data: Optional[ChartDataResponse] = None
+
+
+class DashboardResponse(BaseModel):
+    version: int
+    panels: DashboardPanels
+    timings_ms: dict[str, float]  # "shared" setup, one entry per panel, and "total"
+    errors: dict[str, str] = {}
@@ -1,27 +1,57 @@
-from collections import defaultdict
-from datetime import date
-from sqlmodel import Session, select
+from datetime import date, datetime, timedelta
+from sqlalchemy import delete
+from sqlmodel import Session, select, func
 from app.models.usage_log import UsageLog
 from app.models.aggregated_usage import AggregatedUsage
+from app.models.rollup_usage import HourlyUsage, WeeklyUsage, MonthlyUsage
+from app.models.duration_sketch import DurationSketch
+from app.models.user_daily_usage import UserDailyUsage
+from app.models.user_bitmap import SeenBitmap, UserBitmap
+from app.config import get_settings
+from app.services import topk_service
+from app.services.version_service import bump_data_version
+from app.utils.bitmap import RoaringBitmap
+from app.utils.ddsketch import DDSketch
+from app.utils.topk import SpaceSaving
+from app.utils.time_buckets import as_datetime, floor_bucket, next_bucket
+
+settings = get_settings()
+
+
+# Raw events are read column-wise (no ORM objects); user_id NULL is folded to 0 = anonymous
+_RAW_DTYPES = {
+    "organization_id": "i8", "feature_id": "i8", "user_id": "i8",
+    "session_duration": "f8", "event_type": "O", "timestamp": "M8[us]",
+}
 
 
 def aggregate_daily(session: Session, target_date: date | None = None) -> int:
+    import numpy as np
+    from app.utils.columnar import count_distinct, group_by, load_columns
+
     target = target_date or date.today()
     start_ts = date.fromordinal(target.toordinal())
     end_ts = date.fromordinal(target.toordinal() + 1)
 
-    query = select(UsageLog).where(UsageLog.timestamp >= start_ts).where(UsageLog.timestamp < end_ts)
-    rows = session.exec(query).all()
+    query = (
+        select(
+            UsageLog.organization_id, UsageLog.feature_id, func.coalesce(UsageLog.user_id, 0),
+            UsageLog.session_duration, UsageLog.event_type, UsageLog.timestamp,
+        )
+        .where(UsageLog.timestamp >= start_ts)
+        .where(UsageLog.timestamp < end_ts)
+    )
+    cols = load_columns(session, query, _RAW_DTYPES)
 
-    bucket: dict[tuple[int, int], list[UsageLog]] = defaultdict(list)
-    for row in rows:
-        bucket[(row.organization_id, row.feature_id)].append(row)
+    keys, groups = group_by(cols["organization_id"], cols["feature_id"])
+    n = len(keys)
+    event_counts = np.bincount(groups, minlength=n)
+    duration_sums = np.bincount(groups, weights=cols["session_duration"], minlength=n)
+    daus = count_distinct(groups, cols["user_id"], n, mask=cols["user_id"] > 0)
 
     written = 0
-    for (org_id, feature_id), events in bucket.items():
-        daus = len({e.user_id for e in events if e.user_id})
-        event_count = len(events)
-        avg_duration = sum(e.session_duration for e in events) / max(event_count, 1)
+    for (org_id, feature_id), event_count, duration_sum, dau in zip(keys.tolist(), event_counts.tolist(), duration_sums.tolist(), daus.tolist()):
+        avg_duration = duration_sum / max(event_count, 1)
 
         existing = session.exec(
             select(AggregatedUsage)
@@ -31,7 +61,7 @@ def aggregate_daily(session: Session, target_date: date | None = None) -> int:
         ).first()
 
         if existing:
-            existing.daily_active_users = daus
+            existing.daily_active_users = dau
             existing.event_count = event_count
             existing.avg_session_duration = avg_duration
             record = existing
@@ -40,12 +70,244 @@ def aggregate_daily(session: Session, target_date: date | None = None) -> int:
                 organization_id=org_id,
                 feature_id=feature_id,
                 aggregation_date=target,
-                daily_active_users=daus,
+                daily_active_users=dau,
                 event_count=event_count,
                 avg_session_duration=avg_duration,
             )
             session.add(record)
         written += 1
 
+    _write_hourly(session, cols, as_datetime(start_ts), as_datetime(end_ts))
+    _write_sketches(session, cols, keys, groups, target)
+    _write_user_daily(session, cols, target)
+    _write_seen(session, _write_bitmaps(session, cols, target), target)
+    _write_topk(session, cols, as_datetime(start_ts), as_datetime(end_ts))
+    session.flush()
+    _rollup_period(session, WeeklyUsage, "weekly", target)
+    _rollup_period(session, MonthlyUsage, "monthly", target)
+
+    for org_id in set(keys[:, 0].tolist()):
+        bump_data_version(session, org_id)
     session.commit()
     return written
+
+
+def aggregate_range(session: Session, start: date, end: date) -> int:
+    """Run the daily pipeline for every day in [start, end]; used for backfills and seeding."""
+    written = 0
+    day = start
+    while day <= end:
+        written += aggregate_daily(session, day)
+        day += timedelta(days=1)
+    return written
+
+
+def _write_hourly(session: Session, cols: dict, start, end) -> None:
+    # Distinct users are not additive, so hourly rows come from the same raw pass as the daily grain
+    import numpy as np
+    from app.utils.columnar import count_distinct, group_by
+
+    hours = cols["timestamp"].astype("M8[h]").astype(np.int64)
+    keys, groups = group_by(cols["organization_id"], cols["feature_id"], hours)
+    n = len(keys)
+    event_counts = np.bincount(groups, minlength=n).tolist()
+    duration_sums = np.bincount(groups, weights=cols["session_duration"], minlength=n).tolist()
+    active_users = count_distinct(groups, cols["user_id"], n, mask=cols["user_id"] > 0).tolist()
+    hour_starts = keys[:, 2].astype("M8[h]").astype("M8[us]").astype(object).tolist()
+
+    session.execute(delete(HourlyUsage).where(HourlyUsage.bucket_start >= start).where(HourlyUsage.bucket_start < end))
+    session.add_all([
+        HourlyUsage(
+            organization_id=org_id,
+            feature_id=feature_id,
+            bucket_start=hour,
+            active_users=users,
+            event_count=events,
+            session_duration_sum=duration_sum,
+        )
+        for (org_id, feature_id, _), hour, users, events, duration_sum in zip(
+            keys.tolist(), hour_starts, active_users, event_counts, duration_sums
+        )
+    ])
+
+
+def _write_sketches(session: Session, cols: dict, keys, groups, target: date) -> None:
+    from app.utils.columnar import split_by_group
+
+    session.execute(delete(DurationSketch).where(DurationSketch.aggregation_date == target))
+    session.add_all([
+        DurationSketch(
+            organization_id=org_id,
+            feature_id=feature_id,
+            aggregation_date=target,
+            sketch=DDSketch(settings.sketch_relative_accuracy).add_many(durations).to_bytes(),
+        )
+        for (org_id, feature_id), durations in zip(keys.tolist(), split_by_group(cols["session_duration"], groups, len(keys)))
+    ])
+
+
+def _write_user_daily(session: Session, cols: dict, target: date) -> None:
+    import numpy as np
+    from app.utils.columnar import group_by
+
+    known = cols["user_id"] > 0
+    user_ids = cols["user_id"][known]
+    type_names, type_codes = np.unique(cols["event_type"][known].astype(str), return_inverse=True)
+    keys, groups = group_by(cols["organization_id"][known], user_ids)
+    n = len(keys)
+    event_counts = np.bincount(groups, minlength=n).tolist()
+    duration_sums = np.bincount(groups, weights=cols["session_duration"][known], minlength=n).tolist()
+    type_keys, type_groups = group_by(groups, type_codes.reshape(-1))
+    type_counts: list[dict[str, int]] = [{} for _ in range(n)]
+    for (group, code), cnt in zip(type_keys.tolist(), np.bincount(type_groups, minlength=len(type_keys)).tolist()):
+        type_counts[group][str(type_names[code])] = cnt
+
+    session.execute(delete(UserDailyUsage).where(UserDailyUsage.usage_date == target))
+    session.add_all([
+        UserDailyUsage(
+            organization_id=org_id,
+            user_id=user_id,
+            usage_date=target,
+            event_count=events,
+            session_duration_sum=duration_sum,
+            event_type_counts=counts,
+        )
+        for (org_id, user_id), events, duration_sum, counts in zip(keys.tolist(), event_counts, duration_sums, type_counts)
+    ])
+
+
+def _write_bitmaps(session: Session, cols: dict, target: date) -> dict[tuple[int, int | None], RoaringBitmap]:
+    # Who was active, per org-day and per org-feature-day: retention and cohorts are set algebra over these
+    from app.utils.columnar import group_by, split_by_group
+
+    known = cols["user_id"] > 0
+    org_ids, feature_ids, user_ids = cols["organization_id"][known], cols["feature_id"][known], cols["user_id"][known]
+    bitmaps: dict[tuple[int, int | None], RoaringBitmap] = {}
+    for by_feature in (False, True):
+        keys, groups = group_by(org_ids, feature_ids) if by_feature else group_by(org_ids)
+        for key, ids in zip(keys.tolist(), split_by_group(user_ids, groups, len(keys))):
+            bitmaps[(key[0], key[1] if by_feature else None)] = RoaringBitmap.from_ids(ids)
+
+    session.execute(delete(UserBitmap).where(UserBitmap.bitmap_date == target))
+    session.add_all([
+        UserBitmap(
+            organization_id=org_id, feature_id=feature_id, bitmap_date=target,
+            user_count=len(bitmap), users=bitmap.to_bytes(),
+        )
+        for (org_id, feature_id), bitmap in bitmaps.items()
+    ])
+    return bitmaps
+
+
+def _write_seen(session: Session, bitmaps: dict[tuple[int, int | None], RoaringBitmap], target: date) -> None:
+    """Keep the monthly SeenBitmap checkpoints equal to the union of every day before them.
+
+    The day's bitmaps are OR-ed into later checkpoints (a backfill or late re-run), and the
+    checkpoint for the target's month is built from the previous one plus the days between.
+    """
+    month = target.replace(day=1)
+    org_ids = sorted({org_id for org_id, _ in bitmaps})
+    checkpoints = session.exec(select(SeenBitmap).where(SeenBitmap.organization_id.in_(org_ids))).all()  # type: ignore
+    for row in checkpoints:
+        day = bitmaps.get((row.organization_id, row.feature_id))
+        if row.seen_before > target and day is not None:
+            seen = RoaringBitmap.from_bytes(row.users) | day
+            row.users, row.user_count = seen.to_bytes(), len(seen)
+
+    have = {(row.organization_id, row.feature_id) for row in checkpoints if row.seen_before == month}
+    history = session.exec(
+        select(UserBitmap.organization_id, UserBitmap.feature_id)
+        .where(UserBitmap.organization_id.in_(org_ids))  # type: ignore
+        .where(UserBitmap.bitmap_date < month)
+        .distinct()
+    ).all()
+    for org_id, feature_id in history:
+        if (org_id, feature_id) in have:
+            continue
+        previous = max(
+            (row for row in checkpoints
+             if (row.organization_id, row.feature_id) == (org_id, feature_id) and row.seen_before < month),
+            key=lambda row: row.seen_before,
+            default=None,
+        )
+        days = select(UserBitmap.users).where(UserBitmap.organization_id == org_id).where(UserBitmap.bitmap_date < month)
+        days = days.where(UserBitmap.feature_id == feature_id if feature_id is not None else UserBitmap.feature_id.is_(None))  # type: ignore
+        parts = []
+        if previous is not None:
+            days = days.where(UserBitmap.bitmap_date >= previous.seen_before)
+            parts.append(RoaringBitmap.from_bytes(previous.users))
+        parts.extend(RoaringBitmap.from_bytes(blob) for blob in session.exec(days).all())
+        seen = RoaringBitmap.union(parts)
+        session.add(SeenBitmap(
+            organization_id=org_id, feature_id=feature_id, seen_before=month,
+            user_count=len(seen), users=seen.to_bytes(),
+        ))
+
+
+def _write_topk(session: Session, cols: dict, start: datetime, end: datetime) -> None:
+    # Exact per-hour heavy hitters for the hours that have closed; they replace the streamed summaries
+    import numpy as np
+    from app.utils.columnar import group_by
+
+    end = min(end, floor_bucket(datetime.utcnow(), "hourly"))
+    if end <= start:
+        return
+    in_range = cols["timestamp"] < np.datetime64(end, "us")
+    hours = cols["timestamp"][in_range].astype("M8[h]")
+    org_ids = cols["organization_id"][in_range]
+    type_names, type_codes = np.unique(cols["event_type"][in_range].astype(str), return_inverse=True)
+    user_ids = cols["user_id"][in_range]
+    # (dimension, values, row mask, code -> name lookup)
+    dimensions = (
+        ("features", cols["feature_id"][in_range], None, None),
+        ("users", user_ids, user_ids > 0, None),
+        ("event_types", type_codes.reshape(-1), None, type_names),
+    )
+
+    summaries: dict[tuple[int, str, datetime], SpaceSaving] = {}
+    for dimension, values, mask, names in dimensions:
+        o, h, v = (org_ids, hours, values) if mask is None else (org_ids[mask], hours[mask], values[mask])
+        keys, groups = group_by(o, h.astype(np.int64), v)
+        counts = np.bincount(groups, minlength=len(keys)).tolist()
+        per_hour: dict[tuple[int, int], tuple[list, list]] = {}
+        for (org_id, hour, value), cnt in zip(keys.tolist(), counts):
+            items, item_counts = per_hour.setdefault((org_id, hour), ([], []))
+            items.append(value if names is None else str(names[value]))
+            item_counts.append(cnt)
+        for (org_id, hour), (items, item_counts) in per_hour.items():
+            bucket = datetime(1970, 1, 1) + timedelta(hours=hour)
+            summaries[(org_id, dimension, bucket)] = SpaceSaving.from_counts(items, item_counts, settings.topk_capacity)
+    topk_service.write_rollup(session, summaries, start, end)
+
+
+def _rollup_period(session: Session, model, grain: str, day: date) -> None:
+    """Rebuild the weekly/monthly bucket containing ``day`` from the daily rollup."""
+    period_start = floor_bucket(as_datetime(day), grain).date()
+    period_end = next_bucket(as_datetime(period_start), grain).date()
+    rows = session.exec(
+        select(
+            AggregatedUsage.organization_id,
+            AggregatedUsage.feature_id,
+            func.sum(AggregatedUsage.event_count),
+            func.sum(AggregatedUsage.avg_session_duration * AggregatedUsage.event_count),
+            func.sum(AggregatedUsage.daily_active_users),
+            func.count(AggregatedUsage.id),
+        )
+        .where(AggregatedUsage.aggregation_date >= period_start)
+        .where(AggregatedUsage.aggregation_date < period_end)
+        .group_by(AggregatedUsage.organization_id, AggregatedUsage.feature_id)
+    ).all()
+
+    session.execute(delete(model).where(model.bucket_start == period_start))
+    session.add_all([
+        model(
+            organization_id=org_id,
+            feature_id=feature_id,
+            bucket_start=period_start,
+            event_count=int(events or 0),
+            session_duration_sum=float(duration_sum or 0),
+            user_days=int(user_days or 0),
+            active_days=int(days or 0),
+        )
+        for org_id, feature_id, events, duration_sum, user_days, days in rows
+    ])
@@ -1,27 +1,33 @@
 import logging
+import threading
 import time
+from datetime import datetime
 from typing import List
 import numpy as np
-import dask.dataframe as dd
 from sqlmodel import Session, select, func
 from app.models.aggregated_usage import AggregatedUsage
 from app.models.usage_log import UsageLog
-from app.models.feature import Feature
-from app.schemas.analytics_schema import AnomalyResponse, InsightResponse, ChartDataResponse, FeatureZScore, ZScoreDistribution, FeatureMetricRow
+from app.schemas.analytics_schema import AnomalyResponse, InsightResponse, ChartDataResponse
 from app.config import get_settings
+from app.services import anomaly_model_service, topk_service
+from app.services.analytics_service import get_feature_names, get_feature_usage_range_rows
+from app.services.version_service import get_data_version
+from app.utils.columnar import load_columns
 
 settings = get_settings()
 logger = logging.getLogger(__name__)
 
-# Simple in-memory cache: {org_id: (timestamp, result)}
-_anomaly_cache: dict[int, tuple[float, list]] = {}
-_insight_cache: dict[int, tuple[float, InsightResponse]] = {}
+# Simple in-memory cache: {org_id: (timestamp, data_version, result)}
+_anomaly_cache: dict[int, tuple[float, int, list]] = {}
+_insight_cache: dict[int, tuple[float, int, InsightResponse]] = {}
 _CACHE_TTL = 120  # seconds
 
 
-def _feature_name_map(session: Session, organization_id: int) -> dict[int, str]:
-    feats = session.exec(select(Feature).where(Feature.organization_id == organization_id)).all()
-    return {f.id: f.name for f in feats}
+def _cache_get(cache: dict, organization_id: int, version: int):
+    cached = cache.get(organization_id)
+    if cached and cached[1] == version and (time.time() - cached[0]) < _CACHE_TTL:
+        return cached[2]
+    return None
 
 
 def _load_gemini_client():
@@ -37,60 +43,82 @@ def _load_gemini_client():
     return genai.GenerativeModel("gemini-2.5-flash")
 
 
-def _load_rows(session: Session, organization_id: int):
-    """Return (feature_id, event_count, avg_session_duration, dau) tuples, preferring aggregated data."""
-    rows = session.exec(
+_METRIC_DTYPES = {"feature_id": "i8", "event_count": "f8", "avg_session_duration": "f8", "daily_active_users": "f8"}
+
+
+def _load_metrics(session: Session, organization_id: int) -> tuple[np.ndarray, np.ndarray]:
+    """Return (feature_ids, metrics[n, 3]) of event_count, avg_session_duration, dau, preferring aggregated data."""
+    cols = load_columns(
+        session,
         select(
             AggregatedUsage.feature_id,
             AggregatedUsage.event_count,
             AggregatedUsage.avg_session_duration,
             AggregatedUsage.daily_active_users,
-        ).where(AggregatedUsage.organization_id == organization_id)
-    ).all()
-    if rows:
-        return rows
+        ).where(AggregatedUsage.organization_id == organization_id),
+        _METRIC_DTYPES,
+    )
+    if not len(cols["feature_id"]):
+        # Fallback: compute from raw UsageLog
+        cols = load_columns(
+            session,
+            select(
+                UsageLog.feature_id,
+                func.count(UsageLog.id),
+                func.avg(UsageLog.session_duration),
+                func.count(func.distinct(UsageLog.user_id)),
+            ).where(UsageLog.organization_id == organization_id).group_by(UsageLog.feature_id),
+            _METRIC_DTYPES,
+        )
+    metrics = np.column_stack([cols["event_count"], cols["avg_session_duration"], cols["daily_active_users"]])
+    return cols["feature_id"], metrics
 
-    # Fallback: compute from raw UsageLog
-    raw = session.exec(
-        select(
-            UsageLog.feature_id,
-            func.count(UsageLog.id),
-            func.avg(UsageLog.session_duration),
-            func.count(func.distinct(UsageLog.user_id)),
-        ).where(UsageLog.organization_id == organization_id).group_by(UsageLog.feature_id)
-    ).all()
-    return raw
-
-
-def _prepare_dd(rows):
-    """Build Dask DataFrame from aggregated usage rows for scalable math."""
-    feature_ids = [r[0] for r in rows]
-    metrics = np.array([[r[1], r[2], r[3]] for r in rows], dtype=float)
-    dd_metrics = dd.from_array(metrics, columns=["event_count", "avg_session_duration", "daily_active_users"])
-    return feature_ids, metrics, dd_metrics
-
-
-def detect_anomalies(session: Session, organization_id: int) -> List[AnomalyResponse]:
-    cached = _anomaly_cache.get(organization_id)
-    if cached and (time.time() - cached[0]) < _CACHE_TTL:
-        return cached[1]
-
-    rows = _load_rows(session, organization_id)
-    if not rows:
-        return []
 
-    fname_map = _feature_name_map(session, organization_id)
-    feature_ids, metrics, dd_metrics = _prepare_dd(rows)
+class StatsSnapshot:
+    """An org's data version, feature names and metric matrix, each loaded at most once.
 
-    means = dd_metrics.mean().compute()
-    stds = dd_metrics.std().replace(0, 1e-6).compute()
-    z = (metrics - means.values) / (stds.values + 1e-6)
-    norm_scores = np.linalg.norm(z, axis=1)
-    threshold = float(np.percentile(norm_scores, 90))
+    Shared by the AI panels of one /analytics/dashboard request, which run on separate threads;
+    loads are serialized on the session passed in here.
+    """
+
+    def __init__(self, session: Session, organization_id: int, version: int | None = None, feature_names: dict[int, str] | None = None):
+        self.session = session
+        self.organization_id = organization_id
+        self.version = get_data_version(session, organization_id) if version is None else version
+        self._feature_names = feature_names
+        self._metrics: tuple[np.ndarray, np.ndarray] | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def feature_names(self) -> dict[int, str]:
+        with self._lock:
+            if self._feature_names is None:
+                self._feature_names = get_feature_names(self.session, self.organization_id)
+            return self._feature_names
 
+    def metrics(self) -> tuple[np.ndarray, np.ndarray]:
+        with self._lock:
+            if self._metrics is None:
+                self._metrics = _load_metrics(self.session, self.organization_id)
+            return self._metrics
+
+
+def _dask_dataframe():
+    # dask.dataframe pulls in pandas/pyarrow (~1s); load it on first AI computation, not at app import
+    import dask.dataframe as dd
+    return dd
+
+
+def _prepare_dd(metrics: np.ndarray):
+    """Wrap the metric matrix in a Dask DataFrame for scalable math."""
+    dd = _dask_dataframe()
+    return dd.from_array(metrics, columns=["event_count", "avg_session_duration", "daily_active_users"])
+
+
+def _anomaly_rows(feature_ids, metrics: np.ndarray, scores: np.ndarray, flags: np.ndarray, fname_map: dict[int, str], reason) -> List[AnomalyResponse]:
     results: List[AnomalyResponse] = []
-    for (fid, ev, avg, dau), score in zip(zip(feature_ids, metrics[:, 0], metrics[:, 1], metrics[:, 2]), norm_scores):
-        if score >= threshold:
+    for (fid, ev, avg, dau), score, flag in zip(zip(feature_ids, metrics[:, 0], metrics[:, 1], metrics[:, 2]), scores, flags):
+        if flag:
             results.append(AnomalyResponse(
                 feature_id=int(fid),
                 feature_name=fname_map.get(int(fid)),
@@ -99,33 +127,96 @@ def detect_anomalies(session: Session, organization_id: int) -> List[AnomalyResp
                     "event_count": int(ev),
                     "avg_session_duration": round(float(avg), 2),
                     "daily_active_users": int(dau),
-                    "reason": f"Z-score {float(score):.2f} exceeds 90th-pctl threshold {threshold:.2f}",
+                    "reason": reason(float(score)),
                 },
             ))
-
-    _anomaly_cache[organization_id] = (time.time(), results)
     return results
 
 
-def generate_insights(session: Session, organization_id: int) -> InsightResponse:
-    cached = _insight_cache.get(organization_id)
-    if cached and (time.time() - cached[0]) < _CACHE_TTL:
-        return cached[1]
+def detect_anomalies(session: Session, organization_id: int, stats: StatsSnapshot | None = None) -> List[AnomalyResponse]:
+    stats = stats or StatsSnapshot(session, organization_id)
+    version = stats.version
+    cached = _cache_get(_anomaly_cache, organization_id, version)
+    if cached is not None:
+        return cached
 
-    rows = _load_rows(session, organization_id)
-    if not rows:
-        return InsightResponse(insights=["No data yet; ingest events to see insights."])
+    feature_ids, metrics = stats.metrics()
+    if not len(feature_ids):
+        return []
+
+    fname_map = stats.feature_names
+    cacheable = True
+    if settings.anomaly_detector == "isolation_forest":
+        forest = anomaly_model_service.score(organization_id, version, metrics)
+        if forest is not None:
+            results = _anomaly_rows(
+                feature_ids, metrics, forest.scores, forest.flags, fname_map,
+                lambda s: f"Isolation score {s:.3f} exceeds model threshold {forest.threshold:.3f}",
+            )
+            if not forest.stale:
+                _anomaly_cache[organization_id] = (time.time(), version, results)
+            return results
+        cacheable = False  # first fit still running: serve z-scores without pinning them in the cache
+
+    dd_metrics = _prepare_dd(metrics)
+
+    means = dd_metrics.mean().compute()
+    stds = dd_metrics.std().replace(0, 1e-6).compute()
+    z = (metrics - means.values) / (stds.values + 1e-6)
+    norm_scores = np.linalg.norm(z, axis=1)
+    threshold = float(np.percentile(norm_scores, 90))
 
-    fname_map = _feature_name_map(session, organization_id)
-    feature_ids, metrics, dd_metrics = _prepare_dd(rows)
-    dd_features = dd.concat(
-        [dd.from_array(np.array(feature_ids), columns=["feature_id"]), dd_metrics], axis=1
+    results = _anomaly_rows(
+        feature_ids, metrics, norm_scores, norm_scores >= threshold, fname_map,
+        lambda s: f"Z-score {s:.2f} exceeds 90th-pctl threshold {threshold:.2f}",
     )
-    top_df = dd_features.nlargest(3, "event_count").compute()
-    bullet_seed = [
-        f"{fname_map.get(int(row.feature_id), f'Feature {int(row.feature_id)}')} is trending with {int(row.event_count)} events and avg session {row.avg_session_duration:.1f}s"
-        for _, row in top_df.iterrows()
+    if cacheable:
+        _anomaly_cache[organization_id] = (time.time(), version, results)
+    return results
+
+
+def _trending_bullets(session: Session, organization_id: int, fname_map: dict, feature_ids: np.ndarray, metrics: np.ndarray) -> list[str]:
+    """Heaviest features of the past week from the top-K summaries, each with its average session
+    over that same window from the rollup cube. An org with no events this week falls back to
+    all-time totals from the metric matrix."""
+    def name(fid: int) -> str:
+        return fname_map.get(fid, f"Feature {fid}")
+
+    week = topk_service.get_top(session, organization_id, "week", 3)
+    if week.features:
+        window = {
+            row["feature_id"]: row["avg_session_duration"]
+            for row in get_feature_usage_range_rows(session, organization_id, week.since, datetime.utcnow())
+        }
+        return [
+            f"{name(item.key)} is trending with {item.count} events this week"
+            + (f" and avg session {window[item.key]:.1f}s" if item.key in window else "")
+            for item in week.features
+        ]
+
+    ids, inverse = np.unique(feature_ids, return_inverse=True)
+    events = np.bincount(inverse, weights=metrics[:, 0])
+    durations = np.bincount(inverse, weights=metrics[:, 0] * metrics[:, 1])
+    return [
+        f"{name(int(ids[i]))} is trending with {int(events[i])} events and avg session {durations[i] / events[i]:.1f}s"
+        for i in np.argsort(-events, kind="stable")[:3]
+        if events[i] > 0
     ]
+
+
+def generate_insights(session: Session, organization_id: int, stats: StatsSnapshot | None = None) -> InsightResponse:
+    stats = stats or StatsSnapshot(session, organization_id)
+    version = stats.version
+    cached = _cache_get(_insight_cache, organization_id, version)
+    if cached is not None:
+        return cached
+
+    feature_ids, metrics = stats.metrics()
+    if not len(feature_ids):
+        return InsightResponse(insights=["No data yet; ingest events to see insights."])
+
+    fname_map = stats.feature_names
+    bullet_seed = _trending_bullets(session, organization_id, fname_map, feature_ids, metrics)
     if not bullet_seed:
         bullet_seed.append("No dominant feature yet; usage evenly distributed.")
 
@@ -134,14 +225,14 @@ def generate_insights(session: Session, organization_id: int) -> InsightResponse
         insights = [b for b in bullet_seed if b]
         insights.append("Configure GEMINI_API_KEY to enable LLM-based narrative insights.")
         result = InsightResponse(insights=insights)
-        _insight_cache[organization_id] = (time.time(), result)
+        _insight_cache[organization_id] = (time.time(), version, result)
         return result
 
     prompt = "\n".join(
         ["You are an analytics assistant. Provide 3 concise business insights from usage metrics."]
         + [
             f"{fname_map.get(fid, f'Feature {fid}')}: events={int(ev)}, avg_session={avg:.2f}, dau={int(dau)}"
-            for fid, ev, avg, dau in zip(feature_ids, metrics[:, 0], metrics[:, 1], metrics[:, 2])
+            for fid, ev, avg, dau in zip(feature_ids.tolist(), metrics[:, 0], metrics[:, 1], metrics[:, 2])
         ]
     )
     try:
@@ -150,94 +241,102 @@ def generate_insights(session: Session, organization_id: int) -> InsightResponse
         lines = [line.strip("- ") for line in text.split("\n") if line.strip()]
         insights = lines[:5] or bullet_seed
         result = InsightResponse(insights=insights)
-        _insight_cache[organization_id] = (time.time(), result)
+        _insight_cache[organization_id] = (time.time(), version, result)
         return result
     except Exception as exc:  # pragma: no cover - safety net
         logger.warning("Gemini call failed: %s", exc)
         insights = [b for b in bullet_seed if b]
         insights.append("Gemini call failed; using heuristic insights.")
         result = InsightResponse(insights=insights)
-        _insight_cache[organization_id] = (time.time(), result)
+        _insight_cache[organization_id] = (time.time(), version, result)
         return result
 
 
 # ─── Chart-data endpoint logic ────────────────────────────────────
 
-_chart_cache: dict[int, tuple[float, ChartDataResponse]] = {}
+_chart_cache: dict[int, tuple[float, int, dict]] = {}
+_Z_BUCKETS = ["0-1", "1-2", "2-3", "3-4", "4+"]
+_Z_EDGES = np.array([0, 1, 2, 3, 4, np.inf])
 
 
-def get_chart_data(session: Session, organization_id: int) -> ChartDataResponse:
-    cached = _chart_cache.get(organization_id)
-    if cached and (time.time() - cached[0]) < _CACHE_TTL:
-        return cached[1]
+def _empty_chart_payload() -> dict:
+    return {
+        "feature_z_scores": [], "z_distribution": [], "feature_metrics": [],
+        "threshold": 0, "mean_event_count": 0, "std_event_count": 0,
+        "mean_session": 0, "std_session": 0, "mean_dau": 0, "std_dau": 0,
+    }
 
-    rows = _load_rows(session, organization_id)
-    if not rows:
-        return ChartDataResponse(
-            feature_z_scores=[], z_distribution=[], feature_metrics=[],
-            threshold=0, mean_event_count=0, std_event_count=0,
-            mean_session=0, std_session=0, mean_dau=0, std_dau=0,
+
+def build_chart_payload(feature_ids, metrics: np.ndarray, means: np.ndarray, stds: np.ndarray, fname_map: dict[int, str]) -> dict:
+    """Assemble the ChartDataResponse shape column-wise from NumPy arrays (no per-row models)."""
+    z = (metrics - means) / (stds + 1e-6)
+    norm_scores = np.linalg.norm(z, axis=1)
+    threshold = float(np.percentile(norm_scores, 90))
+
+    fids = np.asarray(feature_ids, dtype=np.int64).tolist()
+    names = [fname_map.get(fid, f"Feature {fid}") for fid in fids]
+    z_rounded = np.round(z, 3)
+    scores = np.round(norm_scores, 3).tolist()
+    flags = (norm_scores >= threshold).tolist()
+    event_counts = metrics[:, 0].astype(np.int64).tolist()
+    sessions = np.round(metrics[:, 1], 2).tolist()
+    daus = metrics[:, 2].astype(np.int64).tolist()
+
+    feature_z_scores = [
+        {
+            "feature_id": fid, "feature_name": name,
+            "z_event_count": z_ev, "z_avg_session": z_avg, "z_dau": z_dau,
+            "norm_score": score, "is_anomaly": flag,
+        }
+        for fid, name, z_ev, z_avg, z_dau, score, flag in zip(
+            fids, names, z_rounded[:, 0].tolist(), z_rounded[:, 1].tolist(), z_rounded[:, 2].tolist(), scores, flags
         )
+    ]
+    counts, _ = np.histogram(norm_scores, bins=_Z_EDGES)
+    z_distribution = [{"bucket": b, "count": int(c)} for b, c in zip(_Z_BUCKETS, counts)]
+    feature_metrics = [
+        {
+            "feature_id": fid, "feature_name": name, "event_count": ev,
+            "avg_session_duration": avg, "daily_active_users": dau,
+        }
+        for fid, name, ev, avg, dau in zip(fids, names, event_counts, sessions, daus)
+    ]
 
-    fname_map = _feature_name_map(session, organization_id)
-    feature_ids, metrics, dd_metrics = _prepare_dd(rows)
+    return {
+        "feature_z_scores": feature_z_scores,
+        "z_distribution": z_distribution,
+        "feature_metrics": feature_metrics,
+        "threshold": round(threshold, 3),
+        "mean_event_count": round(float(means[0]), 2),
+        "std_event_count": round(float(stds[0]), 2),
+        "mean_session": round(float(means[1]), 2),
+        "std_session": round(float(stds[1]), 2),
+        "mean_dau": round(float(means[2]), 2),
+        "std_dau": round(float(stds[2]), 2),
+    }
+
+
+def get_chart_payload(session: Session, organization_id: int, stats: StatsSnapshot | None = None) -> dict:
+    """Chart data as plain dicts/lists, ready for orjson; shared by both response modes."""
+    stats = stats or StatsSnapshot(session, organization_id)
+    version = stats.version
+    cached = _cache_get(_chart_cache, organization_id, version)
+    if cached is not None:
+        return cached
+
+    feature_ids, metrics = stats.metrics()
+    if not len(feature_ids):
+        return _empty_chart_payload()
+
+    fname_map = stats.feature_names
+    dd_metrics = _prepare_dd(metrics)
 
     means = dd_metrics.mean().compute()
     stds = dd_metrics.std().replace(0, 1e-6).compute()
-    z = (metrics - means.values) / (stds.values + 1e-6)
-    norm_scores = np.linalg.norm(z, axis=1)
-    threshold = float(np.percentile(norm_scores, 90))
-
-    # Per-feature Z-scores
-    feature_z_scores = []
-    for i, fid in enumerate(feature_ids):
-        feature_z_scores.append(FeatureZScore(
-            feature_id=int(fid),
-            feature_name=fname_map.get(int(fid), f"Feature {fid}"),
-            z_event_count=round(float(z[i, 0]), 3),
-            z_avg_session=round(float(z[i, 1]), 3),
-            z_dau=round(float(z[i, 2]), 3),
-            norm_score=round(float(norm_scores[i]), 3),
-            is_anomaly=bool(norm_scores[i] >= threshold),
-        ))
-
-    # Z-score distribution histogram
-    buckets = {"0-1": 0, "1-2": 0, "2-3": 0, "3-4": 0, "4+": 0}
-    for s in norm_scores:
-        if s < 1:
-            buckets["0-1"] += 1
-        elif s < 2:
-            buckets["1-2"] += 1
-        elif s < 3:
-            buckets["2-3"] += 1
-        elif s < 4:
-            buckets["3-4"] += 1
-        else:
-            buckets["4+"] += 1
-    z_distribution = [ZScoreDistribution(bucket=k, count=v) for k, v in buckets.items()]
-
-    # Feature raw metrics
-    feature_metrics = []
-    for i, fid in enumerate(feature_ids):
-        feature_metrics.append(FeatureMetricRow(
-            feature_id=int(fid),
-            feature_name=fname_map.get(int(fid), f"Feature {fid}"),
-            event_count=int(metrics[i, 0]),
-            avg_session_duration=round(float(metrics[i, 1]), 2),
-            daily_active_users=int(metrics[i, 2]),
-        ))
-
-    result = ChartDataResponse(
-        feature_z_scores=feature_z_scores,
-        z_distribution=z_distribution,
-        feature_metrics=feature_metrics,
-        threshold=round(threshold, 3),
-        mean_event_count=round(float(means["event_count"]), 2),
-        std_event_count=round(float(stds["event_count"]), 2),
-        mean_session=round(float(means["avg_session_duration"]), 2),
-        std_session=round(float(stds["avg_session_duration"]), 2),
-        mean_dau=round(float(means["daily_active_users"]), 2),
-        std_dau=round(float(stds["daily_active_users"]), 2),
-    )
-    _chart_cache[organization_id] = (time.time(), result)
+    result = build_chart_payload(feature_ids, metrics, means.values, stds.values, fname_map)
+    _chart_cache[organization_id] = (time.time(), version, result)
     return result
+
+
+def get_chart_data(session: Session, organization_id: int, stats: StatsSnapshot | None = None) -> ChartDataResponse:
+    return ChartDataResponse.model_validate(get_chart_payload(session, organization_id, stats))
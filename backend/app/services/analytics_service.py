@@ -1,13 +1,24 @@
-from datetime import date, timedelta
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+import orjson
+from sqlalchemy import and_, literal
+from sqlalchemy.orm import aliased
 from sqlmodel import Session, select, func
 from app.models.usage_log import UsageLog
 from app.models.aggregated_usage import AggregatedUsage
+from app.models.rollup_usage import HourlyUsage, WeeklyUsage, MonthlyUsage
+from app.models.duration_sketch import DurationSketch
+from app.models.user_daily_usage import UserDailyUsage
+from app.models.event_metadata import EventMetadata
 from app.models.feature import Feature
 from app.models.user import User
-from app.schemas.analytics_schema import UsageSummary, FeatureUsage, UserActivity
+from app.schemas.analytics_schema import UsageSummary, FeatureUsage, MetadataUsage, SessionPercentiles, UserActivity
+from app.services import metadata_service
+from app.utils.ddsketch import DDSketch
+from app.utils.time_buckets import GRAINS, as_datetime, ceil_hour, floor_bucket, next_bucket
 
 
-def _feature_name_map(session: Session, organization_id: int) -> dict[int, str]:
+def get_feature_names(session: Session, organization_id: int) -> dict[int, str]:
     feats = session.exec(select(Feature).where(Feature.organization_id == organization_id)).all()
     return {f.id: f.name for f in feats}
 
@@ -23,8 +34,10 @@ def get_usage_summary(session: Session, organization_id: int) -> UsageSummary:
     return UsageSummary(total_events=total_events or 0, active_users=active_users or 0, features_tracked=features_tracked or 0)
 
 
-def get_feature_usage(session: Session, organization_id: int) -> list[FeatureUsage]:
-    fname_map = _feature_name_map(session, organization_id)
+def get_feature_usage_rows(session: Session, organization_id: int, fname_map: dict[int, str] | None = None) -> list[dict]:
+    """Feature usage as plain dicts straight from the row tuples, ready for orjson."""
+    if fname_map is None:
+        fname_map = get_feature_names(session, organization_id)
 
     # Try aggregated table first
     rows = session.exec(
@@ -48,36 +61,266 @@ def get_feature_usage(session: Session, organization_id: int) -> list[FeatureUsa
         ).all()
 
     return [
-        FeatureUsage(
-            feature_id=r[0],
-            feature_name=fname_map.get(r[0]),
-            event_count=int(r[1] or 0),
-            daily_active_users=int(r[2] or 0),
-            avg_session_duration=round(float(r[3] or 0), 2),
+        {
+            "feature_id": fid,
+            "feature_name": fname_map.get(fid),
+            "event_count": int(events or 0),
+            "daily_active_users": int(dau or 0),
+            "avg_session_duration": round(float(avg or 0), 2),
+        }
+        for fid, events, dau, avg in rows
+    ]
+
+
+def get_feature_usage(session: Session, organization_id: int) -> list[FeatureUsage]:
+    return [FeatureUsage(**row) for row in get_feature_usage_rows(session, organization_id)]
+
+
+# ─── Multi-granularity query router ───────────────────────────────
+
+# Grains a bucketed series may be assembled from: each must nest inside the requested grain
+_SERIES_GRAINS = {
+    "hourly": ("hourly",),
+    "daily": ("hourly", "daily"),
+    "weekly": ("hourly", "daily", "weekly"),
+    "monthly": ("hourly", "daily", "monthly"),
+}
+
+
+def _naive_utc(ts: datetime) -> datetime:
+    return ts.astimezone(timezone.utc).replace(tzinfo=None) if ts.tzinfo else ts
+
+
+def plan_range(start: datetime, end: datetime, grains: tuple[str, ...] = GRAINS) -> list[tuple[str, datetime, datetime]]:
+    """Cover [start, end) with the coarsest aligned buckets, returned as contiguous (grain, start, end) runs.
+
+    Bounds are widened to whole hours. Weekly buckets are skipped where they would straddle a
+    month boundary while monthly is allowed, so long ranges resolve to months plus short edges.
+    """
+    cursor, end = floor_bucket(start, "hourly"), ceil_hour(end)
+    coarse_first = [g for g in reversed(GRAINS) if g in grains]
+    runs: list[tuple[str, datetime, datetime]] = []
+    while cursor < end:
+        for grain in coarse_first:
+            if floor_bucket(cursor, grain) != cursor:
+                continue
+            nxt = next_bucket(cursor, grain)
+            if nxt > end:
+                continue
+            if grain == "weekly" and "monthly" in grains and floor_bucket(nxt - timedelta(days=1), "monthly") > cursor:
+                continue
+            break
+        else:  # pragma: no cover - hourly always fits once bounds are hour-aligned
+            raise ValueError("Range is not hour-aligned")
+        if runs and runs[-1][0] == grain and runs[-1][2] == cursor:
+            runs[-1] = (grain, runs[-1][1], nxt)
+        else:
+            runs.append((grain, cursor, nxt))
+        cursor = nxt
+    return runs
+
+
+def _run_query(grain: str, organization_id: int, start: datetime, end: datetime, by_bucket: bool):
+    """Select (feature_id, bucket, events, duration_sum, users, days) for one run of a single grain."""
+    if grain == "hourly":
+        bucket_col, lo, hi = HourlyUsage.bucket_start, start, end
+        metrics = (
+            func.sum(HourlyUsage.event_count), func.sum(HourlyUsage.session_duration_sum),
+            func.max(HourlyUsage.active_users), literal(0),
+        )
+        model = HourlyUsage
+    elif grain == "daily":
+        bucket_col, lo, hi = AggregatedUsage.aggregation_date, start.date(), end.date()
+        metrics = (
+            func.sum(AggregatedUsage.event_count),
+            func.sum(AggregatedUsage.avg_session_duration * AggregatedUsage.event_count),
+            func.sum(AggregatedUsage.daily_active_users), func.count(AggregatedUsage.id),
+        )
+        model = AggregatedUsage
+    else:
+        model = WeeklyUsage if grain == "weekly" else MonthlyUsage
+        bucket_col, lo, hi = model.bucket_start, start.date(), end.date()
+        metrics = (
+            func.sum(model.event_count), func.sum(model.session_duration_sum),
+            func.sum(model.user_days), func.sum(model.active_days),
+        )
+
+    group_cols = (model.feature_id, bucket_col) if by_bucket else (model.feature_id,)
+    bucket_sel = bucket_col if by_bucket else literal(None)
+    return (
+        select(model.feature_id, bucket_sel, *metrics)
+        .where(model.organization_id == organization_id)
+        .where(bucket_col >= lo)
+        .where(bucket_col < hi)
+        .group_by(*group_cols)
+    )
+
+
+_RUN_DTYPES = {"feature_id": "i8", "bucket": "O", "events": "f8", "duration_sum": "f8", "users": "f8", "days": "f8"}
+
+
+def get_feature_usage_range_rows(
+    session: Session,
+    organization_id: int,
+    start: datetime,
+    end: datetime,
+    granularity: str | None = None,
+) -> list[dict]:
+    """Feature usage over [start, end) served from the rollup cube.
+
+    Without ``granularity`` the result is one FeatureUsage-shaped total per feature; with it, one
+    FeatureUsageBucket-shaped row per (feature, bucket). Cost scales with buckets, not events.
+    """
+    import numpy as np
+    from app.utils.columnar import group_by, load_columns
+
+    start, end = _naive_utc(start), _naive_utc(end)
+    grains = _SERIES_GRAINS[granularity] if granularity else GRAINS
+    fname_map = get_feature_names(session, organization_id)
+
+    # One typed column set per grain run; bucketed series key on (feature, floored bucket second)
+    parts = []
+    for grain, run_start, run_end in plan_range(start, end, grains):
+        cols = load_columns(session, _run_query(grain, organization_id, run_start, run_end, by_bucket=bool(granularity)), _RUN_DTYPES)
+        if not len(cols["feature_id"]):
+            continue
+        if granularity:
+            buckets, inverse = np.unique(cols["bucket"].astype(str), return_inverse=True)
+            floored = np.array([floor_bucket(as_datetime(b), granularity) for b in buckets], dtype="M8[s]")
+            bucket_keys = floored.astype(np.int64)[inverse.reshape(-1)]
+        else:
+            bucket_keys = np.zeros(len(cols["feature_id"]), dtype=np.int64)
+        cols["bucket_key"] = bucket_keys
+        cols["hourly"] = np.full(len(bucket_keys), grain == "hourly")
+        parts.append(cols)
+    if not parts:
+        return []
+
+    col = {name: np.concatenate([p[name] for p in parts]) for name in ("feature_id", "bucket_key", "events", "duration_sum", "users", "days", "hourly")}
+    keys, groups = group_by(col["feature_id"], col["bucket_key"])
+    n = len(keys)
+    events = np.bincount(groups, weights=col["events"], minlength=n)
+    duration_sum = np.bincount(groups, weights=col["duration_sum"], minlength=n)
+    daily = ~col["hourly"]
+    user_days = np.bincount(groups[daily], weights=col["users"][daily], minlength=n)
+    active_days = np.bincount(groups[daily], weights=col["days"][daily], minlength=n)
+    hourly_users = np.zeros(n)
+    np.maximum.at(hourly_users, groups[col["hourly"]], col["users"][col["hourly"]])
+
+    # Partial-day edges have no whole-day rollup; the peak hourly distinct count is a lower bound
+    users = np.where(active_days > 0, np.floor(user_days / np.maximum(active_days, 1)), hourly_users).astype(np.int64)
+    events = events.astype(np.int64)
+    avg_session = np.divide(duration_sum, events, out=np.zeros(n), where=events > 0)
+
+    bucket_starts = keys[:, 1].astype("M8[s]").astype(object).tolist()
+    out = []
+    for fid, bucket_start, ev, active, avg in zip(keys[:, 0].tolist(), bucket_starts, events.tolist(), users.tolist(), avg_session.tolist()):
+        avg = round(avg, 2)
+        if granularity:
+            out.append({
+                "feature_id": fid,
+                "feature_name": fname_map.get(fid),
+                "bucket_start": bucket_start,
+                "event_count": ev,
+                "active_users": active,
+                "avg_session_duration": avg,
+            })
+        else:
+            out.append({
+                "feature_id": fid,
+                "feature_name": fname_map.get(fid),
+                "event_count": ev,
+                "daily_active_users": active,
+                "avg_session_duration": avg,
+            })
+    return out
+
+
+def get_session_percentiles(session: Session, organization_id: int, start: date, end: date) -> list[SessionPercentiles]:
+    """p50/p95/p99 session duration per feature over [start, end) by merging daily sketches."""
+    rows = session.exec(
+        select(DurationSketch.feature_id, DurationSketch.sketch)
+        .where(DurationSketch.organization_id == organization_id)
+        .where(DurationSketch.aggregation_date >= start)
+        .where(DurationSketch.aggregation_date < end)
+    ).all()
+
+    merged: dict[int, DDSketch] = {}
+    for fid, blob in rows:
+        sketch = DDSketch.from_bytes(blob)
+        if fid in merged:
+            merged[fid].merge(sketch)
+        else:
+            merged[fid] = sketch
+
+    fname_map = get_feature_names(session, organization_id)
+    return [
+        SessionPercentiles(
+            feature_id=fid,
+            feature_name=fname_map.get(fid),
+            event_count=sketch.count,
+            p50=round(sketch.quantile(0.50), 2),
+            p95=round(sketch.quantile(0.95), 2),
+            p99=round(sketch.quantile(0.99), 2),
         )
-        for r in rows
+        for fid, sketch in sorted(merged.items())
     ]
 
 
 def get_user_activity(session: Session, organization_id: int, days: int = 30) -> list[UserActivity]:
+    import numpy as np
+    from app.utils.columnar import load_columns
+
     start = date.today() - timedelta(days=days)
-    rows = session.exec(
+
+    # Served from the per-user daily rollup: cost is users x days, independent of event volume
+    daily = load_columns(
+        session,
         select(
-            UsageLog.user_id,
-            func.count(UsageLog.id),
-            func.avg(UsageLog.session_duration),
+            UserDailyUsage.user_id,
+            UserDailyUsage.event_count,
+            UserDailyUsage.session_duration_sum,
+            UserDailyUsage.event_type_counts,
         )
-        .where(UsageLog.organization_id == organization_id)
-        .where(UsageLog.timestamp >= start)
-        .group_by(UsageLog.user_id)
-    ).all()
+        .where(UserDailyUsage.organization_id == organization_id)
+        .where(UserDailyUsage.usage_date >= start),
+        {"user_id": "i8", "events": "i8", "duration_sum": "f8", "type_counts": "O"},
+    )
+    user_ids, groups = np.unique(daily["user_id"], return_inverse=True)
+    events = np.bincount(groups, weights=daily["events"], minlength=len(user_ids)).astype(np.int64)
+    duration_sum = np.bincount(groups, weights=daily["duration_sum"], minlength=len(user_ids))
+    type_totals: list[dict[str, int]] = [defaultdict(int) for _ in user_ids]
+    for group, type_counts in zip(groups.tolist(), daily["type_counts"].tolist()):
+        # The raw cursor hands SQLite JSON back as text
+        for event_type, cnt in (orjson.loads(type_counts) if isinstance(type_counts, str) else type_counts or {}).items():
+            type_totals[group][event_type] += cnt
+    rows = [
+        (uid, ev, dur / max(ev, 1), dict(types))
+        for uid, ev, dur, types in zip(user_ids.tolist(), events.tolist(), duration_sum.tolist(), type_totals)
+    ]
+
+    # Fallback to UsageLog if the rollup has not been built yet
+    if not rows:
+        rows = [
+            (r[0], r[1], r[2], {})
+            for r in session.exec(
+                select(
+                    UsageLog.user_id,
+                    func.count(UsageLog.id),
+                    func.avg(UsageLog.session_duration),
+                )
+                .where(UsageLog.organization_id == organization_id)
+                .where(UsageLog.timestamp >= start)
+                .group_by(UsageLog.user_id)
+            ).all()
+        ]
 
     # Resolve emails
     user_ids = [r[0] for r in rows if r[0]]
     email_map: dict[int, str] = {}
     if user_ids:
-        users = session.exec(select(User).where(User.id.in_(user_ids))).all()  # type: ignore
-        email_map = {u.id: u.email for u in users}
+        users = session.exec(select(User.id, User.email).where(User.id.in_(user_ids))).all()  # type: ignore
+        email_map = {uid: email for uid, email in users}
 
     return [
         UserActivity(
@@ -85,7 +328,99 @@ def get_user_activity(session: Session, organization_id: int, days: int = 30) ->
             email=email_map.get(r[0]),
             event_count=int(r[1] or 0),
             avg_session_duration=round(float(r[2] or 0), 2),
+            event_types=r[3],
         )
-        for r in rows
+        for r in sorted(rows, key=lambda r: r[0] or 0)
         if r[0] is not None
     ]
+
+
+# ─── Promoted metadata keys ───────────────────────────────────────
+# Filters and group-bys join EventMetadata on its (organization_id, key, value) indexes, so no
+# metadata_json is decoded at query time.
+
+def _value_col(alias, value_type: str):
+    return alias.value_num if value_type == "number" else alias.value_str
+
+
+def _join_filters(stmt, organization_id: int, filters: list[tuple[str, str, str | float]]):
+    for key, value_type, value in filters:
+        meta = aliased(EventMetadata)
+        stmt = stmt.join(meta, and_(
+            meta.usage_log_id == UsageLog.id,
+            meta.organization_id == organization_id,
+            meta.key == key,
+            _value_col(meta, value_type) == value,
+        ))
+    return stmt
+
+
+def get_metadata_usage(
+    session: Session,
+    organization_id: int,
+    group_by: str,
+    filters: list[str],
+    start: datetime,
+    end: datetime,
+    feature_id: int | None = None,
+) -> list[MetadataUsage]:
+    """Event counts per value of a promoted key over [start, end); events without the key are skipped."""
+    keys = metadata_service.get_promoted_keys(session, organization_id)
+    group_type = metadata_service.require_promoted(keys, group_by)
+    parsed = metadata_service.parse_filters(keys, filters)
+
+    group = aliased(EventMetadata)
+    group_col = _value_col(group, group_type)
+    stmt = (
+        select(group_col, func.count(UsageLog.id), func.count(func.distinct(UsageLog.user_id)), func.avg(UsageLog.session_duration))
+        .select_from(group)
+        .join(UsageLog, UsageLog.id == group.usage_log_id)
+        .where(group.organization_id == organization_id)
+        .where(group.key == group_by)
+        .where(group.timestamp >= _naive_utc(start))
+        .where(group.timestamp < _naive_utc(end))
+    )
+    stmt = _join_filters(stmt, organization_id, parsed)
+    if feature_id is not None:
+        stmt = stmt.where(UsageLog.feature_id == feature_id)
+    rows = session.exec(stmt.group_by(group_col).order_by(func.count(UsageLog.id).desc())).all()
+    return [
+        MetadataUsage(value=value, event_count=events, active_users=users, avg_session_duration=round(float(avg or 0), 2))
+        for value, events, users, avg in rows
+    ]
+
+
+EXPORT_COLUMNS = ["id", "timestamp", "user_id", "feature_id", "event_type", "session_duration"]
+
+
+def export_events(
+    session: Session,
+    organization_id: int,
+    filters: list[str],
+    start: datetime,
+    end: datetime,
+    feature_id: int | None = None,
+    limit: int = 10000,
+) -> tuple[list[str], list[tuple]]:
+    """Raw events with one column per promoted key (read from EventMetadata, not metadata_json)."""
+    keys = metadata_service.get_promoted_keys(session, organization_id)
+    parsed = metadata_service.parse_filters(keys, filters)
+
+    promoted = sorted(keys.items())
+    aliases = [aliased(EventMetadata) for _ in promoted]
+    stmt = select(
+        UsageLog.id, UsageLog.timestamp, UsageLog.user_id, UsageLog.feature_id, UsageLog.event_type, UsageLog.session_duration,
+        *(_value_col(meta, value_type) for meta, (_, value_type) in zip(aliases, promoted)),
+    ).select_from(UsageLog)
+    for meta, (key, _) in zip(aliases, promoted):
+        stmt = stmt.outerjoin(meta, and_(meta.usage_log_id == UsageLog.id, meta.key == key))
+    stmt = (
+        _join_filters(stmt, organization_id, parsed)
+        .where(UsageLog.organization_id == organization_id)
+        .where(UsageLog.timestamp >= _naive_utc(start))
+        .where(UsageLog.timestamp < _naive_utc(end))
+    )
+    if feature_id is not None:
+        stmt = stmt.where(UsageLog.feature_id == feature_id)
+    rows = session.execute(stmt.order_by(UsageLog.id).limit(limit)).all()
+    return EXPORT_COLUMNS + [key for key, _ in promoted], rows
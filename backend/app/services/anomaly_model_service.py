@@ -0,0 +1,123 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+MIN_SAMPLES = 8  # below this the z-score detector is used
+
+
+@dataclass
+class ForestScores:
+    scores: np.ndarray  # -score_samples, the paper's s(x, n) in (0, 1]: higher is more anomalous
+    flags: np.ndarray
+    threshold: float
+    stale: bool  # a refit for newer data is still running
+
+
+class _OrgModel:
+    __slots__ = ("model", "version", "rows", "mean", "std", "pending")
+
+    def __init__(self):
+        self.model = None
+        self.version = None
+        self.rows = 0
+        self.mean = self.std = None
+        self.pending: Future | None = None
+
+
+_models: dict[int, _OrgModel] = {}
+_lock = threading.RLock()  # a done-callback can run inline in _schedule_fit
+_executor: ProcessPoolExecutor | None = None
+
+
+def _pool() -> ProcessPoolExecutor:
+    global _executor
+    if _executor is None:
+        # spawn, not fork: the parent has live threads (scheduler, DB pools) a fork would copy mid-state
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.isolation_forest_workers,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _executor
+
+
+def fit_forest(metrics: np.ndarray, model=None, trees: int = 100):
+    """Worker-process entry point: grow ``model`` by ``trees`` trees fit on ``metrics``, or fit a new forest."""
+    from sklearn.ensemble import IsolationForest
+
+    if model is None:
+        model = IsolationForest(n_estimators=trees, contamination="auto", random_state=0, warm_start=True)
+    else:
+        model.set_params(n_estimators=model.n_estimators + trees)
+    return model.fit(metrics)
+
+
+def _drift(state: _OrgModel, metrics: np.ndarray) -> float:
+    rows = abs(len(metrics) - state.rows) / max(state.rows, 1)
+    shift = np.abs(metrics.mean(axis=0) - state.mean) / (state.std + 1e-6)
+    return max(rows, float(shift.max()))
+
+
+def _install(organization_id: int, version: int, metrics: np.ndarray, future: Future) -> None:
+    with _lock:
+        state = _models[organization_id]
+        state.pending = None
+        try:
+            state.model = future.result()
+        except Exception:
+            logger.exception("IsolationForest fit failed for org %s", organization_id)
+            return
+        state.version = version
+        state.rows = len(metrics)
+        state.mean = metrics.mean(axis=0)
+        state.std = metrics.std(axis=0)
+
+
+def _schedule_fit(organization_id: int, version: int, metrics: np.ndarray) -> None:
+    """Queue a fit unless one is already running; caller holds ``_lock``."""
+    state = _models.setdefault(organization_id, _OrgModel())
+    if state.pending is not None:
+        return
+    model, trees = state.model, settings.isolation_forest_trees
+    if model is not None and model.n_estimators + trees > settings.isolation_forest_max_trees:
+        model = None  # old trees are capped: rebuild from the current data only
+    state.pending = future = _pool().submit(fit_forest, metrics, model, trees)
+    future.add_done_callback(lambda f: _install(organization_id, version, metrics, f))
+
+
+def score(organization_id: int, version: int, metrics: np.ndarray) -> ForestScores | None:
+    """Score ``metrics`` with the org's cached forest, scheduling a background (re)fit when needed.
+
+    Returns None until the org's first fit has finished (or with too few samples to fit).
+    A model fit on an older data version keeps serving until its refit lands.
+    """
+    if len(metrics) < MIN_SAMPLES:
+        return None
+    with _lock:
+        state = _models.get(organization_id)
+        if state is None or state.model is None:
+            _schedule_fit(organization_id, version, metrics)
+            return None
+        if state.version != version and state.pending is None:
+            if _drift(state, metrics) >= settings.isolation_forest_refit_threshold:
+                _schedule_fit(organization_id, version, metrics)
+            else:
+                state.version = version  # too little change to refit; the model stays current
+        model, stale = state.model, state.version != version
+    scores = -model.score_samples(metrics)
+    threshold = settings.isolation_forest_score_threshold
+    return ForestScores(scores=scores, flags=scores > threshold, threshold=threshold, stale=stale)
+
+
+def shutdown() -> None:
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
@@ -1,8 +1,8 @@
 import hashlib
-from fastapi import HTTPException, status, Depends
+from fastapi import HTTPException, Request, status, Depends
 from fastapi.security import OAuth2PasswordBearer
 from sqlmodel import Session, select
-from app.db.session import get_session
+from app.db.session import PRIMARY_SHARD, get_read_session, session_for_org, shard_for_org
 from app.models.user import User
 from app.models.organization import Organization
 from app.schemas.auth_schema import UserCreate
@@ -33,6 +33,11 @@ def create_user(data: UserCreate, session: Session) -> User:
     session.add(user)
     session.commit()
     session.refresh(user)
+    if shard_for_org(user.organization_id) != PRIMARY_SHARD:
+        # Users are authoritative on the primary; the org's shard keeps a copy for auth and FKs
+        with session_for_org(user.organization_id) as shard_session:
+            shard_session.merge(User.model_validate(user.model_dump()))
+            shard_session.commit()
     return user
 
 
@@ -43,10 +48,44 @@ def authenticate(email: str, password: str, session: Session) -> str:
     return create_access_token(subject=str(user.id), org_id=user.organization_id, role=user.role)
 
 
-def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_session)) -> User:
+def get_current_user(token: str = Depends(oauth2_scheme), session: Session = Depends(get_read_session)) -> User:
     from app.utils.jwt_utils import decode_token
     payload = decode_token(token)
+    if "scope" in payload:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token not valid for this endpoint")
     user = session.get(User, int(payload["sub"]))
+    if not user and "org" in payload:
+        # A just-registered user may not have reached the reader yet
+        with session_for_org(int(payload["org"])) as writer_session:
+            user = writer_session.get(User, int(payload["sub"]))
+    if not user:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
+    return user
+
+
+def issue_stream_ticket(user: User) -> str:
+    from app.utils.jwt_utils import create_stream_ticket
+    return create_stream_ticket(subject=str(user.id), org_id=user.organization_id)
+
+
+def get_stream_user(request: Request, ticket: str | None = None) -> User:
+    """Like get_current_user, for long-lived streams: EventSource cannot set headers, so a
+    stream ticket may arrive as ``?ticket=`` instead, and no session is held open for the stream.
+    Access tokens are only accepted in the Authorization header, never in the URL."""
+    from app.utils.jwt_utils import STREAM_SCOPE, decode_token
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        payload = decode_token(token)
+        if "scope" in payload:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Token not valid for this endpoint")
+    elif ticket:
+        payload = decode_token(ticket)
+        if payload.get("scope") != STREAM_SCOPE:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not a stream ticket")
+    else:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated")
+    with session_for_org(int(payload["org"])) as session:
+        user = session.get(User, int(payload["sub"]))
     if not user:
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="User not found")
     return user
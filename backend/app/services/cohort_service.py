@@ -0,0 +1,101 @@
+from datetime import date, timedelta
+from sqlmodel import Session, select
+from app.models.user_bitmap import SeenBitmap, UserBitmap
+from app.schemas.analytics_schema import RetentionMatrix, RetentionRow
+from app.utils.bitmap import RoaringBitmap, intersection_counts
+
+PERIOD_DAYS = {"day": 1, "week": 7}
+
+# Retention and cohort grids are set algebra over the per-day user bitmaps written by
+# aggregate_daily: a period's active set is the OR of its days, a cohort's retention at offset k
+# is |cohort AND active[p + k]| (the whole grid in one intersection_counts call), and "new"
+# users are active[p] ANDNOT everyone seen before p, where "seen before the range" starts from
+# the latest monthly SeenBitmap checkpoint rather than the org's whole history.
+
+
+def _scope(stmt, organization_id: int, feature_id: int | None, model=UserBitmap):
+    stmt = stmt.where(model.organization_id == organization_id)
+    if feature_id is None:
+        return stmt.where(model.feature_id.is_(None))  # type: ignore
+    return stmt.where(model.feature_id == feature_id)
+
+
+def _seen_before(session: Session, organization_id: int, start: date, feature_id: int | None) -> RoaringBitmap:
+    checkpoint = session.exec(
+        _scope(select(SeenBitmap.seen_before, SeenBitmap.users), organization_id, feature_id, SeenBitmap)
+        .where(SeenBitmap.seen_before <= start)
+        .order_by(SeenBitmap.seen_before.desc())  # type: ignore
+        .limit(1)
+    ).first()
+    days = _scope(select(UserBitmap.users), organization_id, feature_id).where(UserBitmap.bitmap_date < start)
+    parts = []
+    if checkpoint is not None:
+        days = days.where(UserBitmap.bitmap_date >= checkpoint.seen_before)
+        parts.append(RoaringBitmap.from_bytes(checkpoint.users))
+    parts.extend(RoaringBitmap.from_bytes(blob) for blob in session.exec(days).all())
+    return RoaringBitmap.union(parts)
+
+
+def _period_bitmaps(
+    session: Session, organization_id: int, start: date, end: date, period: str, feature_id: int | None
+) -> list[tuple[date, RoaringBitmap]]:
+    step = PERIOD_DAYS[period]
+    rows = session.exec(
+        _scope(select(UserBitmap.bitmap_date, UserBitmap.users), organization_id, feature_id)
+        .where(UserBitmap.bitmap_date >= start)
+        .where(UserBitmap.bitmap_date < end)
+    ).all()
+    by_period: dict[int, list[RoaringBitmap]] = {}
+    for day, blob in rows:
+        by_period.setdefault((day - start).days // step, []).append(RoaringBitmap.from_bytes(blob))
+    n = -(-(end - start).days // step)  # the last period may be partial
+    return [
+        (start + timedelta(days=i * step), RoaringBitmap.union(by_period.get(i, [])))
+        for i in range(n)
+    ]
+
+
+def _matrix(
+    basis: str, period: str, feature_id: int | None, cohorts: list[RoaringBitmap], actives: list[tuple[date, RoaringBitmap]]
+) -> RetentionMatrix:
+    overlap = intersection_counts(cohorts, [active for _, active in actives]).tolist()
+    rows = []
+    for i, (cohort, (period_start, _)) in enumerate(zip(cohorts, actives)):
+        size = len(cohort)
+        retained = [size] + overlap[i][i + 1:]
+        rows.append(RetentionRow(
+            cohort_start=period_start,
+            cohort_size=size,
+            retained=retained,
+            rates=[round(r / size, 4) if size else 0.0 for r in retained],
+        ))
+
+    # Size-weighted mean per offset over the cohorts old enough to have reached it
+    average = []
+    for k in range(len(actives)):
+        eligible = rows[: len(rows) - k]
+        total = sum(r.cohort_size for r in eligible)
+        average.append(round(sum(r.retained[k] for r in eligible) / total, 4) if total else 0.0)
+    return RetentionMatrix(basis=basis, period=period, feature_id=feature_id, cohorts=rows, average=average)
+
+
+def get_retention(
+    session: Session, organization_id: int, start: date, end: date, period: str = "day", feature_id: int | None = None
+) -> RetentionMatrix:
+    """Of the users active in each period of [start, end), how many were active again k periods later."""
+    actives = _period_bitmaps(session, organization_id, start, end, period, feature_id)
+    return _matrix("active", period, feature_id, [bitmap for _, bitmap in actives], actives)
+
+
+def get_cohorts(
+    session: Session, organization_id: int, start: date, end: date, period: str = "day", feature_id: int | None = None
+) -> RetentionMatrix:
+    """Acquisition cohorts: users first seen (in the org, or on ``feature_id``) in each period, and
+    how many of them came back k periods later."""
+    actives = _period_bitmaps(session, organization_id, start, end, period, feature_id)
+    seen = _seen_before(session, organization_id, start, feature_id)
+    cohorts = []
+    for _, active in actives:
+        cohorts.append(active - seen)
+        seen = seen | active
+    return _matrix("new", period, feature_id, cohorts, actives)
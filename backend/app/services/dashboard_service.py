@@ -0,0 +1,126 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from fastapi import HTTPException, status
+from sqlmodel import Session
+from app.services import analytics_service, topk_service
+from app.services.version_service import get_data_version
+
+logger = logging.getLogger(__name__)
+
+ANALYTICS_PANELS = ("summary", "feature_usage", "user_activity", "top")
+AI_PANELS = ("anomalies", "insights", "chart_data")
+PANELS = ANALYTICS_PANELS + AI_PANELS
+
+_pool: ThreadPoolExecutor | None = None
+
+
+@dataclass
+class DashboardContext:
+    """What every panel of one request shares: the caller's org, one data version, one
+    feature-name lookup and (for AI panels) one metric snapshot."""
+
+    organization_id: int
+    version: int
+    feature_names: dict[int, str]
+    stats: object | None  # ai_service.StatsSnapshot when an AI panel was requested
+    days: int
+    window: str = "day"
+
+
+def _summary(session: Session, ctx: DashboardContext):
+    return analytics_service.get_usage_summary(session, ctx.organization_id).model_dump()
+
+
+def _feature_usage(session: Session, ctx: DashboardContext):
+    return analytics_service.get_feature_usage_rows(session, ctx.organization_id, ctx.feature_names)
+
+
+def _user_activity(session: Session, ctx: DashboardContext):
+    return [row.model_dump() for row in analytics_service.get_user_activity(session, ctx.organization_id, ctx.days)]
+
+
+def _top(session: Session, ctx: DashboardContext):
+    return topk_service.get_top(session, ctx.organization_id, ctx.window).model_dump()
+
+
+def _anomalies(session: Session, ctx: DashboardContext):
+    from app.services import ai_service
+    return [row.model_dump() for row in ai_service.detect_anomalies(session, ctx.organization_id, ctx.stats)]
+
+
+def _insights(session: Session, ctx: DashboardContext):
+    from app.services import ai_service
+    return ai_service.generate_insights(session, ctx.organization_id, ctx.stats).model_dump()
+
+
+def _chart_data(session: Session, ctx: DashboardContext):
+    from app.services import ai_service
+    return ai_service.get_chart_payload(session, ctx.organization_id, ctx.stats)
+
+
+_BUILDERS = {
+    "summary": _summary,
+    "feature_usage": _feature_usage,
+    "user_activity": _user_activity,
+    "top": _top,
+    "anomalies": _anomalies,
+    "insights": _insights,
+    "chart_data": _chart_data,
+}
+
+
+def parse_panels(raw: list[str]) -> list[str]:
+    """Accept repeated and/or comma-separated ``panels`` values; order is preserved, duplicates dropped."""
+    panels = list(dict.fromkeys(p.strip() for item in raw for p in item.split(",") if p.strip()))
+    unknown = [p for p in panels if p not in _BUILDERS]
+    if unknown or not panels:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"panels must be a non-empty subset of {', '.join(PANELS)}" + (f"; unknown: {', '.join(unknown)}" if unknown else ""),
+        )
+    return panels
+
+
+def _executor() -> ThreadPoolExecutor:
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=2 * len(PANELS), thread_name_prefix="panel")
+    return _pool
+
+
+def _run_panel(panel: str, bind, ctx: DashboardContext) -> tuple[object, float]:
+    start = time.perf_counter()
+    with Session(bind) as session:
+        data = _BUILDERS[panel](session, ctx)
+    return data, (time.perf_counter() - start) * 1000
+
+
+def build_dashboard(session: Session, organization_id: int, panels: list[str], days: int = 30, window: str = "day") -> dict:
+    """Run the requested panels concurrently, each on its own session against the same engine.
+
+    A failing panel is reported under ``errors`` without failing the others.
+    """
+    start = time.perf_counter()
+    version = get_data_version(session, organization_id)
+    feature_names = analytics_service.get_feature_names(session, organization_id)
+    stats = None
+    if any(p in AI_PANELS for p in panels):
+        from app.services import ai_service
+        stats = ai_service.StatsSnapshot(session, organization_id, version, feature_names)
+    ctx = DashboardContext(organization_id, version, feature_names, stats, days, window)
+    timings = {"shared": round((time.perf_counter() - start) * 1000, 2)}
+
+    bind = session.get_bind()
+    futures = {panel: _executor().submit(_run_panel, panel, bind, ctx) for panel in panels}
+    results, errors = {}, {}
+    for panel, future in futures.items():
+        try:
+            results[panel], elapsed = future.result()
+            timings[panel] = round(elapsed, 2)
+        except Exception as exc:
+            logger.exception("Dashboard panel %s failed for org %s", panel, organization_id)
+            errors[panel] = exc.detail if isinstance(exc, HTTPException) else "Panel failed"
+    timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+    return {"version": version, "panels": results, "timings_ms": timings, "errors": errors}
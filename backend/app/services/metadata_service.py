@@ -0,0 +1,240 @@
+import threading
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, insert, update
+from sqlmodel import Session, select
+from app.config import get_settings
+from app.models.data_version import DataVersion
+from app.models.event_metadata import EventMetadata, PromotedKey
+from app.models.usage_log import UsageLog
+from app.services.version_service import bump_data_version
+
+settings = get_settings()
+
+VALUE_TYPES = ("string", "number")
+BACKFILL_BATCH = 5000
+
+# org_id -> (keys_version, {key: value_type}); ingest reads this on every event. An entry is
+# used only while the org's DataVersion.keys_version still matches, so a key change made by any
+# worker is seen by every other worker on its next event.
+_key_cache: dict[int, tuple[int, dict[str, str]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _keys_version(session: Session, organization_id: int) -> int:
+    version = session.exec(
+        select(DataVersion.keys_version).where(DataVersion.organization_id == organization_id)
+    ).first()
+    return int(version or 0)
+
+
+def _bump_keys_version(session: Session, organization_id: int) -> None:
+    """Advance the org's key-set version inside the caller's transaction (caller commits).
+
+    The data version bump comes first and takes the DataVersion row lock. Ingest reads the key
+    list after its own bump, so an event either commits before the key change proceeds or waits
+    for it and then sees the new keys.
+    """
+    bump_data_version(session, organization_id)
+    session.execute(
+        update(DataVersion)
+        .where(DataVersion.organization_id == organization_id)
+        .values(keys_version=DataVersion.keys_version + 1)
+    )
+
+
+def get_promoted_keys(session: Session, organization_id: int, use_cache: bool = True) -> dict[str, str]:
+    version = _keys_version(session, organization_id)
+    cached = _key_cache.get(organization_id)
+    if use_cache and cached and cached[0] == version:
+        return cached[1]
+    rows = session.exec(
+        select(PromotedKey.key, PromotedKey.value_type).where(PromotedKey.organization_id == organization_id)
+    ).all()
+    keys = {key: value_type for key, value_type in rows}
+    with _cache_lock:
+        _key_cache[organization_id] = (version, keys)
+    return keys
+
+
+def list_keys(session: Session, organization_id: int) -> list[PromotedKey]:
+    return session.exec(
+        select(PromotedKey).where(PromotedKey.organization_id == organization_id).order_by(PromotedKey.key)
+    ).all()
+
+
+def _typed(value, value_type: str) -> tuple[str | None, float | None] | None:
+    """Coerce a raw metadata value to the key's column; None when it does not fit."""
+    if value is None or isinstance(value, (dict, list)):
+        return None
+    if value_type == "number":
+        if isinstance(value, bool):
+            return None
+        try:
+            return None, float(value)
+        except (TypeError, ValueError):
+            return None
+    return str(value), None
+
+
+def _rows_for(organization_id: int, usage_log_id: int, timestamp: datetime, metadata: dict | None, keys: dict[str, str]) -> list[dict]:
+    if not isinstance(metadata, dict) or not keys:
+        return []
+    rows = []
+    for key, value_type in keys.items():
+        typed = _typed(metadata.get(key), value_type)
+        if typed is not None:
+            rows.append({
+                "organization_id": organization_id,
+                "usage_log_id": usage_log_id,
+                "key": key,
+                "value_str": typed[0],
+                "value_num": typed[1],
+                "timestamp": timestamp,
+            })
+    return rows
+
+
+def record_event_metadata(session: Session, usage: UsageLog) -> None:
+    """Copy the event's promoted keys into EventMetadata inside the caller's transaction.
+
+    Call after ``bump_data_version`` for the event's org, so the key list is read under the same
+    row lock that ``register_key`` and ``delete_key`` take.
+    """
+    if not isinstance(usage.metadata_json, dict) or not usage.metadata_json:
+        return
+    keys = get_promoted_keys(session, usage.organization_id)
+    if not keys.keys() & usage.metadata_json.keys():
+        return
+    session.flush()  # assigns usage.id
+    rows = _rows_for(usage.organization_id, usage.id, usage.timestamp, usage.metadata_json, keys)
+    if rows:
+        session.execute(insert(EventMetadata), rows)
+
+
+def backfill(session: Session, organization_id: int, keys: dict[str, str], after_id: int = 0) -> int:
+    """Extract ``keys`` from the org's events with an id above ``after_id``, skipping events that already have a row."""
+    written, last_id = 0, after_id
+    while True:
+        batch = session.exec(
+            select(UsageLog.id, UsageLog.timestamp, UsageLog.metadata_json)
+            .where(UsageLog.organization_id == organization_id)
+            .where(UsageLog.id > last_id)
+            .where(UsageLog.metadata_json.is_not(None))
+            .order_by(UsageLog.id)
+            .limit(BACKFILL_BATCH)
+        ).all()
+        if not batch:
+            return written
+        lo, last_id = batch[0][0], batch[-1][0]
+        existing = set(session.exec(
+            select(EventMetadata.usage_log_id, EventMetadata.key)
+            .where(EventMetadata.organization_id == organization_id)
+            .where(EventMetadata.usage_log_id.between(lo, last_id))
+            .where(EventMetadata.key.in_(list(keys)))
+        ).all())
+        rows = [
+            row
+            for log_id, timestamp, metadata in batch
+            for row in _rows_for(organization_id, log_id, timestamp, metadata, keys)
+            if (log_id, row["key"]) not in existing
+        ]
+        if rows:
+            session.execute(insert(EventMetadata), rows)
+            written += len(rows)
+
+
+def register_key(session: Session, organization_id: int, key: str, value_type: str) -> tuple[PromotedKey, int]:
+    """Promote ``key`` for the org and backfill existing events; re-registering is idempotent."""
+    if value_type not in VALUE_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"value_type must be one of {', '.join(VALUE_TYPES)}")
+    promoted = session.exec(
+        select(PromotedKey).where(PromotedKey.organization_id == organization_id).where(PromotedKey.key == key)
+    ).first()
+    if promoted and promoted.value_type != value_type:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Key '{key}' is already promoted as {promoted.value_type}")
+    if promoted is None:
+        active = get_promoted_keys(session, organization_id, use_cache=False)
+        if len(active) >= settings.max_promoted_keys:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"At most {settings.max_promoted_keys} promoted keys per organization")
+        _bump_keys_version(session, organization_id)
+        # Rows from an earlier promotion of the key, possibly as the other value_type
+        session.execute(delete(EventMetadata).where(EventMetadata.organization_id == organization_id).where(EventMetadata.key == key))
+        watermark = session.exec(select(func.max(UsageLog.id)).where(UsageLog.organization_id == organization_id)).one()
+        promoted = PromotedKey(organization_id=organization_id, key=key, value_type=value_type, watermark=watermark or 0)
+        session.add(promoted)
+        session.flush()
+    written = backfill(session, organization_id, {key: value_type})
+    session.commit()
+    session.refresh(promoted)
+    invalidate_cache(organization_id)
+    return promoted, written
+
+
+def delete_key(session: Session, organization_id: int, key: str) -> None:
+    promoted = session.exec(
+        select(PromotedKey).where(PromotedKey.organization_id == organization_id).where(PromotedKey.key == key)
+    ).first()
+    if promoted is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Key '{key}' is not promoted")
+    _bump_keys_version(session, organization_id)
+    # The key row goes first: a catch-up pass holding it commits before the rows below are deleted
+    session.delete(promoted)
+    session.flush()
+    session.execute(delete(EventMetadata).where(EventMetadata.organization_id == organization_id).where(EventMetadata.key == key))
+    session.commit()
+    invalidate_cache(organization_id)
+
+
+def catch_up(session: Session) -> int:
+    """Backfill keys promoted PROMOTED_KEY_CATCHUP_SECONDS ago or more over the events past their watermark.
+
+    The promotion backfill only sees events committed before it; this second pass picks up those
+    that transactions still open at the time, or writers that skip ``record_event_metadata``
+    (bulk loads), stored without the key.
+    """
+    cutoff = datetime.utcnow() - timedelta(seconds=settings.promoted_key_catchup_seconds)
+    pending = session.exec(
+        select(PromotedKey).where(PromotedKey.caught_up_at.is_(None)).where(PromotedKey.created_at <= cutoff)
+    ).all()
+    written = 0
+    for promoted in pending:
+        # Claim the key row before writing, so a concurrent delete_key waits for this commit
+        promoted.caught_up_at = datetime.utcnow()
+        session.add(promoted)
+        session.flush()
+        rows = backfill(session, promoted.organization_id, {promoted.key: promoted.value_type}, after_id=promoted.watermark)
+        if rows:
+            bump_data_version(session, promoted.organization_id)
+        session.commit()
+        written += rows
+    return written
+
+
+def invalidate_cache(organization_id: int | None = None) -> None:
+    with _cache_lock:
+        if organization_id is None:
+            _key_cache.clear()
+        else:
+            _key_cache.pop(organization_id, None)
+
+
+def parse_filters(keys: dict[str, str], filters: list[str]) -> list[tuple[str, str, str | float]]:
+    """Turn ``key:value`` query strings into (key, value_type, typed value) for promoted keys."""
+    parsed = []
+    for raw in filters:
+        key, sep, value = raw.partition(":")
+        if not sep:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Filter '{raw}' must look like key:value")
+        value_type = require_promoted(keys, key)
+        typed = _typed(value, value_type)
+        if typed is None:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Filter value for '{key}' must be a {value_type}")
+        parsed.append((key, value_type, typed[1] if value_type == "number" else typed[0]))
+    return parsed
+
+
+def require_promoted(keys: dict[str, str], key: str) -> str:
+    if key not in keys:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=f"Metadata key '{key}' is not promoted")
+    return keys[key]
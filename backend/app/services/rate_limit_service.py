@@ -0,0 +1,149 @@
+import math
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from fastapi import Depends, HTTPException, status
+from sqlmodel import Session
+from app.config import get_settings
+from app.db.session import get_read_session
+from app.models.organization import Organization
+from app.services.auth_service import get_current_user
+
+settings = get_settings()
+
+# All state is in-process: enforcement never touches the database. With N workers the
+# effective limit is N x the configured one, so size plan_limits per worker.
+_lock = threading.Lock()
+_plan_cache: dict[int, tuple[float, str]] = {}
+_IDLE_PRUNE_SECONDS = 600
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Consume one token; returns 0 on success or the seconds until a token is available."""
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 60.0
+
+    def refund(self) -> None:
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+_org_buckets: dict[tuple[str, int], TokenBucket] = {}
+_user_buckets: dict[tuple[str, int], TokenBucket] = {}
+_in_flight: dict[tuple[str, int], int] = defaultdict(int)
+# (scope, org_id) -> counter name -> value; exposed for capacity planning
+_counters: dict[tuple[str, int], dict[str, int]] = defaultdict(
+    lambda: {"admitted": 0, "rejected_rate": 0, "rejected_concurrency": 0, "peak_in_flight": 0}
+)
+_last_prune = time.monotonic()
+
+
+def _plan_for(session: Session, organization_id: int) -> str:
+    cached = _plan_cache.get(organization_id)
+    if cached and time.monotonic() - cached[0] < settings.plan_cache_seconds:
+        return cached[1]
+    org = session.get(Organization, organization_id)
+    plan = org.plan_type if org else "standard"
+    _plan_cache[organization_id] = (time.monotonic(), plan)
+    return plan
+
+
+def _limits(plan: str, scope: str) -> dict[str, float]:
+    return settings.plan_limits.get(plan, settings.plan_limits["standard"])[scope]
+
+
+def _bucket(store: dict, key: tuple[str, int], rate: float, burst: float) -> TokenBucket:
+    bucket = store.get(key)
+    if bucket is None or bucket.rate != rate or bucket.capacity != burst:
+        bucket = store[key] = TokenBucket(rate, burst)
+    return bucket
+
+
+def _prune(now: float) -> None:
+    global _last_prune
+    if now - _last_prune < _IDLE_PRUNE_SECONDS:
+        return
+    _last_prune = now
+    for store in (_org_buckets, _user_buckets):
+        for key in [k for k, b in store.items() if now - b.updated > _IDLE_PRUNE_SECONDS]:
+            del store[key]
+
+
+def _reject(counter: str, key: tuple[str, int], retry_after: float, detail: str):
+    _counters[key][counter] += 1
+    raise HTTPException(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+@contextmanager
+def admitted(scope: str, session: Session, current_user, organization_id: int | None = None):
+    """Hold one admission for ``scope`` ("ingest" or "ai") for the body of the with-block, or raise 429.
+
+    ``organization_id`` is the org whose plan and quota are charged (default: the caller's); admins
+    ingesting for another org pass the event's org. The per-user bucket is always the caller's.
+    """
+    org_id = organization_id if organization_id is not None else current_user.organization_id
+    limits = _limits(_plan_for(session, org_id), scope)
+    org_key, user_key = (scope, org_id), (scope, current_user.id)
+    now = time.monotonic()
+    with _lock:
+        _prune(now)
+        user_bucket = _bucket(_user_buckets, user_key, limits["user_rate"], limits["user_burst"])
+        wait = user_bucket.take(now)
+        if wait:
+            _reject("rejected_rate", org_key, wait, "User rate limit exceeded")
+        org_bucket = _bucket(_org_buckets, org_key, limits["org_rate"], limits["org_burst"])
+        wait = org_bucket.take(now)
+        if wait:
+            user_bucket.refund()
+            _reject("rejected_rate", org_key, wait, "Organization rate limit exceeded")
+        if _in_flight[org_key] >= limits["concurrency"]:
+            user_bucket.refund()
+            org_bucket.refund()
+            _reject("rejected_concurrency", org_key, 1, "Too many concurrent requests for organization")
+        _in_flight[org_key] += 1
+        counters = _counters[org_key]
+        counters["admitted"] += 1
+        counters["peak_in_flight"] = max(counters["peak_in_flight"], _in_flight[org_key])
+    try:
+        yield
+    finally:
+        with _lock:
+            _in_flight[org_key] -= 1
+
+
+def admit(scope: str):
+    """Build a route dependency enforcing the caller's plan limits for ``scope`` ("ingest" or "ai")."""
+
+    def dependency(session: Session = Depends(get_read_session), current_user=Depends(get_current_user)):
+        with admitted(scope, session, current_user):
+            yield
+
+    return dependency
+
+
+def get_counters() -> list[dict]:
+    with _lock:
+        return [
+            {"scope": scope, "organization_id": org_id, "in_flight": _in_flight[(scope, org_id)], **counters}
+            for (scope, org_id), counters in sorted(_counters.items())
+        ]
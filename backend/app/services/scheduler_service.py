@@ -0,0 +1,244 @@
+import logging
+import os
+import random
+import socket
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from typing import Callable
+from sqlalchemy import delete, or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.config import get_settings
+from app.db.session import engine, fan_out
+from app.models.data_version import DataVersion
+from app.models.event_metadata import EventMetadata
+from app.models.rollup_usage import HourlyUsage
+from app.models.scheduled_job import ScheduledJob
+from app.models.topk_summary import TopKSummary
+from app.models.usage_log import UsageLog
+from app.services import aggregation_service, metadata_service, topk_service
+from app.services.version_service import bump_data_version
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+OWNER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+@dataclass
+class Job:
+    name: str
+    interval_seconds: int
+    run: Callable[[Session, datetime | None], str]
+    # "cluster" jobs take the DB lease so one worker/replica runs them; "process" jobs warm
+    # per-process state (in-memory caches) and therefore run in every worker
+    scope: str = "cluster"
+
+
+# ─── Job bodies ───────────────────────────────────────────────────
+# Bodies receive the primary session (which holds the lease) but do their work on every
+# shard via fan_out, so one leased run covers all tenants.
+
+def _run_rollups(session: Session, last_success: datetime | None) -> str:
+    """Aggregate every day since the last successful run (re-running that day), so missed runs catch up."""
+    today = date.today()
+    start = last_success.date() if last_success else today - timedelta(days=1)
+    start = max(start, today - timedelta(days=settings.scheduler_max_catchup_days))
+    if settings.raw_retention_days > 0:
+        # A day that raw retention has purged, even partly, would be rebuilt from what is left of
+        # UsageLog while its AggregatedUsage rows survive, so catch-up starts after the cutoff day
+        cutoff = datetime.utcnow() - timedelta(days=settings.raw_retention_days)
+        start = max(start, cutoff.date() + timedelta(days=1))
+    written = sum(fan_out(lambda shard_session: aggregation_service.aggregate_range(shard_session, start, today)))
+    return f"aggregated {written} rows for {start.isoformat()}..{today.isoformat()}"
+
+
+def _prewarm_shard(session: Session) -> int:
+    from app.services import ai_service
+
+    org_ids = session.exec(select(DataVersion.organization_id)).all()
+    for org_id in org_ids:
+        ai_service.get_chart_payload(session, org_id)
+        ai_service.detect_anomalies(session, org_id)
+    return len(org_ids)
+
+
+def _run_prewarm(session: Session, last_success: datetime | None) -> str:
+    return f"prewarmed {sum(fan_out(_prewarm_shard))} orgs"
+
+
+def _run_topk_flush(session: Session, last_success: datetime | None) -> str:
+    return f"flushed {topk_service.flush(OWNER)} top-K summaries"
+
+
+def _run_metadata_catchup(session: Session, last_success: datetime | None) -> str:
+    return f"backfilled {sum(fan_out(metadata_service.catch_up))} metadata rows"
+
+
+def _retention_shard(session: Session) -> dict[str, int]:
+    deleted = {}
+    if settings.raw_retention_days > 0:
+        cutoff = datetime.utcnow() - timedelta(days=settings.raw_retention_days)
+        org_ids = session.exec(select(UsageLog.organization_id).where(UsageLog.timestamp < cutoff).distinct()).all()
+        session.execute(delete(EventMetadata).where(EventMetadata.timestamp < cutoff))
+        rows = session.execute(delete(UsageLog).where(UsageLog.timestamp < cutoff)).rowcount
+        for org_id in org_ids:
+            bump_data_version(session, org_id)
+        deleted["usage_log"] = rows
+    if settings.hourly_retention_days > 0:
+        cutoff = datetime.utcnow() - timedelta(days=settings.hourly_retention_days)
+        deleted["hourly"] = session.execute(delete(HourlyUsage).where(HourlyUsage.bucket_start < cutoff)).rowcount
+    # Top-K summaries only serve windows up to a week
+    cutoff = datetime.utcnow() - max(topk_service.WINDOWS.values()) - timedelta(days=1)
+    deleted["topk"] = session.execute(delete(TopKSummary).where(TopKSummary.bucket_start < cutoff)).rowcount
+    session.commit()
+    return deleted
+
+
+def _run_retention(session: Session, last_success: datetime | None) -> str:
+    totals: dict[str, int] = {"scheduled_job": _prune_process_rows(session, datetime.utcnow())}
+    for deleted in fan_out(_retention_shard):
+        for table, rows in deleted.items():
+            totals[table] = totals.get(table, 0) + rows
+    return "deleted " + ", ".join(f"{table}={rows}" for table, rows in totals.items())
+
+
+JOBS: list[Job] = [
+    Job("rollups", settings.rollup_interval_seconds, _run_rollups),
+    Job("cache_prewarm", settings.prewarm_interval_seconds, _run_prewarm, scope="process"),
+    Job("retention", settings.retention_interval_seconds, _run_retention),
+    Job("topk_flush", settings.topk_flush_seconds, _run_topk_flush, scope="process"),
+    Job("metadata_catchup", settings.promoted_key_catchup_seconds, _run_metadata_catchup),
+]
+
+
+# ─── Lease handling ───────────────────────────────────────────────
+
+def _row_name(job: Job) -> str:
+    return job.name if job.scope == "cluster" else f"{job.name}@{OWNER}"
+
+
+def _process_row_names() -> list[str]:
+    return [_row_name(job) for job in JOBS if job.scope == "process"]
+
+
+def _prune_process_rows(session: Session, now: datetime) -> int:
+    """Delete process-job rows left by workers that exited without ``stop()``.
+
+    A live worker keeps its rows' ``next_run_at`` moving; one overdue by a full interval plus
+    the lease belongs to a worker that is gone.
+    """
+    deleted = 0
+    for job in JOBS:
+        if job.scope != "process":
+            continue
+        deleted += session.execute(
+            delete(ScheduledJob)
+            .where(ScheduledJob.name.like(f"{job.name}@%"))  # type: ignore
+            .where(ScheduledJob.next_run_at < now - timedelta(seconds=job.interval_seconds + settings.scheduler_lease_seconds))
+        ).rowcount
+    session.commit()
+    return deleted
+
+
+def _try_acquire(session: Session, name: str, now: datetime) -> bool:
+    """Atomically claim a due job whose lease is free or expired; exactly one contender wins."""
+    if session.get(ScheduledJob, name) is None:
+        try:
+            session.add(ScheduledJob(name=name, next_run_at=now))
+            session.commit()
+        except IntegrityError:
+            session.rollback()
+    result = session.execute(
+        update(ScheduledJob)
+        .where(ScheduledJob.name == name)
+        .where(ScheduledJob.next_run_at <= now)
+        .where(or_(ScheduledJob.lease_expires_at.is_(None), ScheduledJob.lease_expires_at < now))
+        .values(owner=OWNER, lease_expires_at=now + timedelta(seconds=settings.scheduler_lease_seconds), last_started_at=now)
+    )
+    session.commit()
+    return result.rowcount == 1
+
+
+def _release(session: Session, name: str, job: Job, started: float, status: str, result: str) -> None:
+    now = datetime.utcnow()
+    values = dict(
+        lease_expires_at=None,
+        last_finished_at=now,
+        last_duration_ms=round((time.perf_counter() - started) * 1000, 1),
+        last_status=status,
+        last_result=result[:500],
+        run_count=ScheduledJob.run_count + 1,
+        next_run_at=now + timedelta(seconds=job.interval_seconds + random.uniform(0, settings.scheduler_jitter_seconds)),
+    )
+    if status == "ok":
+        values["last_success_at"] = now
+    session.execute(update(ScheduledJob).where(ScheduledJob.name == name).where(ScheduledJob.owner == OWNER).values(**values))
+    session.commit()
+
+
+def run_due_jobs() -> int:
+    """Run every due job this worker can lease; returns how many ran."""
+    ran = 0
+    for job in JOBS:
+        name = _row_name(job)
+        with Session(engine) as session:
+            if not _try_acquire(session, name, datetime.utcnow()):
+                continue
+            last_success = session.get(ScheduledJob, name).last_success_at
+            started = time.perf_counter()
+            try:
+                status, result = "ok", job.run(session, last_success)
+            except Exception as exc:  # keep the loop alive; failure is recorded on the job row
+                session.rollback()
+                logger.exception("Scheduled job %s failed", job.name)
+                status, result = "error", repr(exc)
+            _release(session, name, job, started, status, result)
+            ran += 1
+    return ran
+
+
+def get_job_statuses(session: Session) -> list[ScheduledJob]:
+    return session.exec(select(ScheduledJob).order_by(ScheduledJob.name)).all()
+
+
+# ─── Background loop ──────────────────────────────────────────────
+
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def _loop() -> None:
+    # Stagger workers started together so they do not race for every lease at once
+    _stop.wait(random.uniform(0, settings.scheduler_tick_seconds))
+    while not _stop.is_set():
+        try:
+            run_due_jobs()
+        except Exception:  # pragma: no cover - e.g. database briefly unavailable
+            logger.exception("Scheduler tick failed")
+        _stop.wait(settings.scheduler_tick_seconds + random.uniform(0, settings.scheduler_tick_seconds / 2))
+
+
+def start() -> None:
+    global _thread
+    if not settings.scheduler_enabled or (_thread and _thread.is_alive()):
+        return
+    _stop.clear()
+    _thread = threading.Thread(target=_loop, name="usage-scheduler", daemon=True)
+    _thread.start()
+    logger.info("Scheduler started as %s", OWNER)
+
+
+def stop() -> None:
+    _stop.set()
+    if _thread:
+        _thread.join(timeout=10)
+        # This worker's process-job rows would otherwise linger in /analytics/jobs after a restart
+        try:
+            with Session(engine) as session:
+                session.execute(delete(ScheduledJob).where(ScheduledJob.name.in_(_process_row_names())))  # type: ignore
+                session.commit()
+        except Exception:  # pragma: no cover - e.g. database already gone at shutdown
+            logger.exception("Could not remove process job rows for %s", OWNER)
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import threading
+import time
+from fastapi import HTTPException, status
+from app.config import get_settings
+from app.db.session import read_session_for_org
+from app.services import analytics_service
+from app.services.version_service import get_data_version
+from app.utils.fast_json import dumps
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+# One producer thread per process does each org's queries once per change and encodes each
+# frame once; every subscriber of that org receives the same bytes.
+HEARTBEAT = b": heartbeat\n\n"
+RETRY_MS = 5000  # EventSource reconnect delay after a dropped connection
+
+
+class Subscriber:
+    __slots__ = ("organization_id", "loop", "queue", "resyncs")
+
+    def __init__(self, organization_id: int, loop: asyncio.AbstractEventLoop):
+        self.organization_id = organization_id
+        self.loop = loop
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(maxsize=settings.stream_queue_size)
+        self.resyncs = 0
+
+
+class _OrgFeed:
+    __slots__ = ("subscribers", "version", "snapshot", "snapshot_frame", "anomalies_at", "anomalies_version")
+
+    def __init__(self):
+        self.subscribers: set[Subscriber] = set()
+        self.version: int | None = None
+        self.snapshot: dict | None = None
+        self.snapshot_frame: bytes | None = None
+        self.anomalies_at = 0.0
+        self.anomalies_version: int | None = None
+
+
+_feeds: dict[int, _OrgFeed] = {}
+_lock = threading.Lock()
+_wake = threading.Event()
+_stop = threading.Event()
+_thread: threading.Thread | None = None
+
+
+def _frame(event: str, version: int, data: dict) -> bytes:
+    return b"event: %s\nid: %d\ndata: %s\n\n" % (event.encode(), version, dumps(data))
+
+
+def _offer(sub: Subscriber, frame: bytes, feed: _OrgFeed) -> None:
+    """Runs on the subscriber's event loop."""
+    if sub.queue.full():
+        # Slow client: replace its backlog with one snapshot instead of buffering without bound
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.resyncs += 1
+        frame = feed.snapshot_frame
+    sub.queue.put_nowait(frame)
+
+
+def _broadcast(feed: _OrgFeed, frame: bytes) -> None:
+    """Caller holds ``_lock``."""
+    for sub in feed.subscribers:
+        try:
+            sub.loop.call_soon_threadsafe(_offer, sub, frame, feed)
+        except RuntimeError:
+            pass  # loop already closed; the subscriber is being removed
+
+
+def _anomalies(session, organization_id: int) -> list[dict]:
+    from app.services import ai_service
+
+    return [a.model_dump() for a in ai_service.detect_anomalies(session, organization_id)]
+
+
+def _delta(old: dict, new: dict) -> dict:
+    delta = {"new_events": max(new["summary"]["total_events"] - old["summary"]["total_events"], 0)}
+    if new["summary"] != old["summary"]:
+        delta["summary"] = new["summary"]
+    before = {row["feature_id"]: row for row in old["feature_usage"]}
+    changed = [row for row in new["feature_usage"] if before.get(row["feature_id"]) != row]
+    if changed:
+        delta["feature_usage"] = changed
+    if new["anomalies"] != old["anomalies"]:
+        seen = {(a["feature_id"], a["score"]) for a in old["anomalies"]}
+        delta["anomalies"] = new["anomalies"]
+        delta["new_anomalies"] = sum((a["feature_id"], a["score"]) not in seen for a in new["anomalies"])
+    return delta
+
+
+def _refresh(organization_id: int, feed: _OrgFeed) -> None:
+    now = time.monotonic()
+    # Anomaly detection is the expensive part: at most once per STREAM_ANOMALY_SECONDS per org
+    anomalies_due = now - feed.anomalies_at >= settings.stream_anomaly_seconds
+    with read_session_for_org(organization_id) as session:
+        version = get_data_version(session, organization_id)
+        if feed.snapshot is not None and version == feed.version and (feed.anomalies_version == version or not anomalies_due):
+            return
+        snapshot = {
+            "summary": analytics_service.get_usage_summary(session, organization_id).model_dump(),
+            "feature_usage": analytics_service.get_feature_usage_rows(session, organization_id),
+            "anomalies": feed.snapshot["anomalies"] if feed.snapshot else [],
+        }
+        if feed.snapshot is None or (anomalies_due and feed.anomalies_version != version):
+            snapshot["anomalies"] = _anomalies(session, organization_id)
+            feed.anomalies_at, feed.anomalies_version = now, version
+    snapshot_frame = _frame("snapshot", version, snapshot)
+    with _lock:
+        previous = feed.snapshot
+        feed.version, feed.snapshot, feed.snapshot_frame = version, snapshot, snapshot_frame
+        if previous is None:
+            _broadcast(feed, snapshot_frame)
+        elif previous != snapshot:
+            _broadcast(feed, _frame("delta", version, _delta(previous, snapshot)))
+
+
+def _run() -> None:
+    while not _stop.is_set():
+        _wake.wait(settings.stream_poll_seconds)
+        _wake.clear()
+        with _lock:
+            feeds = [(org_id, feed) for org_id, feed in _feeds.items() if feed.subscribers]
+        for organization_id, feed in feeds:
+            try:
+                _refresh(organization_id, feed)
+            except Exception:
+                logger.exception("Stream refresh failed for org %s", organization_id)
+
+
+def _ensure_producer() -> None:
+    global _thread
+    if _thread is None or not _thread.is_alive():
+        _stop.clear()
+        _thread = threading.Thread(target=_run, name="stream-producer", daemon=True)
+        _thread.start()
+
+
+def subscribe(organization_id: int) -> Subscriber:
+    """Register the caller's event loop for the org's feed; the first frame is a full snapshot."""
+    sub = Subscriber(organization_id, asyncio.get_running_loop())
+    with _lock:
+        feed = _feeds.setdefault(organization_id, _OrgFeed())
+        if len(feed.subscribers) >= settings.stream_max_subscribers_per_org:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many live streams for organization",
+                headers={"Retry-After": str(int(settings.stream_heartbeat_seconds))},
+            )
+        feed.subscribers.add(sub)
+        if feed.snapshot_frame is not None:
+            sub.queue.put_nowait(feed.snapshot_frame)
+        _ensure_producer()
+    _wake.set()
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    with _lock:
+        feed = _feeds.get(sub.organization_id)
+        if feed is None:
+            return
+        feed.subscribers.discard(sub)
+        if not feed.subscribers:
+            del _feeds[sub.organization_id]
+
+
+async def frames(sub: Subscriber, is_disconnected):
+    """SSE body: queued frames, with a comment heartbeat whenever the feed is quiet."""
+    try:
+        yield b"retry: %d\n\n" % RETRY_MS
+        while True:
+            try:
+                frame = await asyncio.wait_for(sub.queue.get(), timeout=settings.stream_heartbeat_seconds)
+            except asyncio.TimeoutError:
+                if await is_disconnected():
+                    return
+                frame = HEARTBEAT
+            yield frame
+    finally:
+        unsubscribe(sub)
+
+
+def stop() -> None:
+    _stop.set()
+    _wake.set()
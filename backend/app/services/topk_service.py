@@ -0,0 +1,167 @@
+import logging
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from sqlalchemy import delete
+from sqlmodel import Session, select
+from app.config import get_settings
+from app.db.session import session_for_org
+from app.models.topk_summary import TopKSummary
+from app.models.user import User
+from app.schemas.analytics_schema import TopItem, TopResponse
+from app.services.analytics_service import get_feature_names
+from app.utils.time_buckets import floor_bucket
+from app.utils.topk import SpaceSaving
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ("features", "users", "event_types")
+WINDOWS = {"hour": timedelta(hours=1), "day": timedelta(days=1), "week": timedelta(days=7)}
+ROLLUP_SOURCE = "rollup"
+
+# Ingest adds each event to this process's per-(org, dimension, hour) summaries; flush() merges
+# them into the process's own TopKSummary rows. Once aggregate_daily has rebuilt an hour from
+# raw events, its exact "rollup" row replaces the streamed rows for that hour.
+_live: dict[tuple[int, str, datetime], SpaceSaving] = {}
+_live_since: float | None = None  # monotonic time of the oldest pending count
+_lock = threading.Lock()
+# Held while merging into the DB, so two flushes never read-modify-write the same row
+_flush_lock = threading.Lock()
+
+
+def _oldest_hour() -> datetime:
+    # Hours before this are outside every window, so their counts are never read
+    return floor_bucket(datetime.utcnow() - max(WINDOWS.values()), "hourly")
+
+
+def record(organization_id: int, feature_id: int, user_id: int | None, event_type: str, timestamp: datetime) -> None:
+    global _live_since
+    hour = floor_bucket(timestamp, "hourly")
+    if hour < _oldest_hour():
+        return
+    now = time.monotonic()
+    with _lock:
+        for dimension, item in (("features", feature_id), ("users", user_id), ("event_types", event_type)):
+            if item is None:
+                continue
+            summary = _live.get((organization_id, dimension, hour))
+            if summary is None:
+                summary = _live[(organization_id, dimension, hour)] = SpaceSaving(settings.topk_capacity)
+            summary.add(item)
+        if _live_since is None:
+            _live_since = now
+        due = len(_live) >= settings.topk_max_pending or now - _live_since >= 2 * settings.topk_flush_seconds
+    # The topk_flush job normally empties _live first; without it, ingest keeps it bounded
+    if due and _flush_lock.acquire(blocking=False):
+        from app.services.scheduler_service import OWNER
+
+        try:
+            _flush(OWNER)
+        finally:
+            _flush_lock.release()
+
+
+def flush(source: str) -> int:
+    """Merge the pending in-memory summaries into this process's rows; returns rows written."""
+    with _flush_lock:
+        return _flush(source)
+
+
+def _flush(source: str) -> int:
+    global _live, _live_since
+    with _lock:
+        pending, _live, _live_since = _live, {}, None
+    oldest = _oldest_hour()
+    by_org: dict[int, list] = defaultdict(list)
+    for (organization_id, dimension, hour), summary in pending.items():
+        if hour >= oldest:
+            by_org[organization_id].append((dimension, hour, summary))
+
+    written = 0
+    for organization_id, items in by_org.items():
+        try:
+            with session_for_org(organization_id) as session:
+                for dimension, hour, summary in items:
+                    row = session.exec(
+                        select(TopKSummary)
+                        .where(TopKSummary.organization_id == organization_id)
+                        .where(TopKSummary.dimension == dimension)
+                        .where(TopKSummary.bucket_start == hour)
+                        .where(TopKSummary.source == source)
+                    ).first()
+                    if row is None:
+                        session.add(TopKSummary(
+                            organization_id=organization_id, dimension=dimension, bucket_start=hour,
+                            source=source, summary=summary.to_bytes(),
+                        ))
+                    else:
+                        stored = SpaceSaving.from_bytes(row.summary)
+                        row.summary = SpaceSaving.merged([stored, summary], settings.topk_capacity).to_bytes()
+                    written += 1
+                session.commit()
+        except Exception:
+            # Closed hours are rebuilt exactly by the next rollup, so only recent counts are at stake
+            logger.exception("Top-K flush failed for org %s", organization_id)
+    return written
+
+
+def write_rollup(session: Session, summaries: dict[tuple[int, str, datetime], SpaceSaving], start: datetime, end: datetime) -> None:
+    """Replace every summary row for hours in [start, end) with the exact ``summaries``."""
+    session.execute(
+        delete(TopKSummary).where(TopKSummary.bucket_start >= start).where(TopKSummary.bucket_start < end)
+    )
+    session.add_all([
+        TopKSummary(
+            organization_id=organization_id, dimension=dimension, bucket_start=hour,
+            source=ROLLUP_SOURCE, summary=summary.to_bytes(),
+        )
+        for (organization_id, dimension, hour), summary in summaries.items()
+    ])
+
+
+def _window_summaries(session: Session, organization_id: int, since: datetime) -> dict[str, SpaceSaving]:
+    rows = session.exec(
+        select(TopKSummary.dimension, TopKSummary.bucket_start, TopKSummary.source, TopKSummary.summary)
+        .where(TopKSummary.organization_id == organization_id)
+        .where(TopKSummary.bucket_start >= since)
+    ).all()
+    per_hour: dict[tuple[str, datetime], list[tuple[str, bytes]]] = defaultdict(list)
+    for dimension, hour, source, blob in rows:
+        per_hour[(dimension, hour)].append((source, blob))
+
+    parts: dict[str, list[SpaceSaving]] = defaultdict(list)
+    for (dimension, _), sources in per_hour.items():
+        exact = [blob for source, blob in sources if source == ROLLUP_SOURCE]
+        parts[dimension].extend(SpaceSaving.from_bytes(blob) for blob in exact or [blob for _, blob in sources])
+    return {dimension: SpaceSaving.merged(parts.get(dimension, []), settings.topk_capacity) for dimension in DIMENSIONS}
+
+
+def get_top(session: Session, organization_id: int, window: str = "day", k: int = 10) -> TopResponse:
+    """Heaviest features, users and event types over the window, merged from hourly summaries.
+
+    Cost depends on the number of hours and summary capacity, not on event volume. The window
+    starts at the top of the hour ``window`` ago, so it covers up to one hour more than asked.
+    """
+    since = floor_bucket(datetime.utcnow() - WINDOWS[window], "hourly")
+    merged = _window_summaries(session, organization_id, since)
+    top = {dimension: merged[dimension].top(k) for dimension in DIMENSIONS}
+
+    fname_map = get_feature_names(session, organization_id)
+    user_ids = [item for item, _, _ in top["users"]]
+    emails = dict(session.exec(
+        select(User.id, User.email).where(User.organization_id == organization_id).where(User.id.in_(user_ids))  # type: ignore
+    ).all()) if user_ids else {}
+    names = {"features": fname_map, "users": emails, "event_types": {}}
+    return TopResponse(
+        window=window,
+        since=since,
+        **{
+            dimension: [
+                TopItem(key=item, name=names[dimension].get(item), count=count, error=error)
+                for item, count, error in top[dimension]
+            ]
+            for dimension in DIMENSIONS
+        },
+    )
@@ -1,9 +1,13 @@
 from datetime import datetime
 from fastapi import HTTPException, status
 from sqlmodel import Session
+from app.db.session import invalidate_shard_cache
+from app.models.shard_fence import ShardFence
 from app.models.usage_log import UsageLog
 from app.models.feature import Feature
 from app.schemas.usage_schema import UsageEventCreate
+from app.services import metadata_service, topk_service
+from app.services.version_service import bump_data_version
 
 
 def track_event(data: UsageEventCreate, session: Session) -> UsageLog:
@@ -20,6 +24,19 @@ def track_event(data: UsageEventCreate, session: Session) -> UsageLog:
         timestamp=datetime.utcnow(),
     )
     session.add(usage)
+    bump_data_version(session, data.organization_id)
+    metadata_service.record_event_metadata(session, usage)
+    # Checked after the DataVersion update: move_org takes that row lock when it fences, so a
+    # write either commits before the copy starts or sees the fence here
+    if session.get(ShardFence, data.organization_id) is not None:
+        session.rollback()
+        invalidate_shard_cache(data.organization_id)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Organization is moving to another shard; retry shortly",
+            headers={"Retry-After": "1"},
+        )
     session.commit()
     session.refresh(usage)
+    topk_service.record(usage.organization_id, usage.feature_id, usage.user_id, usage.event_type, usage.timestamp)
     return usage
@@ -0,0 +1,99 @@
+import hashlib
+from datetime import date, datetime
+from fastapi import Depends, HTTPException, Request, Response, status
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from app.db.session import get_read_session, mark_written
+from app.models.data_version import DataVersion
+from app.services.auth_service import get_current_user
+
+
+def get_data_version(session: Session, organization_id: int) -> int:
+    version = session.exec(
+        select(DataVersion.version).where(DataVersion.organization_id == organization_id)
+    ).first()
+    return int(version or 0)
+
+
+def _increment(session: Session, organization_id: int) -> int:
+    result = session.execute(
+        update(DataVersion)
+        .where(DataVersion.organization_id == organization_id)
+        .values(version=DataVersion.version + 1, updated_at=datetime.utcnow())
+    )
+    return result.rowcount
+
+
+def bump_data_version(session: Session, organization_id: int) -> None:
+    """Advance the org's data version inside the caller's transaction (caller commits)."""
+    if _increment(session, organization_id) == 0:
+        # First write for the org. Insert under a savepoint so that losing the race to a
+        # concurrent first write falls back to an increment instead of failing the request.
+        try:
+            with session.begin_nested():
+                session.add(DataVersion(organization_id=organization_id, version=1))
+        except IntegrityError:
+            _increment(session, organization_id)
+    mark_written(organization_id)
+
+
+def org_etag(organization_id: int, version: int, variant: str = "") -> str:
+    # Weak: the same tag covers the br, gzip and identity bodies served under Vary: Accept-Encoding
+    return f'W/"org{organization_id}-v{version}{"-" + variant if variant else ""}"'
+
+
+def _clock_token(clock: str | None) -> str:
+    if clock == "day":
+        return date.today().isoformat()  # same basis as the routes' default date windows
+    if clock == "hour":
+        # The local date too: with a half-hour offset it changes inside a UTC hour
+        return f"{date.today().isoformat()}/{datetime.utcnow():%Y-%m-%dT%H}"
+    return ""
+
+
+def _request_variant(request: Request, clock: str | None = None) -> str:
+    """Digest of the query params and, for windows counted back from now, the current ``clock`` bucket."""
+    params = sorted(request.query_params.multi_items())
+    if not params and clock is None:
+        return ""
+    return hashlib.blake2b(repr((params, _clock_token(clock))).encode(), digest_size=6).hexdigest()
+
+
+def etag_headers(etag: str) -> dict[str, str]:
+    return {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    # If-None-Match uses weak comparison (RFC 9110 13.1.2), so W/ prefixes are ignored
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
+
+
+def etag_guard_for(clock: str | None = None):
+    """Build a route dependency that short-circuits with 304 when the client already holds the current version.
+
+    The tag covers the org's data version and the query params. Routes whose default window is
+    counted back from now pass ``clock`` ("hour" or "day") so the tag also rolls over with it.
+    """
+
+    def etag_guard(
+        request: Request,
+        response: Response,
+        session: Session = Depends(get_read_session),
+        current_user=Depends(get_current_user),
+    ) -> str:
+        org_id = current_user.organization_id
+        etag = org_etag(org_id, get_data_version(session, org_id), _request_variant(request, clock))
+        headers = etag_headers(etag)
+        if _etag_matches(request.headers.get("if-none-match"), etag):
+            raise HTTPException(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+        return etag
+
+    return etag_guard
+
+
+etag_guard = etag_guard_for()
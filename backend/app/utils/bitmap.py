@@ -0,0 +1,241 @@
+import struct
+
+ARRAY_MAX = 4096  # a container with more members is stored as a 65536-bit bitset (8 KiB)
+_ARRAY, _BITSET = 0, 1
+_HEADER = struct.Struct("<I")  # container count
+_CONTAINER = struct.Struct("<IBI")  # high bits, kind, element count
+
+
+def _is_bitset(container) -> bool:
+    return container.dtype.itemsize == 8
+
+
+def _cardinality(container) -> int:
+    import numpy as np
+
+    return int(np.bitwise_count(container).sum()) if _is_bitset(container) else len(container)
+
+
+def _to_bitset(values):
+    import numpy as np
+
+    flags = np.zeros(1 << 16, dtype=bool)
+    flags[values] = True
+    return np.packbits(flags, bitorder="little").view("<u8")
+
+
+def _to_array(words):
+    import numpy as np
+
+    return np.flatnonzero(np.unpackbits(words.view(np.uint8), bitorder="little")).astype(np.uint16)
+
+
+def _normalize(container):
+    """Pick the smaller representation for a container's cardinality; None when empty."""
+    if _is_bitset(container):
+        n = _cardinality(container)
+        if n == 0:
+            return None
+        return _to_array(container) if n <= ARRAY_MAX else container
+    if len(container) == 0:
+        return None
+    return _to_bitset(container) if len(container) > ARRAY_MAX else container
+
+
+def _sorted_unique(values):
+    # np.unique hashes in numpy 2.x, which is slower than a sort at these sizes
+    import numpy as np
+
+    values = np.sort(values)
+    keep = np.empty(len(values), dtype=bool)
+    keep[:1] = True
+    np.not_equal(values[1:], values[:-1], out=keep[1:])
+    return values[keep]
+
+
+def _member_of_array(values, sorted_values):
+    import numpy as np
+
+    if len(sorted_values) == 0:
+        return np.zeros(len(values), dtype=bool)
+    idx = np.searchsorted(sorted_values, values)
+    idx[idx == len(sorted_values)] = 0
+    return sorted_values[idx] == values
+
+
+def _member_of_bitset(values, words):
+    import numpy as np
+
+    return ((words[values >> 6] >> (values & 63).astype(np.uint64)) & 1).astype(bool)
+
+
+def _and(a, b):
+    if _is_bitset(a) and _is_bitset(b):
+        return _normalize(a & b)
+    if _is_bitset(a):
+        a, b = b, a
+    return _normalize(a[_member_of_bitset(a, b) if _is_bitset(b) else _member_of_array(a, b)])
+
+
+def _or(a, b):
+    import numpy as np
+
+    if not _is_bitset(a) and not _is_bitset(b):
+        return _normalize(_sorted_unique(np.concatenate((a, b))))
+    return _normalize((a if _is_bitset(a) else _to_bitset(a)) | (b if _is_bitset(b) else _to_bitset(b)))
+
+
+def _andnot(a, b):
+    if _is_bitset(a):
+        return _normalize(a & ~(b if _is_bitset(b) else _to_bitset(b)))
+    return _normalize(a[~(_member_of_bitset(a, b) if _is_bitset(b) else _member_of_array(a, b))])
+
+
+class RoaringBitmap:
+    """Compressed set of non-negative integer ids in the layout of Roaring bitmaps (Chambi et al., 2016).
+
+    Ids are split on their high bits into containers of 2**16 values each: a sparse container is a
+    sorted uint16 array, a dense one (more than ``ARRAY_MAX`` members) a 1024-word bitset. AND, OR
+    and ANDNOT run container by container, so their cost follows the operands' sizes, not the id range.
+    """
+
+    __slots__ = ("containers",)
+
+    def __init__(self, containers: dict | None = None):
+        self.containers: dict = containers if containers is not None else {}
+
+    @classmethod
+    def from_ids(cls, ids) -> "RoaringBitmap":
+        import numpy as np
+
+        values = _sorted_unique(np.asarray(ids, dtype=np.int64))
+        if len(values) and values[0] < 0:
+            raise ValueError("RoaringBitmap holds non-negative ids only")
+        highs = values >> 16
+        bounds = np.flatnonzero(np.diff(highs)) + 1
+        containers = {}
+        for chunk in np.split(values, bounds) if len(values) else []:
+            containers[int(chunk[0] >> 16)] = _normalize((chunk & 0xFFFF).astype(np.uint16))
+        return cls(containers)
+
+    @classmethod
+    def union(cls, bitmaps) -> "RoaringBitmap":
+        """OR of any number of bitmaps, merging each container key once."""
+        import numpy as np
+
+        by_key: dict[int, list] = {}
+        for bitmap in bitmaps:
+            for key, container in bitmap.containers.items():
+                by_key.setdefault(key, []).append(container)
+        containers = {}
+        for key, parts in by_key.items():
+            if len(parts) == 1:
+                containers[key] = parts[0]
+                continue
+            words = [p for p in parts if _is_bitset(p)]
+            arrays = [p for p in parts if not _is_bitset(p)]
+            merged = np.concatenate(arrays) if arrays else np.empty(0, dtype=np.uint16)
+            if not words and len(merged) <= ARRAY_MAX:
+                containers[key] = _sorted_unique(merged)
+                continue
+            # Large unions are cheaper as bitsets: setting flags is linear, sorting is not
+            acc = _to_bitset(merged)
+            for w in words:
+                acc |= w
+            containers[key] = _normalize(acc)
+        return cls(containers)
+
+    def __len__(self) -> int:
+        return sum(_cardinality(c) for c in self.containers.values())
+
+    def _combine(self, other: "RoaringBitmap", op, keys) -> "RoaringBitmap":
+        containers = {}
+        for key in keys:
+            mine, theirs = self.containers.get(key), other.containers.get(key)
+            if theirs is None:
+                result = mine if op is not _and else None
+            elif mine is None:
+                result = theirs if op is _or else None
+            else:
+                result = op(mine, theirs)
+            if result is not None:
+                containers[key] = result
+        return RoaringBitmap(containers)
+
+    def __and__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _and, self.containers.keys() & other.containers.keys())
+
+    def __or__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _or, self.containers.keys() | other.containers.keys())
+
+    def __sub__(self, other: "RoaringBitmap") -> "RoaringBitmap":
+        return self._combine(other, _andnot, self.containers.keys())
+
+    def to_ids(self):
+        import numpy as np
+
+        parts = [
+            (_to_array(c) if _is_bitset(c) else c).astype(np.int64) + (key << 16)
+            for key, c in sorted(self.containers.items())
+        ]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def to_bytes(self) -> bytes:
+        out = [_HEADER.pack(len(self.containers))]
+        for key, container in sorted(self.containers.items()):
+            kind = _BITSET if _is_bitset(container) else _ARRAY
+            out.append(_CONTAINER.pack(key, kind, len(container)))
+            out.append(container.astype("<u8" if kind == _BITSET else "<u2").tobytes())
+        return b"".join(out)
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "RoaringBitmap":
+        import numpy as np
+
+        (n,) = _HEADER.unpack_from(blob)
+        offset = _HEADER.size
+        containers = {}
+        for _ in range(n):
+            key, kind, count = _CONTAINER.unpack_from(blob, offset)
+            offset += _CONTAINER.size
+            dtype = "<u8" if kind == _BITSET else "<u2"
+            containers[key] = np.frombuffer(blob, dtype=dtype, count=count, offset=offset)
+            offset += count * np.dtype(dtype).itemsize
+        return cls(containers)
+
+
+def intersection_counts(probes: list[RoaringBitmap], targets: list[RoaringBitmap]):
+    """``|probes[i] AND targets[j]|`` for every pair, as a len(probes) x len(targets) int64 matrix.
+
+    Per container key the targets are laid out once as a dense (value x target) flag matrix, so a
+    sparse probe costs one gather of its members' rows instead of one set intersection per pair;
+    a dense probe ANDs and popcounts against the targets' bitsets.
+    """
+    import numpy as np
+
+    counts = np.zeros((len(probes), len(targets)), dtype=np.int64)
+    keys = {key for probe in probes for key in probe.containers}
+    for key in keys:
+        columns = [(j, t.containers[key]) for j, t in enumerate(targets) if key in t.containers]
+        if not columns:
+            continue
+        flags = np.zeros((1 << 16, len(targets)), dtype=bool)
+        for j, container in columns:
+            if _is_bitset(container):
+                flags[:, j] = np.unpackbits(container.view(np.uint8), bitorder="little")
+            else:
+                flags[container, j] = True
+        block = None
+        for i, probe in enumerate(probes):
+            container = probe.containers.get(key)
+            if container is None:
+                continue
+            if not _is_bitset(container):
+                counts[i] += flags[container].sum(axis=0, dtype=np.int64)
+                continue
+            if block is None:
+                block = np.zeros((len(targets), 1 << 10), dtype="<u8")
+                for j, target_container in columns:
+                    block[j] = target_container if _is_bitset(target_container) else _to_bitset(target_container)
+            counts[i] += np.bitwise_count(block & container).sum(axis=1, dtype=np.int64)
+    return counts
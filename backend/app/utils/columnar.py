@@ -0,0 +1,72 @@
+import numpy as np
+from sqlmodel import Session
+
+# Rows never become SQLAlchemy Row objects: each fetchmany() chunk of driver tuples is parsed
+# once by np.fromiter into a typed record buffer, then copied into preallocated column arrays.
+CHUNK_ROWS = 65536
+
+
+def load_columns(
+    session: Session,
+    stmt,
+    dtypes: dict[str, str],
+    chunk_rows: int = CHUNK_ROWS,
+    expected_rows: int | None = None,
+) -> dict[str, np.ndarray]:
+    """Run ``stmt`` and return ``{name: array}`` in select order, typed by ``dtypes``.
+
+    Integer columns must not be NULL (COALESCE them in SQL); NULL floats become NaN. Datetime
+    columns ("M8[us]") accept both driver datetimes and SQLite's ISO strings. ``expected_rows``
+    sizes the first allocation; otherwise arrays grow geometrically.
+    """
+    record = np.dtype(list(dtypes.items()))
+    capacity = max(expected_rows or chunk_rows, 1)
+    columns = {name: np.empty(capacity, dtype=record[name]) for name in dtypes}
+    n = 0
+    if session.autoflush:
+        session.flush()  # match session.exec(): pending ORM writes are visible to the query
+    result = session.connection().execute(stmt)
+    cursor = result.cursor
+    try:
+        while rows := cursor.fetchmany(chunk_rows):
+            k = len(rows)
+            chunk = np.fromiter(rows, dtype=record, count=k)
+            if n + k > capacity:
+                capacity = max(capacity * 2, n + k)
+                for name, col in columns.items():
+                    grown = np.empty(capacity, dtype=col.dtype)
+                    grown[:n] = col[:n]
+                    columns[name] = grown
+            for name in dtypes:
+                columns[name][n:n + k] = chunk[name]
+            n += k
+    finally:
+        result.close()
+    # Release the unused tail when it is more than a chunk
+    return {name: col[:n] if capacity - n <= chunk_rows else col[:n].copy() for name, col in columns.items()}
+
+
+def group_by(*keys: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Distinct key tuples (one row each, sorted) and each input row's group index."""
+    if not len(keys[0]):
+        return np.empty((0, len(keys)), dtype=np.int64), np.empty(0, dtype=np.int64)
+    stacked = np.column_stack([np.asarray(k).astype(np.int64, copy=False) for k in keys])
+    uniq, inverse = np.unique(stacked, axis=0, return_inverse=True)
+    return uniq, inverse.reshape(-1)
+
+
+def count_distinct(groups: np.ndarray, values: np.ndarray, n_groups: int, mask: np.ndarray | None = None) -> np.ndarray:
+    """Number of distinct ``values`` per group index (rows outside ``mask`` are ignored)."""
+    if mask is not None:
+        groups, values = groups[mask], values[mask]
+    if not len(groups):
+        return np.zeros(n_groups, dtype=np.int64)
+    pairs = np.unique(np.column_stack([groups, values.astype(np.int64, copy=False)]), axis=0)
+    return np.bincount(pairs[:, 0], minlength=n_groups)
+
+
+def split_by_group(values: np.ndarray, groups: np.ndarray, n_groups: int) -> list[np.ndarray]:
+    """Partition ``values`` into one array per group index."""
+    order = np.argsort(groups, kind="stable")
+    bounds = np.cumsum(np.bincount(groups, minlength=n_groups))[:-1]
+    return np.split(values[order], bounds)
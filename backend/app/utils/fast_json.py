@@ -0,0 +1,46 @@
+import gzip
+import logging
+import orjson
+from fastapi import Request, Response
+from app.config import get_settings
+
+settings = get_settings()
+logger = logging.getLogger(__name__)
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+    logger.info("brotli not installed; large responses will use gzip only")
+
+_ORJSON_OPTS = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+
+
+def dumps(payload) -> bytes:
+    return orjson.dumps(payload, option=_ORJSON_OPTS)
+
+
+def _accepts(request: Request, encoding: str) -> bool:
+    accepted = request.headers.get("accept-encoding", "")
+    return any(part.split(";")[0].strip() == encoding for part in accepted.split(","))
+
+
+def compress(request: Request, body: bytes) -> tuple[bytes, str | None]:
+    """Return (body, content-encoding); only bodies above the configured threshold are compressed."""
+    if len(body) < settings.compression_min_bytes:
+        return body, None
+    if brotli is not None and _accepts(request, "br"):
+        return brotli.compress(body, quality=4), "br"
+    if _accepts(request, "gzip"):
+        return gzip.compress(body, compresslevel=5), "gzip"
+    return body, None
+
+
+def json_response(request: Request, payload, headers: dict[str, str] | None = None) -> Response:
+    """Serialize plain dicts/lists/NumPy arrays with orjson, bypassing response_model validation."""
+    body, encoding = compress(request, dumps(payload))
+    out_headers = dict(headers or {})
+    out_headers["Vary"] = "Accept-Encoding"
+    if encoding:
+        out_headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=out_headers)
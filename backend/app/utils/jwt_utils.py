@@ -6,6 +6,8 @@ from app.config import get_settings
 
 settings = get_settings()
 
+STREAM_SCOPE = "stream"
+
 
 def create_access_token(subject: str, org_id: int, role: str, expires_minutes: int | None = None) -> str:
     expires_delta = expires_minutes or settings.access_token_expire_minutes
@@ -14,6 +16,13 @@ def create_access_token(subject: str, org_id: int, role: str, expires_minutes: i
     return jwt.encode(payload, settings.secret_key, algorithm="HS256")
 
 
+def create_stream_ticket(subject: str, org_id: int) -> str:
+    """Short-lived token that can only open /analytics/stream, so it can sit in a URL (and access logs)."""
+    expire = datetime.utcnow() + timedelta(seconds=settings.stream_ticket_seconds)
+    payload: Dict[str, Any] = {"sub": subject, "org": org_id, "scope": STREAM_SCOPE, "exp": expire}
+    return jwt.encode(payload, settings.secret_key, algorithm="HS256")
+
+
 def decode_token(token: str) -> Dict[str, Any]:
     try:
         return jwt.decode(token, settings.secret_key, algorithms=["HS256"])
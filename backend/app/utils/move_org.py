@@ -0,0 +1,146 @@
+import argparse
+from datetime import datetime
+
+from sqlalchemy import Table, delete, insert, select, update
+from sqlmodel import Session
+
+from app.db.session import PRIMARY_SHARD, engine, engines, init_db, invalidate_shard_cache, shard_for_org
+from app.models.aggregated_usage import AggregatedUsage
+from app.models.data_version import DataVersion
+from app.models.duration_sketch import DurationSketch
+from app.models.user_bitmap import SeenBitmap, UserBitmap
+from app.models.topk_summary import TopKSummary
+from app.models.event_metadata import EventMetadata, PromotedKey
+from app.models.feature import Feature
+from app.models.organization import Organization
+from app.models.rollup_usage import HourlyUsage, MonthlyUsage, WeeklyUsage
+from app.models.shard_fence import ShardFence
+from app.models.tenant_shard import TenantShard
+from app.models.usage_log import UsageLog
+from app.models.user import User
+from app.models.user_daily_usage import UserDailyUsage
+from app.services import metadata_service
+from app.services.version_service import bump_data_version
+
+# Authoritative on the primary; shards hold copies with the same ids
+IDENTITY_TABLES: list[Table] = [Organization.__table__, User.__table__, Feature.__table__]
+# Owned by the org's shard, in foreign-key order. Surrogate ids are reassigned on the target
+# (nothing references them), so rows from different shards never collide.
+TENANT_TABLES: list[Table] = [
+    DataVersion.__table__,
+    UsageLog.__table__,
+    AggregatedUsage.__table__,
+    HourlyUsage.__table__,
+    WeeklyUsage.__table__,
+    MonthlyUsage.__table__,
+    DurationSketch.__table__,
+    UserDailyUsage.__table__,
+    UserBitmap.__table__,
+    SeenBitmap.__table__,
+    TopKSummary.__table__,
+    PromotedKey.__table__,
+]
+# Keyed on UsageLog ids, which change on copy: deleted with the org and rebuilt on the target
+DERIVED_TABLES: list[Table] = [EventMetadata.__table__]
+BATCH_SIZE = 5000
+
+
+def _org_filter(table: Table, organization_id: int):
+    column = table.c.id if table is Organization.__table__ else table.c.organization_id
+    return column == organization_id
+
+
+def _copy(src: Session, dst: Session, table: Table, organization_id: int, keep_ids: bool) -> int:
+    columns = [c for c in table.columns if keep_ids or c.name != "id"]
+    result = src.execute(select(*columns).where(_org_filter(table, organization_id)))
+    copied = 0
+    while batch := result.mappings().fetchmany(BATCH_SIZE):
+        dst.execute(insert(table), [dict(row) for row in batch])
+        copied += len(batch)
+    return copied
+
+
+def _owned_tables(shard: str) -> list[Table]:
+    tables = TENANT_TABLES + DERIVED_TABLES
+    return tables if shard == PRIMARY_SHARD else IDENTITY_TABLES + tables
+
+
+def _delete(session: Session, tables: list[Table], organization_id: int) -> None:
+    for table in reversed(tables):
+        session.execute(delete(table).where(_org_filter(table, organization_id)))
+
+
+def move_org(organization_id: int, target: str) -> dict[str, int]:
+    """Fence the org on its source shard, copy its rows to ``target``, repoint the shard map,
+    then delete them from the source.
+
+    From the fence on, ingest that reaches the source (a worker whose shard-map cache still
+    points there, for up to SHARD_MAP_CACHE_SECONDS) gets a 503 and re-resolves the shard, so
+    no event is written to rows about to be deleted. The fence stays on the source until the
+    org moves back.
+    """
+    if target not in engines:
+        raise ValueError(f"Unknown shard '{target}'; configured: {', '.join(engines)}")
+    source = shard_for_org(organization_id, use_cache=False)
+    if source == target:
+        return {}
+    copied: dict[str, int] = {}
+    with Session(engine) as primary, Session(engines[source]) as src, Session(engines[target]) as dst:
+        if primary.get(Organization, organization_id) is None:
+            raise ValueError(f"Organization {organization_id} not found")
+        # Fence first, taking the DataVersion row lock that ingest holds until it commits, so
+        # every event either is committed before the copy or sees the fence and is refused
+        src.merge(ShardFence(organization_id=organization_id, moved_to=target))
+        bump_data_version(src, organization_id)
+        src.commit()
+
+        _delete(dst, _owned_tables(target), organization_id)  # leftovers from an interrupted move
+        dst.execute(delete(ShardFence).where(ShardFence.organization_id == organization_id))  # moving back
+        if target != PRIMARY_SHARD:
+            for table in IDENTITY_TABLES:
+                copied[table.name] = _copy(primary, dst, table, organization_id, keep_ids=True)
+        for table in TENANT_TABLES:
+            copied[table.name] = _copy(src, dst, table, organization_id, keep_ids=table is DataVersion.__table__)
+        dst.flush()
+        copied[EventMetadata.__tablename__] = metadata_service.backfill(
+            dst, organization_id, metadata_service.get_promoted_keys(dst, organization_id, use_cache=False)
+        )
+        # That backfill covered every copied event; the source's watermarks mean nothing here
+        dst.execute(
+            update(PromotedKey)
+            .where(PromotedKey.organization_id == organization_id)
+            .where(PromotedKey.caught_up_at.is_(None))
+            .values(caught_up_at=datetime.utcnow())
+        )
+        bump_data_version(dst, organization_id)  # row ids changed, so cached payloads/ETags must too
+        dst.commit()
+
+        mapping = primary.get(TenantShard, organization_id)
+        if target == PRIMARY_SHARD:
+            if mapping:
+                primary.delete(mapping)
+        elif mapping:
+            mapping.shard, mapping.moved_at = target, datetime.utcnow()
+            primary.add(mapping)
+        else:
+            primary.add(TenantShard(organization_id=organization_id, shard=target))
+        primary.commit()
+        invalidate_shard_cache(organization_id)
+
+        _delete(src, _owned_tables(source), organization_id)
+        src.commit()
+    return copied
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move an organization's data to another shard")
+    parser.add_argument("--org", type=int, required=True, help="Organization id")
+    parser.add_argument("--to", required=True, help=f"Target shard name ('{PRIMARY_SHARD}' or a SHARD_URLS key)")
+    args = parser.parse_args()
+
+    init_db()
+    counts = move_org(args.org, args.to)
+    if not counts:
+        print(f"Organization {args.org} is already on shard '{args.to}'.")
+    else:
+        print(f"Moved organization {args.org} to shard '{args.to}': " + ", ".join(f"{t}={n}" for t, n in counts.items()))
@@ -11,6 +11,7 @@ from app.models.user import User
 from app.models.feature import Feature
 from app.models.usage_log import UsageLog
 from app.services.auth_service import hash_password
+from app.services.version_service import bump_data_version
 
 
 DATASET_NAME = "DukeNLPGroup/movielens-100k"
@@ -101,6 +102,8 @@ def _seed_hf(session: Session, split: str, orgs: int, anomalies: bool, limit: in
         )
         session.add(usage)
 
+    for org in org_lookup.values():
+        bump_data_version(session, org.id)
     session.commit()
 
 
@@ -111,8 +114,6 @@ def seed(orgs: int = 3, anomalies: bool = True, split: str = "train", limit: int
 
 def ensure_demo_user() -> None:
     """Ensure demo org, users, features, usage logs, and aggregated data exist."""
-    from app.models.aggregated_usage import AggregatedUsage
-
     with Session(engine) as session:
         # --- Org ---
         org = session.exec(select(Organization).where(Organization.name == "Demo Org")).first()
@@ -147,17 +148,18 @@ def ensure_demo_user() -> None:
             "Data Export", "Real-time Alerts", "API Gateway",
             "Search Engine", "Notification Hub",
         ]
-        features: list[Feature] = []
-        for fname in feature_names:
-            f = session.exec(
-                select(Feature).where(Feature.name == fname, Feature.organization_id == org.id)
-            ).first()
-            if not f:
-                f = Feature(name=fname, organization_id=org.id)
-                session.add(f)
-                session.commit()
+        existing_features = {
+            f.name: f
+            for f in session.exec(select(Feature).where(Feature.organization_id == org.id)).all()
+        }
+        missing = [Feature(name=fname, organization_id=org.id) for fname in feature_names if fname not in existing_features]
+        if missing:
+            session.add_all(missing)
+            session.commit()
+            for f in missing:
                 session.refresh(f)
-            features.append(f)
+                existing_features[f.name] = f
+        features: list[Feature] = [existing_features[fname] for fname in feature_names]
 
         # --- Skip if usage data already exists ---
         has_logs = session.exec(
@@ -196,42 +198,12 @@ def ensure_demo_user() -> None:
                         timestamp=ts,
                     )
                     session.add(log)
-            session.commit()  # commit each day batch
+        session.commit()  # single commit for the whole 30-day batch
 
-        # --- Build AggregatedUsage from UsageLogs ---
-        from collections import defaultdict as _defaultdict
-        from datetime import date as _date
+        # --- Build daily/hourly/weekly/monthly rollups from UsageLogs ---
+        from app.services.aggregation_service import aggregate_range
 
-        all_logs = session.exec(
-            select(UsageLog).where(UsageLog.organization_id == org.id)
-        ).all()
-        bucket: dict[tuple[int, _date], list[UsageLog]] = _defaultdict(list)
-        for lg in all_logs:
-            d = lg.timestamp.date() if hasattr(lg.timestamp, "date") else lg.timestamp
-            bucket[(lg.feature_id, d)].append(lg)
-
-        for (fid, agg_date), logs in bucket.items():
-            existing = session.exec(
-                select(AggregatedUsage)
-                .where(AggregatedUsage.organization_id == org.id)
-                .where(AggregatedUsage.feature_id == fid)
-                .where(AggregatedUsage.aggregation_date == agg_date)
-            ).first()
-            if existing:
-                continue
-            dau = len({lg.user_id for lg in logs if lg.user_id})
-            ec = len(logs)
-            avg_dur = sum(lg.session_duration for lg in logs) / max(ec, 1)
-            agg = AggregatedUsage(
-                organization_id=org.id,
-                feature_id=fid,
-                aggregation_date=agg_date,
-                daily_active_users=dau,
-                event_count=ec,
-                avg_session_duration=round(avg_dur, 2),
-            )
-            session.add(agg)
-        session.commit()
+        aggregate_range(session, (base - timedelta(days=30)).date(), (base - timedelta(days=1)).date())
 
 
 if __name__ == "__main__":
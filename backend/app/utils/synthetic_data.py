@@ -0,0 +1,221 @@
+import argparse
+import json
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from app.db.session import engine, init_db
+from app.models.feature import Feature
+from app.models.organization import Organization
+from app.models.usage_log import UsageLog
+from app.models.user import User
+from app.services import metadata_service
+from app.services.aggregation_service import aggregate_range
+from app.services.auth_service import hash_password
+from app.services.version_service import bump_data_version
+
+PLANS = ("free", "standard", "enterprise")
+EVENT_TYPES = ("interaction", "view", "api_call", "export")
+EVENT_TYPE_P = (0.5, 0.3, 0.15, 0.05)
+PLATFORMS = ("web", "ios", "android", "api")
+PLATFORM_P = (0.55, 0.2, 0.15, 0.1)
+FEATURE_WORDS = (
+    "Dashboard", "Report", "Export", "Alert", "Search", "Billing", "Audit", "Workflow",
+    "Sync", "Import", "Insight", "Forecast", "Share", "Comment", "Template", "Webhook",
+)
+# Relative traffic by hour of day (UTC): overnight trough, late-morning and mid-afternoon peaks
+DIURNAL = np.array([
+    0.15, 0.1, 0.08, 0.08, 0.1, 0.18, 0.35, 0.6, 0.85, 1.0, 1.0, 0.95,
+    0.8, 0.9, 1.0, 0.95, 0.85, 0.7, 0.55, 0.45, 0.38, 0.3, 0.25, 0.2,
+])
+WEEKEND_FACTOR = 0.45
+INSERT_CHUNK = 50_000
+
+
+@dataclass
+class Workload:
+    """Shape of a synthetic dataset; the same seed and shape always produce the same rows."""
+
+    orgs: int = 3
+    features: int = 40
+    users: int = 200
+    events: int = 100_000  # per org, before injected anomalies
+    days: int = 30
+    feature_skew: float = 1.1  # Zipf exponent for feature popularity
+    user_skew: float = 0.8  # Zipf exponent for per-user activity
+    anomalies: int = 3  # injected incidents per org
+    seed: int = 42
+    # Exclusive end of the history; whole UTC days keep the diurnal profile aligned to midnight
+    end: datetime = field(default_factory=lambda: datetime.utcnow().replace(hour=0, minute=0, second=0, microsecond=0))
+
+
+def _zipf_p(n: int, skew: float, rng: np.random.Generator) -> np.ndarray:
+    """Zipf probabilities over ``n`` items, assigned to items in random rank order."""
+    p = 1.0 / np.arange(1, n + 1) ** skew
+    return rng.permutation(p / p.sum())
+
+
+def _day_weights(days: int, start: datetime) -> np.ndarray:
+    weekdays = (np.arange(days) + start.weekday()) % 7
+    w = np.where(weekdays >= 5, WEEKEND_FACTOR, 1.0)
+    return w / w.sum()
+
+
+def _timestamps(rng: np.random.Generator, n: int, start: datetime, days: int) -> np.ndarray:
+    day = rng.choice(days, size=n, p=_day_weights(days, start))
+    hour = rng.choice(24, size=n, p=DIURNAL / DIURNAL.sum())
+    seconds = day * 86400 + hour * 3600 + rng.integers(0, 3600, size=n)
+    return np.datetime64(start, "us") + (seconds * 1_000_000).astype("m8[us]")
+
+
+def _events(rng, n, start, days, feature_ids, feature_p, user_ids, user_p, duration_median):
+    """Column arrays for ``n`` baseline events of one org."""
+    fidx = rng.choice(len(feature_ids), size=n, p=feature_p)
+    return {
+        "feature_id": feature_ids[fidx],
+        "user_id": user_ids[rng.choice(len(user_ids), size=n, p=user_p)],
+        "timestamp": _timestamps(rng, n, start, days),
+        # Log-normal dwell time around a per-feature median
+        "session_duration": np.round(duration_median[fidx] * rng.lognormal(0.0, 0.6, size=n), 2),
+        "event_type": rng.choice(len(EVENT_TYPES), size=n, p=EVENT_TYPE_P),
+        "platform": rng.choice(len(PLATFORMS), size=n, p=PLATFORM_P),
+        "anomaly": np.zeros(n, dtype=np.int8),
+    }
+
+
+ANOMALY_KINDS = ("volume_spike", "slow_sessions", "single_user_burst")
+
+
+def _inject(rng, wl: Workload, start, feature_ids, user_ids, duration_median, baseline: int):
+    """Extra events for ``wl.anomalies`` incidents, plus the ground-truth record of each."""
+    parts, truth = [], []
+    for i in range(wl.anomalies):
+        kind = ANOMALY_KINDS[i % len(ANOMALY_KINDS)]
+        f = int(rng.integers(len(feature_ids)))
+        day = int(rng.integers(wl.days))
+        hour = int(rng.integers(8, 18))
+        at = start + timedelta(days=day, hours=hour)
+        n = max(50, baseline // (wl.features * 4))
+        users = user_ids[rng.integers(len(user_ids), size=n)] if kind != "single_user_burst" else np.full(n, user_ids[int(rng.integers(len(user_ids)))])
+        durations = duration_median[f] * rng.lognormal(0.0, 0.3, size=n) * (6.0 if kind == "slow_sessions" else 1.0)
+        parts.append({
+            "feature_id": np.full(n, feature_ids[f]),
+            "user_id": users,
+            "timestamp": np.datetime64(at, "us") + (rng.integers(0, 3600, size=n) * 1_000_000).astype("m8[us]"),
+            "session_duration": np.round(durations, 2),
+            "event_type": np.zeros(n, dtype=np.int64),
+            "platform": rng.choice(len(PLATFORMS), size=n, p=PLATFORM_P),
+            "anomaly": np.full(n, i + 1, dtype=np.int8),
+        })
+        truth.append({"kind": kind, "feature_id": int(feature_ids[f]), "hour": at.isoformat(), "events": n})
+    return parts, truth
+
+
+def _insert_events(session: Session, org_id: int, cols: dict) -> None:
+    order = np.argsort(cols["timestamp"], kind="stable")
+    timestamps = cols["timestamp"][order].astype(object)
+    for lo in range(0, len(order), INSERT_CHUNK):
+        idx = order[lo:lo + INSERT_CHUNK]
+        session.execute(insert(UsageLog), [
+            {
+                "organization_id": org_id,
+                "feature_id": fid,
+                "user_id": uid,
+                "event_type": EVENT_TYPES[et],
+                "session_duration": dur,
+                "metadata_json": {"source": "synthetic", "platform": PLATFORMS[pl], **({"incident": int(an)} if an else {})},
+                "timestamp": ts,
+            }
+            for fid, uid, et, dur, pl, an, ts in zip(
+                cols["feature_id"][idx].tolist(), cols["user_id"][idx].tolist(), cols["event_type"][idx].tolist(),
+                cols["session_duration"][idx].tolist(), cols["platform"][idx].tolist(), cols["anomaly"][idx].tolist(),
+                timestamps[lo:lo + INSERT_CHUNK],
+            )
+        ])
+
+
+def generate(session: Session, wl: Workload, aggregate: bool = True) -> dict:
+    """Write ``wl.orgs`` synthetic orgs to ``session``; returns logins and injected-anomaly ground truth."""
+    rng = np.random.default_rng(wl.seed)
+    start = wl.end - timedelta(days=wl.days)
+    report = {"seed": wl.seed, "start": start.isoformat(), "end": wl.end.isoformat(), "orgs": []}
+    password_hash = hash_password("password")
+
+    for o in range(wl.orgs):
+        org = Organization(name=f"Synthetic Org {wl.seed}-{o + 1}", plan_type=PLANS[o % len(PLANS)])
+        session.add(org)
+        session.flush()
+        features = [
+            Feature(name=f"{FEATURE_WORDS[i % len(FEATURE_WORDS)]} {i // len(FEATURE_WORDS) + 1}", organization_id=org.id)
+            for i in range(wl.features)
+        ]
+        users = [
+            User(
+                email=f"{'admin' if i == 0 else f'user{i}'}@synth{wl.seed}-{o + 1}.example",
+                password_hash=password_hash,
+                role="admin" if i == 0 else "user",
+                organization_id=org.id,
+            )
+            for i in range(wl.users)
+        ]
+        session.add_all(features + users)
+        session.flush()
+        feature_ids = np.array([f.id for f in features])
+        user_ids = np.array([u.id for u in users])
+        duration_median = rng.uniform(30, 300, size=wl.features)
+
+        cols = _events(
+            rng, wl.events, start, wl.days,
+            feature_ids, _zipf_p(wl.features, wl.feature_skew, rng),
+            user_ids, _zipf_p(wl.users, wl.user_skew, rng), duration_median,
+        )
+        extra, truth = _inject(rng, wl, start, feature_ids, user_ids, duration_median, wl.events)
+        if extra:
+            cols = {k: np.concatenate([cols[k]] + [p[k] for p in extra]) for k in cols}
+        _insert_events(session, org.id, cols)
+        bump_data_version(session, org.id)
+        # The bulk insert bypasses record_event_metadata, so extract the org's promoted keys here
+        # (read after the bump, like ingest). Keys promoted later are backfilled by register_key.
+        metadata_service.backfill(session, org.id, metadata_service.get_promoted_keys(session, org.id, use_cache=False))
+        session.commit()
+        report["orgs"].append({"id": org.id, "admin": users[0].email, "password": "password", "events": len(cols["feature_id"]), "anomalies": truth})
+
+    if aggregate:
+        aggregate_range(session, start.date(), (wl.end - timedelta(days=1)).date())
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic workload (no network access needed)")
+    parser.add_argument("--orgs", type=int, default=3, help="Number of orgs")
+    parser.add_argument("--features", type=int, default=40, help="Features per org")
+    parser.add_argument("--users", type=int, default=200, help="Users per org (the first is the org admin)")
+    parser.add_argument("--events", type=int, default=100_000, help="Baseline events per org")
+    parser.add_argument("--days", type=int, default=30, help="Whole days of history ending at today's midnight (UTC)")
+    parser.add_argument("--feature-skew", type=float, default=1.1, help="Zipf exponent for feature popularity")
+    parser.add_argument("--user-skew", type=float, default=0.8, help="Zipf exponent for user activity")
+    parser.add_argument("--anomalies", type=int, default=3, help="Injected incidents per org")
+    parser.add_argument("--seed", type=int, default=42, help="RNG seed")
+    parser.add_argument("--no-aggregate", action="store_true", help="Skip building rollups")
+    parser.add_argument("--truth", help="Write logins and injected anomalies to this JSON file")
+    args = parser.parse_args()
+
+    workload = Workload(
+        orgs=args.orgs, features=args.features, users=args.users, events=args.events, days=args.days,
+        feature_skew=args.feature_skew, user_skew=args.user_skew, anomalies=args.anomalies, seed=args.seed,
+    )
+    init_db()
+    t0 = time.perf_counter()
+    with Session(engine) as session:
+        result = generate(session, workload, aggregate=not args.no_aggregate)
+    total = sum(o["events"] for o in result["orgs"])
+    print(f"Generated {total} events for {args.orgs} orgs in {time.perf_counter() - t0:.1f} s (seed={args.seed}).")
+    for org in result["orgs"]:
+        print(f"  org {org['id']}: login {org['admin']} / password, {org['events']} events, {len(org['anomalies'])} anomalies")
+    if args.truth:
+        with open(args.truth, "w") as fh:
+            json.dump(result, fh, indent=2)
@@ -0,0 +1,41 @@
+from datetime import date, datetime, timedelta
+
+# Finest to coarsest; weekly and monthly both nest daily but not each other
+GRAINS = ("hourly", "daily", "weekly", "monthly")
+
+
+def floor_bucket(ts: datetime, grain: str) -> datetime:
+    if grain == "hourly":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    day = ts.replace(hour=0, minute=0, second=0, microsecond=0)
+    if grain == "daily":
+        return day
+    if grain == "weekly":
+        return day - timedelta(days=day.weekday())
+    if grain == "monthly":
+        return day.replace(day=1)
+    raise ValueError(f"Unknown granularity: {grain}")
+
+
+def next_bucket(ts: datetime, grain: str) -> datetime:
+    """Start of the bucket after the one starting at ``ts`` (``ts`` must be aligned)."""
+    if grain == "hourly":
+        return ts + timedelta(hours=1)
+    if grain == "daily":
+        return ts + timedelta(days=1)
+    if grain == "weekly":
+        return ts + timedelta(days=7)
+    if grain == "monthly":
+        return ts.replace(year=ts.year + ts.month // 12, month=ts.month % 12 + 1)
+    raise ValueError(f"Unknown granularity: {grain}")
+
+
+def ceil_hour(ts: datetime) -> datetime:
+    floored = floor_bucket(ts, "hourly")
+    return floored if floored == ts else floored + timedelta(hours=1)
+
+
+def as_datetime(value: date | str) -> datetime:
+    if isinstance(value, str):  # raw SQLite cursor values
+        return datetime.fromisoformat(value)
+    return value if isinstance(value, datetime) else datetime(value.year, value.month, value.day)
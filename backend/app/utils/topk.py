@@ -0,0 +1,93 @@
+import orjson
+
+
+class SpaceSaving:
+    """Top-k counter summary (Metwally et al., ICDT 2005) with the merge of Agarwal et al. (PODS 2012).
+
+    At most ``capacity`` items are monitored. An unmonitored item evicts the smallest counter and
+    inherits its count as ``error``, so every ``count`` is an upper bound and ``count - error`` a
+    lower bound on the item's true frequency. Summaries merge, so per-hour summaries from any
+    number of processes combine into any window.
+    """
+
+    __slots__ = ("capacity", "counts", "errors", "floor")
+
+    def __init__(self, capacity: int = 64):
+        self.capacity = capacity
+        self.counts: dict = {}
+        self.errors: dict = {}
+        self.floor = 0  # carried bound for unmonitored items after merges
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def bound(self) -> int:
+        """Upper bound on the count of any item this summary does not monitor."""
+        if len(self.counts) < self.capacity:
+            return self.floor
+        return max(self.floor, min(self.counts.values()))
+
+    def add(self, item, weight: int = 1) -> None:
+        if item in self.counts:
+            self.counts[item] += weight
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = self.floor + weight
+            self.errors[item] = self.floor
+        else:
+            victim = min(self.counts, key=self.counts.__getitem__)
+            evicted = self.counts.pop(victim)
+            del self.errors[victim]
+            self.counts[item] = evicted + weight
+            self.errors[item] = evicted
+
+    @classmethod
+    def from_counts(cls, items, counts, capacity: int = 64) -> "SpaceSaving":
+        """Summary of exact counts, keeping the ``capacity`` largest."""
+        summary = cls(capacity)
+        ranked = sorted(zip(counts, items), key=lambda pair: -pair[0])
+        for count, item in ranked[:capacity]:
+            summary.counts[item] = count
+            summary.errors[item] = 0
+        return summary
+
+    @classmethod
+    def merged(cls, summaries, capacity: int = 64) -> "SpaceSaving":
+        """Merge any number of summaries; an item missing from one is charged that summary's bound."""
+        total_bound = 0
+        counts: dict = {}
+        errors: dict = {}
+        for summary in summaries:
+            bound = summary.bound()
+            total_bound += bound
+            # Store each item's excess over the bound so missing items cost nothing per summary
+            for item, count in summary.counts.items():
+                counts[item] = counts.get(item, 0) + count - bound
+                errors[item] = errors.get(item, 0) + summary.errors[item] - bound
+        result = cls(capacity)
+        result.floor = total_bound
+        for item in sorted(counts, key=lambda i: -counts[i])[:capacity]:
+            result.counts[item] = counts[item] + total_bound
+            result.errors[item] = errors[item] + total_bound
+        return result
+
+    def top(self, k: int) -> list[tuple[object, int, int]]:
+        """``(item, count, error)`` for the ``k`` largest counters."""
+        ranked = sorted(self.counts.items(), key=lambda pair: -pair[1])[:k]
+        return [(item, count, self.errors[item]) for item, count in ranked]
+
+    def to_bytes(self) -> bytes:
+        return orjson.dumps({
+            "capacity": self.capacity,
+            "floor": self.floor,
+            "items": [[item, count, self.errors[item]] for item, count in self.counts.items()],
+        })
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "SpaceSaving":
+        data = orjson.loads(blob)
+        summary = cls(data["capacity"])
+        summary.floor = data["floor"]
+        for item, count, error in data["items"]:
+            summary.counts[item] = count
+            summary.errors[item] = error
+        return summary
@@ -0,0 +1,98 @@
+"""Time retention and cohort grids built from the per-day user bitmaps against a per-user-day scan.
+
+Run from backend/:  python -m benchmarks.bench_bitmaps --users 5000 --days 120 --window 90
+Generates a throwaway SQLite file with app.utils.synthetic_data, checks that every grid equals
+the same matrix computed with Python sets from UserDailyUsage, and reports the stored bitmap
+size per day next to the grid build times.
+"""
+import argparse
+import os
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+
+def _scan_grid(session, organization_id: int, start, end, step: int, new_users: bool) -> list[list[int]]:
+    from sqlmodel import select
+    from app.models.user_daily_usage import UserDailyUsage
+
+    active, before = defaultdict(set), set()
+    for user_id, day in session.exec(
+        select(UserDailyUsage.user_id, UserDailyUsage.usage_date)
+        .where(UserDailyUsage.organization_id == organization_id)
+        .where(UserDailyUsage.usage_date < end)
+    ).all():
+        if day < start:
+            before.add(user_id)
+        else:
+            active[(day - start).days // step].add(user_id)
+    periods = [active[i] for i in range(-(-(end - start).days // step))]
+    cohorts = periods
+    if new_users:
+        cohorts, seen = [], before
+        for users in periods:
+            cohorts.append(users - seen)
+            seen = seen | users
+    return [[len(c)] + [len(c & users) for users in periods[i + 1:]] for i, c in enumerate(cohorts)]
+
+
+def main(args) -> None:
+    # The engine is bound at import time, so point it at the scratch file first
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    from sqlmodel import Session, func, select
+
+    from app.db.session import engine, init_db
+    from app.models.user_bitmap import UserBitmap
+    from app.services import cohort_service
+    from app.utils.synthetic_data import Workload, generate
+
+    init_db()
+    t0 = time.perf_counter()
+    with Session(engine) as session:
+        report = generate(session, Workload(
+            orgs=args.orgs, features=args.features, users=args.users, events=args.events,
+            days=args.days, anomalies=0, seed=args.seed,
+        ))
+    print(f"generated {sum(o['events'] for o in report['orgs'])} events in {time.perf_counter() - t0:.1f} s")
+    print(f"{'org':>4} {'grid':>12} {'cohorts':>7} {'bytes/day':>9} {'bitmap ms':>9} {'scan ms':>8} {'match':>5}")
+
+    with Session(engine) as session:
+        for org in report["orgs"]:
+            end = session.exec(select(func.max(UserBitmap.bitmap_date)).where(UserBitmap.organization_id == org["id"])).one()
+            end += timedelta(days=1)
+            start = end - timedelta(days=args.window)
+            size = session.exec(
+                select(func.avg(func.length(UserBitmap.users)))
+                .where(UserBitmap.organization_id == org["id"])
+                .where(UserBitmap.feature_id.is_(None))  # type: ignore
+            ).one()
+            for period in ("day", "week"):
+                for new_users, build in ((False, cohort_service.get_retention), (True, cohort_service.get_cohorts)):
+                    build(session, org["id"], start, end, period)  # warm the statement cache
+                    t1 = time.perf_counter()
+                    for _ in range(args.repeat):
+                        matrix = build(session, org["id"], start, end, period)
+                    bitmap_ms = (time.perf_counter() - t1) * 1000 / args.repeat
+                    t1 = time.perf_counter()
+                    expected = _scan_grid(session, org["id"], start, end, cohort_service.PERIOD_DAYS[period], new_users)
+                    scan_ms = (time.perf_counter() - t1) * 1000
+                    match = [row.retained for row in matrix.cohorts] == expected
+                    print(
+                        f"{org['id']:>4} {period + ('/new' if new_users else '/active'):>12} {len(matrix.cohorts):>7} "
+                        f"{size:>9.0f} {bitmap_ms:>9.1f} {scan_ms:>8.1f} {'yes' if match else 'NO':>5}"
+                    )
+    os.remove(args.db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark bitmap retention/cohort grids")
+    parser.add_argument("--orgs", type=int, default=2, help="Synthetic orgs")
+    parser.add_argument("--features", type=int, default=40, help="Features per org")
+    parser.add_argument("--users", type=int, default=5000, help="Users per org")
+    parser.add_argument("--events", type=int, default=200_000, help="Baseline events per org")
+    parser.add_argument("--days", type=int, default=120, help="Days of history")
+    parser.add_argument("--window", type=int, default=90, help="Grid span in days")
+    parser.add_argument("--seed", type=int, default=42, help="Workload seed")
+    parser.add_argument("--repeat", type=int, default=10, help="Grid builds to average")
+    parser.add_argument("--db", default="/tmp/bench_bitmaps.db", help="Scratch SQLite file")
+    main(parser.parse_args())
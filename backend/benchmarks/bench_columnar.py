@@ -0,0 +1,99 @@
+"""Compare the ORM Row path against the columnar DBAPI loader on a synthetic AggregatedUsage table.
+
+Run from backend/:  python -m benchmarks.bench_columnar --rows 1000000
+Builds a throwaway SQLite file (default /tmp/bench_columnar.db), then reports the best-of-N
+wall time and tracemalloc peak for loading every rollup row into a (features, metrics) matrix.
+"""
+import argparse
+import os
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+import numpy as np
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from app.models.aggregated_usage import AggregatedUsage
+from app.models.organization import Organization  # noqa: F401 - registers relationship targets
+from app.models.user import User  # noqa: F401
+from app.services.ai_service import _METRIC_DTYPES
+from app.utils.columnar import load_columns
+
+STMT = select(
+    AggregatedUsage.feature_id,
+    AggregatedUsage.event_count,
+    AggregatedUsage.avg_session_duration,
+    AggregatedUsage.daily_active_users,
+).where(AggregatedUsage.organization_id == 1)
+
+
+def _build(path: str, rows: int, seed: int = 11):
+    if os.path.exists(path):
+        os.remove(path)
+    engine = create_engine(f"sqlite:///{path}")
+    SQLModel.metadata.create_all(engine, tables=[AggregatedUsage.__table__])
+    rng = np.random.default_rng(seed)
+    features = 1000
+    start = date(2020, 1, 1)
+    with engine.begin() as conn:
+        for lo in range(0, rows, 100_000):
+            n = min(100_000, rows - lo)
+            idx = np.arange(lo, lo + n)
+            conn.exec_driver_sql(
+                "INSERT INTO aggregatedusage (organization_id, feature_id, aggregation_date, daily_active_users, event_count, avg_session_duration) "
+                "VALUES (1, ?, ?, ?, ?, ?)",
+                list(zip(
+                    (idx % features + 1).tolist(),
+                    [(start + timedelta(days=int(d))).isoformat() for d in idx // features],
+                    rng.poisson(8, n).tolist(),
+                    rng.poisson(40, n).tolist(),
+                    rng.gamma(2.0, 120.0, n).round(2).tolist(),
+                )),
+            )
+    return engine
+
+
+def orm_path(session: Session) -> np.ndarray:
+    # The previous ai_service path: Row objects, then a list comprehension into NumPy
+    rows = session.exec(STMT).all()
+    return np.array([[r[1], r[2], r[3]] for r in rows], dtype=float)
+
+
+def columnar_path(session: Session) -> np.ndarray:
+    cols = load_columns(session, STMT, _METRIC_DTYPES)
+    return np.column_stack([cols["event_count"], cols["avg_session_duration"], cols["daily_active_users"]])
+
+
+def _measure(engine, fn, repeat: int) -> tuple[float, float, np.ndarray]:
+    best, out = float("inf"), None
+    for _ in range(repeat):
+        with Session(engine) as session:
+            t0 = time.perf_counter()
+            out = fn(session)
+            best = min(best, time.perf_counter() - t0)
+    with Session(engine) as session:
+        tracemalloc.start()
+        fn(session)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best * 1000, peak / 1e6, out
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the columnar loader against ORM rows")
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rollup rows to generate")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N repetitions")
+    parser.add_argument("--db", default="/tmp/bench_columnar.db", help="Scratch SQLite file")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    engine = _build(args.db, args.rows)
+    print(f"built {args.rows} rows in {time.perf_counter() - t0:.1f} s")
+
+    orm_ms, orm_mb, orm_out = _measure(engine, orm_path, args.repeat)
+    col_ms, col_mb, col_out = _measure(engine, columnar_path, args.repeat)
+    assert np.array_equal(orm_out, col_out)
+    print(f"orm rows   {orm_ms:9.1f} ms  peak {orm_mb:8.1f} MB")
+    print(f"columnar   {col_ms:9.1f} ms  peak {col_mb:8.1f} MB")
+    print(f"speedup {orm_ms / col_ms:.1f}x  memory {orm_mb / col_mb:.1f}x less")
+    os.remove(args.db)
@@ -0,0 +1,78 @@
+"""Compare the validated Pydantic path against the orjson fast path for /ai/chart-data.
+
+Run from backend/:  python -m benchmarks.bench_serialization --features 10000 100000
+"""
+import argparse
+import gzip
+import json
+import time
+
+import numpy as np
+import orjson
+
+from app.schemas.analytics_schema import ChartDataResponse
+from app.services.ai_service import build_chart_payload
+from app.utils.fast_json import dumps
+
+try:
+    import brotli  # type: ignore
+except ImportError:
+    brotli = None
+
+
+def _synthetic(n: int, seed: int = 7):
+    rng = np.random.default_rng(seed)
+    feature_ids = np.arange(1, n + 1)
+    metrics = np.column_stack([
+        rng.poisson(40, n),
+        rng.gamma(2.0, 120.0, n),
+        rng.poisson(8, n),
+    ]).astype(float)
+    fname_map = {int(fid): f"Feature {fid}" for fid in feature_ids}
+    return feature_ids, metrics, metrics.mean(axis=0), metrics.std(axis=0, ddof=1), fname_map
+
+
+def _timed(fn, repeat: int):
+    best = float("inf")
+    out = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1000, out
+
+
+def run(n: int, repeat: int) -> None:
+    feature_ids, metrics, means, stds, fname_map = _synthetic(n)
+
+    def pydantic_path():
+        # Models built per row, then validated + encoded again as FastAPI's response_model would.
+        model = ChartDataResponse.model_validate(build_chart_payload(feature_ids, metrics, means, stds, fname_map))
+        return json.dumps(ChartDataResponse.model_validate(model.model_dump()).model_dump(mode="json")).encode()
+
+    def fast_path():
+        return dumps(build_chart_payload(feature_ids, metrics, means, stds, fname_map))
+
+    slow_ms, slow_body = _timed(pydantic_path, repeat)
+    fast_ms, fast_body = _timed(fast_path, repeat)
+    assert orjson.loads(fast_body) == json.loads(slow_body)
+
+    gzip_ms, gz = _timed(lambda: gzip.compress(fast_body, compresslevel=5), repeat)
+    line = (
+        f"features={n:>7}  pydantic={slow_ms:8.1f} ms  orjson={fast_ms:8.1f} ms  "
+        f"speedup={slow_ms / fast_ms:4.1f}x  raw={len(fast_body) / 1e6:6.2f} MB  "
+        f"gzip={len(gz) / 1e6:5.2f} MB ({gzip_ms:.1f} ms)"
+    )
+    if brotli is not None:
+        br_ms, br = _timed(lambda: brotli.compress(fast_body, quality=4), repeat)
+        line += f"  br={len(br) / 1e6:5.2f} MB ({br_ms:.1f} ms)"
+    print(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark chart-data serialization paths")
+    parser.add_argument("--features", type=int, nargs="+", default=[10_000, 100_000], help="Feature counts to test")
+    parser.add_argument("--repeat", type=int, default=3, help="Best-of-N repetitions")
+    args = parser.parse_args()
+    for n in args.features:
+        run(n, args.repeat)
@@ -0,0 +1,71 @@
+"""Check DDSketch percentiles against exact percentiles from UsageLog and time the merge path.
+
+Run from backend/ after aggregation:  python -m benchmarks.bench_sketches --org 1 --days 30
+Exits non-zero if any p50/p95/p99 exceeds the configured relative error bound.
+"""
+import argparse
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+from sqlmodel import Session, select
+
+from app.config import get_settings
+from app.db.session import engine
+from app.models.organization import Organization  # noqa: F401 - registers relationship targets
+from app.models.user import User  # noqa: F401
+from app.models.usage_log import UsageLog
+from app.services.analytics_service import get_session_percentiles
+
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+
+
+def check(org_id: int, days: int) -> bool:
+    alpha = get_settings().sketch_relative_accuracy
+    end = date.today()
+    start = end - timedelta(days=days)
+    ok = True
+    with Session(engine) as session:
+        t0 = time.perf_counter()
+        sketched = get_session_percentiles(session, org_id, start, end)
+        sketch_ms = (time.perf_counter() - t0) * 1000
+
+        t0 = time.perf_counter()
+        raw = session.exec(
+            select(UsageLog.feature_id, UsageLog.session_duration)
+            .where(UsageLog.organization_id == org_id)
+            .where(UsageLog.timestamp >= start)
+            .where(UsageLog.timestamp < end)
+        ).all()
+        by_feature: dict[int, list[float]] = {}
+        for fid, duration in raw:
+            by_feature.setdefault(fid, []).append(duration)
+        exact = {fid: {k: float(np.percentile(v, q * 100, method="lower")) for k, q in QUANTILES.items()} for fid, v in by_feature.items()}
+        raw_ms = (time.perf_counter() - t0) * 1000
+
+    worst = 0.0
+    for row in sketched:
+        if row.event_count != len(by_feature.get(row.feature_id, [])):
+            print(f"feature {row.feature_id}: sketch covers {row.event_count} events, raw has {len(by_feature.get(row.feature_id, []))} (re-run aggregation)")
+            ok = False
+            continue
+        for key in QUANTILES:
+            truth, estimate = exact[row.feature_id][key], getattr(row, key)
+            err = abs(estimate - truth) / truth if truth else abs(estimate)
+            worst = max(worst, err)
+            # 0.005 slack covers the 2-decimal rounding applied to the response values
+            if err > alpha + 0.005 / max(truth, 1e-9):
+                print(f"feature {row.feature_id} {key}: sketch={estimate} exact={truth:.2f} rel_err={err:.4f} > {alpha}")
+                ok = False
+
+    print(f"features={len(sketched)} events={len(raw)} worst_rel_err={worst:.4f} bound={alpha} sketch_merge={sketch_ms:.1f} ms raw_scan={raw_ms:.1f} ms")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Validate sketch percentiles against raw UsageLog")
+    parser.add_argument("--org", type=int, default=1, help="Organization id")
+    parser.add_argument("--days", type=int, default=30, help="Days back from today (today excluded)")
+    args = parser.parse_args()
+    sys.exit(0 if check(args.org, args.days) else 1)
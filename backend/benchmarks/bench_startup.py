@@ -0,0 +1,85 @@
+"""Measure cold import time of app.main and time-to-first-request for a fresh uvicorn process.
+
+Run from backend/:  python -m benchmarks.bench_startup --runs 3 --seed-modes off background blocking
+Each uvicorn run uses a throwaway SQLite file so demo seeding starts from an empty database.
+"""
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.parse
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMPORT_SNIPPET = "import time; t = time.perf_counter(); import app.main; print(time.perf_counter() - t)"
+
+
+def import_time() -> float:
+    out = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _poll(url: str, deadline: float, data: bytes | None = None) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            with urllib.request.urlopen(url, data=data, timeout=1) as resp:
+                if resp.status == 200:
+                    return True
+        except OSError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def first_request(seed_mode: str, timeout: float = 120.0) -> tuple[float, float | None]:
+    """Return (seconds until GET / answers, seconds until demo login succeeds or None)."""
+    port = _free_port()
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/bench.db", DEMO_SEED=seed_mode, SCHEDULER_ENABLED="false")
+        start = time.perf_counter()
+        proc = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+            cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            base = f"http://127.0.0.1:{port}"
+            if not _poll(base + "/", start + timeout):
+                raise RuntimeError("server did not become ready")
+            ready = time.perf_counter() - start
+            login = None
+            if seed_mode != "off":
+                form = urllib.parse.urlencode({"username": "admin@example.com", "password": "password"}).encode()
+                if _poll(base + "/auth/login", start + timeout, data=form):
+                    login = time.perf_counter() - start
+            return ready, login
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark cold start")
+    parser.add_argument("--runs", type=int, default=3, help="Repetitions per measurement (median reported)")
+    parser.add_argument("--seed-modes", nargs="+", default=["off", "background", "blocking"], help="DEMO_SEED values to test")
+    args = parser.parse_args()
+
+    imports = [import_time() for _ in range(args.runs)]
+    print(f"import app.main: median={statistics.median(imports) * 1000:.0f} ms  runs={[round(t * 1000) for t in imports]}")
+    for mode in args.seed_modes:
+        results = [first_request(mode) for _ in range(args.runs)]
+        ready = statistics.median(r[0] for r in results)
+        logins = [r[1] for r in results if r[1] is not None]
+        line = f"DEMO_SEED={mode:<10} first request: median={ready * 1000:.0f} ms"
+        if logins:
+            line += f"  demo login ready: median={statistics.median(logins) * 1000:.0f} ms"
+        print(line)
@@ -0,0 +1,115 @@
+"""Compare /analytics/top served from Space-Saving summaries with exact GROUP BY scans of UsageLog.
+
+Run from backend/:  python -m benchmarks.bench_topk --events 200000 --users 2000
+Generates a throwaway SQLite file with app.utils.synthetic_data, then for each org and window
+reports the exact scan time against the summary read time, and how many of the exact top-k users
+the summaries return. Summaries are measured twice: as written by the rollup (exact per hour) and
+after replaying the same events through the ingest hook (topk_service.record) with no rollup.
+"""
+import argparse
+import os
+import time
+from datetime import datetime
+
+
+def _exact(session, organization_id: int, since: datetime, k: int) -> dict[str, list[tuple[object, int]]]:
+    from sqlmodel import func, select
+    from app.models.usage_log import UsageLog
+
+    out = {}
+    for dimension, column in (("features", UsageLog.feature_id), ("users", UsageLog.user_id), ("event_types", UsageLog.event_type)):
+        out[dimension] = session.exec(
+            select(column, func.count(UsageLog.id))
+            .where(UsageLog.organization_id == organization_id)
+            .where(UsageLog.timestamp >= since)
+            .where(column.is_not(None))
+            .group_by(column)
+            .order_by(func.count(UsageLog.id).desc())
+            .limit(k)
+        ).all()
+    return out
+
+
+def _compare(exact: dict, top) -> tuple[int, bool]:
+    """(exact top-k users found, features and event types ranked with exact counts)."""
+    users = len({u for u, _ in exact["users"]} & {item.key for item in top.users})
+    exact_counts = all(
+        [count for _, count in exact[d]] == [item.count for item in getattr(top, d)]
+        for d in ("features", "event_types")
+    )
+    return users, exact_counts
+
+
+def main(args) -> None:
+    # The engine is bound at import time, so point it at the scratch file first
+    os.environ["DATABASE_URL"] = f"sqlite:///{args.db}"
+    from sqlalchemy import delete
+    from sqlmodel import Session, select
+
+    from app.db.session import engine, init_db
+    from app.models.topk_summary import TopKSummary
+    from app.models.usage_log import UsageLog
+    from app.services import topk_service
+    from app.utils.synthetic_data import Workload, generate
+    from app.utils.time_buckets import floor_bucket
+
+    init_db()
+    t0 = time.perf_counter()
+    with Session(engine) as session:
+        report = generate(session, Workload(
+            orgs=args.orgs, features=args.features, users=args.users, events=args.events,
+            days=args.days, anomalies=0, seed=args.seed,
+        ))
+    print(f"generated {sum(o['events'] for o in report['orgs'])} events in {time.perf_counter() - t0:.1f} s")
+
+    with Session(engine) as session:
+        results = {}
+        for org in report["orgs"]:
+            for window in ("day", "week"):
+                since = floor_bucket(datetime.utcnow() - topk_service.WINDOWS[window], "hourly")
+                t1 = time.perf_counter()
+                exact = _exact(session, org["id"], since, args.k)
+                scan_ms = (time.perf_counter() - t1) * 1000
+                t1 = time.perf_counter()
+                top = topk_service.get_top(session, org["id"], window, args.k)
+                results[(org["id"], window)] = [exact, scan_ms, (time.perf_counter() - t1) * 1000, _compare(exact, top)]
+
+        # Same events through the ingest hook instead of the rollup
+        since = floor_bucket(datetime.utcnow() - topk_service.WINDOWS["week"], "hourly")
+        session.execute(delete(TopKSummary))
+        session.commit()
+        rows = session.exec(
+            select(UsageLog.organization_id, UsageLog.feature_id, UsageLog.user_id, UsageLog.event_type, UsageLog.timestamp)
+            .where(UsageLog.timestamp >= since)
+            .order_by(UsageLog.timestamp)
+        ).all()
+        t1 = time.perf_counter()
+        for row in rows:
+            topk_service.record(*row)
+        record_us = (time.perf_counter() - t1) * 1e6 / max(len(rows), 1)
+        topk_service.flush("bench")
+        for (org_id, window), result in results.items():
+            top = topk_service.get_top(session, org_id, window, args.k)
+            result.append(_compare(result[0], top))
+
+    print(f"ingest hook: {record_us:.1f} us/event over {len(rows)} events; capacity {topk_service.settings.topk_capacity}, k={args.k}")
+    print(f"{'org':>4} {'window':>6} {'scan ms':>8} {'top ms':>7} | {'rollup users':>12} {'exact':>5} | {'stream users':>12} {'exact':>5}")
+    for (org_id, window), (_, scan_ms, top_ms, (r_users, r_exact), (s_users, s_exact)) in results.items():
+        print(
+            f"{org_id:>4} {window:>6} {scan_ms:>8.1f} {top_ms:>7.1f} | {r_users:>9}/{args.k:<2} {'yes' if r_exact else 'no':>5} | "
+            f"{s_users:>9}/{args.k:<2} {'yes' if s_exact else 'no':>5}"
+        )
+    os.remove(args.db)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark top-K summaries against exact scans")
+    parser.add_argument("--orgs", type=int, default=2, help="Synthetic orgs")
+    parser.add_argument("--features", type=int, default=40, help="Features per org")
+    parser.add_argument("--users", type=int, default=2000, help="Users per org")
+    parser.add_argument("--events", type=int, default=200_000, help="Baseline events per org")
+    parser.add_argument("--days", type=int, default=14, help="Days of history")
+    parser.add_argument("--k", type=int, default=10, help="Items per list")
+    parser.add_argument("--seed", type=int, default=42, help="Workload seed")
+    parser.add_argument("--db", default="/tmp/bench_topk.db", help="Scratch SQLite file")
+    main(parser.parse_args())
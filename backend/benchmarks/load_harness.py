@@ -0,0 +1,197 @@
+"""Replay a mixed ingest + dashboard workload against a running API at a fixed request rate.
+
+Run from backend/ against a server loaded by app.utils.synthetic_data, e.g.:
+    python -m app.utils.synthetic_data --orgs 3 --events 200000 --truth /tmp/truth.json
+    uvicorn app.main:app --port 8000 &
+    python -m benchmarks.load_harness --truth /tmp/truth.json --rps 200 --duration 60
+
+Arrivals are open-loop (Poisson at --rps), and latency is measured from each request's
+scheduled send time, so a stalled server shows up as queueing delay instead of a lower
+offered rate. Reports count, error rate and p50/p95/p99 per endpoint; 429s from admission
+control are counted separately from errors.
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlencode, urlsplit
+
+import numpy as np
+
+# (name, weight, method, path); weights are relative within each class
+INGEST = [("POST /events/track", 1.0, "POST", "/events/track")]
+DASHBOARD = [
+    ("GET /analytics/usage-summary", 3.0, "GET", "/analytics/usage-summary"),
+    ("GET /analytics/feature-usage", 3.0, "GET", "/analytics/feature-usage"),
+    ("GET /analytics/feature-usage?granularity", 2.0, "GET", "/analytics/feature-usage?granularity=daily"),
+    ("GET /analytics/user-activity", 1.0, "GET", "/analytics/user-activity"),
+    ("GET /analytics/session-percentiles", 1.0, "GET", "/analytics/session-percentiles"),
+    ("GET /ai/chart-data", 1.0, "GET", "/ai/chart-data"),
+    ("GET /ai/anomalies", 0.5, "GET", "/ai/anomalies"),
+]
+PLATFORMS = ("web", "ios", "android", "api")
+
+
+class Client:
+    """One keep-alive connection per worker thread."""
+
+    def __init__(self, base_url: str, timeout: float):
+        parts = urlsplit(base_url)
+        self.host, self.port, self.https = parts.hostname, parts.port, parts.scheme == "https"
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _conn(self) -> http.client.HTTPConnection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            conn = self._local.conn = cls(self.host, self.port, timeout=self.timeout)
+        return conn
+
+    def request(self, method: str, path: str, body: bytes | None = None, headers: dict | None = None) -> tuple[int, bytes]:
+        conn = self._conn()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            resp = conn.getresponse()
+            return resp.status, resp.read()
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            self._local.conn = None
+            raise
+
+
+class Tenant:
+    def __init__(self, client: Client, email: str, password: str):
+        status, body = client.request(
+            "POST", "/auth/login", urlencode({"username": email, "password": password}).encode(),
+            {"Content-Type": "application/x-www-form-urlencoded"},
+        )
+        if status != 200:
+            raise SystemExit(f"login failed for {email}: HTTP {status} {body[:200]!r}")
+        self.headers = {"Authorization": f"Bearer {json.loads(body)['access_token']}"}
+        status, body = client.request("GET", "/auth/me", headers=self.headers)
+        self.organization_id = json.loads(body)["organization_id"]
+        status, body = client.request("GET", "/analytics/feature-usage", headers=self.headers)
+        self.feature_ids = [row["feature_id"] for row in json.loads(body)] if status == 200 else []
+        if not self.feature_ids:
+            raise SystemExit(f"{email}: organization {self.organization_id} has no features to send events for")
+
+
+class Stats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.counts: dict[str, dict[str, int]] = defaultdict(lambda: {"ok": 0, "throttled": 0, "errors": 0})
+        self.elapsed = 0.0
+
+    def record(self, name: str, outcome: str, latency: float) -> None:
+        with self._lock:
+            self.counts[name][outcome] += 1
+            if outcome == "ok":
+                self.latencies[name].append(latency)
+
+    def report(self) -> None:
+        print(f"{'endpoint':44} {'count':>7} {'ok':>7} {'429':>6} {'err%':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        total = {"ok": 0, "throttled": 0, "errors": 0}
+        everything = []
+        for name in sorted(self.counts):
+            c = self.counts[name]
+            for k in total:
+                total[k] += c[k]
+            lat = np.array(self.latencies[name]) * 1000
+            everything.append(lat)
+            self._row(name, c, lat)
+        lat = np.concatenate(everything) if everything else np.empty(0)
+        self._row("all", total, lat)
+        n = sum(total.values())
+        print(f"achieved {n / self.elapsed:.1f} req/s over {self.elapsed:.1f} s")
+
+    @staticmethod
+    def _row(name: str, c: dict, lat: np.ndarray) -> None:
+        n = sum(c.values())
+        p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if len(lat) else (float("nan"),) * 3
+        peak = lat.max() if len(lat) else float("nan")
+        print(f"{name:44} {n:7d} {c['ok']:7d} {c['throttled']:6d} {100 * c['errors'] / max(n, 1):6.2f} {p50:8.1f} {p95:8.1f} {p99:8.1f} {peak:8.1f}")
+
+
+def _pick(rng: random.Random, ops: list[tuple]) -> tuple:
+    return rng.choices(ops, weights=[op[1] for op in ops])[0]
+
+
+def _fire(client: Client, stats: Stats, tenant: Tenant, op: tuple, body: bytes | None, scheduled: float) -> None:
+    name, _, method, path = op
+    headers = dict(tenant.headers)
+    if body is not None:
+        headers["Content-Type"] = "application/json"
+    try:
+        status, _ = client.request(method, path, body, headers)
+    except (OSError, http.client.HTTPException):
+        stats.record(name, "errors", 0.0)
+        return
+    latency = time.perf_counter() - scheduled
+    stats.record(name, "ok" if status < 400 else "throttled" if status == 429 else "errors", latency)
+
+
+def _event_body(rng: random.Random, tenant: Tenant) -> bytes:
+    return json.dumps({
+        "organization_id": tenant.organization_id,
+        "feature_id": rng.choice(tenant.feature_ids),
+        "event_type": rng.choices(("interaction", "view", "api_call"), weights=(5, 3, 2))[0],
+        "session_duration": round(rng.lognormvariate(4.5, 0.6), 2),
+        "metadata": {"source": "load_harness", "platform": rng.choice(PLATFORMS)},
+    }).encode()
+
+
+def run(client: Client, tenants: list[Tenant], rps: float, duration: float, ingest_share: float, workers: int, seed: int) -> Stats:
+    rng = random.Random(seed)
+    stats = Stats()
+    pool = ThreadPoolExecutor(max_workers=workers)
+    start = time.perf_counter()
+    scheduled = start
+    while True:
+        scheduled += rng.expovariate(rps)
+        if scheduled - start >= duration:
+            break
+        tenant = rng.choice(tenants)
+        if rng.random() < ingest_share:
+            op, body = _pick(rng, INGEST), _event_body(rng, tenant)
+        else:
+            op, body = _pick(rng, DASHBOARD), None
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pool.submit(_fire, client, stats, tenant, op, body, scheduled)
+    pool.shutdown(wait=True)
+    stats.elapsed = time.perf_counter() - start
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Open-loop load test with per-endpoint latency percentiles")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000", help="API root")
+    parser.add_argument("--truth", help="JSON written by app.utils.synthetic_data --truth; logs in as every org admin")
+    parser.add_argument("--login", action="append", default=[], metavar="EMAIL:PASSWORD", help="Extra tenant login (repeatable)")
+    parser.add_argument("--rps", type=float, default=100, help="Offered requests per second")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds of traffic")
+    parser.add_argument("--ingest-share", type=float, default=0.8, help="Fraction of requests that are ingest")
+    parser.add_argument("--workers", type=int, default=64, help="Concurrent connections")
+    parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="RNG seed for arrivals and payloads")
+    args = parser.parse_args()
+
+    logins = [tuple(item.split(":", 1)) for item in args.login]
+    if args.truth:
+        with open(args.truth) as fh:
+            logins += [(org["admin"], org["password"]) for org in json.load(fh)["orgs"]]
+    if not logins:
+        logins = [("admin@example.com", "password")]
+
+    client = Client(args.base_url, args.timeout)
+    tenants = [Tenant(client, email, password) for email, password in logins]
+    print(f"{len(tenants)} tenants, {args.rps:g} req/s for {args.duration:g} s, {args.ingest_share:.0%} ingest")
+    result = run(client, tenants, args.rps, args.duration, args.ingest_share, args.workers, args.seed)
+    result.report()
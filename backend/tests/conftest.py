@@ -0,0 +1,20 @@
+import os
+import tempfile
+
+# The engines are bound when app.db.session is imported, so point them at a scratch file first
+os.environ["DATABASE_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["SHARD_URLS"] = "{}"
+os.environ["SCHEDULER_ENABLED"] = "false"
+
+import pytest  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+import app.main  # noqa: E402,F401 - registers every model so relationships resolve
+from app.db.session import engine, init_db  # noqa: E402
+
+
+@pytest.fixture
+def session():
+    init_db()
+    with Session(engine) as session:
+        yield session
@@ -0,0 +1,88 @@
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlmodel import select
+
+from app.config import get_settings
+from app.models.duration_sketch import DurationSketch
+from app.models.feature import Feature
+from app.models.organization import Organization
+from app.models.usage_log import UsageLog
+from app.services.aggregation_service import aggregate_daily
+from app.services.analytics_service import get_session_percentiles
+from app.utils.ddsketch import DDSketch
+
+QUANTILES = {"p50": 0.50, "p95": 0.95, "p99": 0.99}
+DAYS = 3
+# Float slack on top of the sketch bound; the endpoint also rounds to 2 decimals
+EPSILON = 1e-9
+
+
+@pytest.fixture
+def org_with_events(session):
+    rng = np.random.default_rng(29)
+    org = Organization(name="Sketch Org")
+    session.add(org)
+    session.commit()
+    features = [Feature(name=f"feature-{i}", organization_id=org.id) for i in range(3)]
+    session.add_all(features)
+    session.commit()
+
+    first = date.today() - timedelta(days=DAYS)
+    exact: dict[int, list[float]] = {}
+    for i, feature in enumerate(features):
+        # Heavy-tailed durations with some unrecorded (zero) ones, differently scaled per feature
+        durations = rng.lognormal(mean=2 + i, sigma=1.2, size=1500)
+        durations[rng.random(durations.size) < 0.05] = 0.0
+        days = rng.integers(0, DAYS, size=durations.size)
+        seconds = rng.integers(0, 86_400, size=durations.size)
+        session.add_all([
+            UsageLog(
+                organization_id=org.id, feature_id=feature.id, session_duration=float(d),
+                timestamp=datetime.combine(first + timedelta(days=int(day)), datetime.min.time()) + timedelta(seconds=int(s)),
+            )
+            for d, day, s in zip(durations, days, seconds)
+        ])
+        exact[feature.id] = durations.tolist()
+    session.commit()
+    for offset in range(DAYS):
+        aggregate_daily(session, first + timedelta(days=offset))
+    return org.id, first, exact
+
+
+def _relative_error(estimate: float, truth: float) -> float:
+    return abs(estimate - truth) / truth if truth else abs(estimate)
+
+
+def test_merged_daily_sketches_within_relative_accuracy(session, org_with_events):
+    org_id, first, exact = org_with_events
+    alpha = get_settings().sketch_relative_accuracy
+    merged: dict[int, DDSketch] = {}
+    for fid, blob in session.exec(
+        select(DurationSketch.feature_id, DurationSketch.sketch).where(DurationSketch.organization_id == org_id)
+    ).all():
+        sketch = DDSketch.from_bytes(blob)
+        merged[fid] = merged[fid].merge(sketch) if fid in merged else sketch
+
+    assert set(merged) == set(exact)
+    for fid, durations in exact.items():
+        assert merged[fid].count == len(durations)
+        for q in QUANTILES.values():
+            truth = float(np.percentile(durations, q * 100, method="lower"))
+            assert _relative_error(merged[fid].quantile(q), truth) <= alpha + EPSILON
+
+
+def test_session_percentiles_endpoint_within_bound(session, org_with_events):
+    org_id, first, exact = org_with_events
+    alpha = get_settings().sketch_relative_accuracy
+    rows = get_session_percentiles(session, org_id, first, first + timedelta(days=DAYS))
+
+    assert {row.feature_id for row in rows} == set(exact)
+    for row in rows:
+        durations = exact[row.feature_id]
+        assert row.event_count == len(durations)
+        for key, q in QUANTILES.items():
+            truth = float(np.percentile(durations, q * 100, method="lower"))
+            rounding = 0.005 / truth if truth else 0.005
+            assert _relative_error(getattr(row, key), truth) <= alpha + rounding + EPSILON
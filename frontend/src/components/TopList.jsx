@@ -0,0 +1,52 @@
+const SECTIONS = [
+  { key: "features", title: "Top Features" },
+  { key: "users", title: "Top Users" },
+];
+
+export default function TopList({ top, loading }) {
+  return (
+    <div className="card">
+      <div className="flex items-center justify-between mb-4">
+        <div>
+          <div className="text-sm font-semibold">Heavy Hitters</div>
+          <div className="text-xs text-white/40 mt-0.5">Most events in the last 24 hours</div>
+        </div>
+      </div>
+      {loading ? (
+        <div className="space-y-3">
+          {[1, 2, 3].map((i) => (
+            <div key={i} className="skeleton h-8 w-full" />
+          ))}
+        </div>
+      ) : (
+        <div className="grid grid-cols-1 sm:grid-cols-2 gap-6">
+          {SECTIONS.map((section) => {
+            const items = top?.[section.key] ?? [];
+            return (
+              <div key={section.key}>
+                <div className="text-xs font-medium text-white/40 uppercase tracking-wider mb-2">{section.title}</div>
+                {items.length === 0 ? (
+                  <div className="text-sm text-white/50 py-2">No recent events</div>
+                ) : (
+                  <ol className="space-y-1.5">
+                    {items.map((item, idx) => (
+                      <li key={item.key} className="flex items-center justify-between text-sm">
+                        <span className="truncate">
+                          <span className="text-white/30 mr-2">{idx + 1}.</span>
+                          {item.name || item.key}
+                        </span>
+                        <span className="text-white/60 tabular-nums" title={item.error ? `±${item.error}` : undefined}>
+                          {item.count.toLocaleString()}
+                        </span>
+                      </li>
+                    ))}
+                  </ol>
+                )}
+              </div>
+            );
+          })}
+        </div>
+      )}
+    </div>
+  );
+}
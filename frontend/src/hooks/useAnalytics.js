@@ -1,5 +1,5 @@
 import { useCallback } from "react";
-import { getUsageSummary, getFeatureUsage, getUserActivity } from "../services/analyticsService.js";
+import { getUsageSummary, getFeatureUsage, getUserActivity, getDashboard } from "../services/analyticsService.js";
 import { getAnomalies, getInsights, getChartData } from "../services/aiService.js";
 
 export function useAnalytics() {
@@ -9,6 +9,7 @@ export function useAnalytics() {
   const fetchAnomalies = useCallback(async () => getAnomalies(), []);
   const fetchInsights = useCallback(async () => getInsights(), []);
   const fetchChartData = useCallback(async () => getChartData(), []);
+  const fetchDashboard = useCallback(async (panels) => getDashboard(panels), []);
 
-  return { fetchSummary, fetchFeatureUsage, fetchUserActivity, fetchAnomalies, fetchInsights, fetchChartData };
+  return { fetchSummary, fetchFeatureUsage, fetchUserActivity, fetchAnomalies, fetchInsights, fetchChartData, fetchDashboard };
 }
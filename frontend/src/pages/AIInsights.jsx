@@ -6,9 +6,10 @@ import ZScoreDistributionChart from "../components/ZScoreDistributionChart.jsx";
 import ZScoreRadar from "../components/ZScoreRadar.jsx";
 import AnomalyScatter from "../components/AnomalyScatter.jsx";
 import MetricsComparison from "../components/MetricsComparison.jsx";
+import { subscribeUsageStream } from "../services/streamService.js";
 
 export default function AIInsights() {
-  const { fetchAnomalies, fetchInsights, fetchChartData } = useAnalytics();
+  const { fetchDashboard } = useAnalytics();
   const [anomalies, setAnomalies] = useState([]);
   const [insights, setInsights] = useState([]);
   const [chartData, setChartData] = useState(null);
@@ -17,19 +18,28 @@ export default function AIInsights() {
   const [loadingCharts, setLoadingCharts] = useState(true);
 
   useEffect(() => {
-    fetchAnomalies()
-      .then(setAnomalies)
+    fetchDashboard(["anomalies", "insights", "chart_data"])
+      .then((panels) => {
+        if (panels.anomalies) setAnomalies(panels.anomalies);
+        if (panels.insights) setInsights(panels.insights.insights || []);
+        if (panels.chart_data) setChartData(panels.chart_data);
+      })
       .catch(console.error)
-      .finally(() => setLoadingAnomalies(false));
-    fetchInsights()
-      .then((res) => setInsights(res.insights || []))
-      .catch(console.error)
-      .finally(() => setLoadingInsights(false));
-    fetchChartData()
-      .then(setChartData)
-      .catch(console.error)
-      .finally(() => setLoadingCharts(false));
-  }, [fetchAnomalies, fetchInsights, fetchChartData]);
+      .finally(() => {
+        setLoadingAnomalies(false);
+        setLoadingInsights(false);
+        setLoadingCharts(false);
+      });
+  }, [fetchDashboard]);
+
+  useEffect(
+    () =>
+      subscribeUsageStream({
+        onSnapshot: (snap) => setAnomalies(snap.anomalies),
+        onDelta: (delta) => delta.anomalies && setAnomalies(delta.anomalies),
+      }),
+    []
+  );
 
   return (
     <div className="grid gap-6">
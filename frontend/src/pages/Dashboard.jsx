@@ -2,6 +2,8 @@ import { useEffect, useState } from "react";
 import { useAnalytics } from "../hooks/useAnalytics.js";
 import UsageChart from "../components/UsageChart.jsx";
 import FeatureBarChart from "../components/FeatureBarChart.jsx";
+import TopList from "../components/TopList.jsx";
+import { subscribeUsageStream, mergeFeatureUsage } from "../services/streamService.js";
 
 const statConfig = [
   { key: "total_events", label: "Total Events", icon: "📈", format: (v) => v.toLocaleString() },
@@ -10,19 +12,37 @@ const statConfig = [
 ];
 
 export default function Dashboard() {
-  const { fetchSummary, fetchFeatureUsage } = useAnalytics();
+  const { fetchDashboard } = useAnalytics();
   const [summary, setSummary] = useState({ total_events: 0, active_users: 0, features_tracked: 0 });
   const [featureUsage, setFeatureUsage] = useState([]);
+  const [top, setTop] = useState(null);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
-    Promise.all([
-      fetchSummary().then(setSummary),
-      fetchFeatureUsage().then(setFeatureUsage),
-    ])
+    fetchDashboard(["summary", "feature_usage", "top"])
+      .then((panels) => {
+        if (panels.summary) setSummary(panels.summary);
+        if (panels.feature_usage) setFeatureUsage(panels.feature_usage);
+        if (panels.top) setTop(panels.top);
+      })
       .catch(console.error)
       .finally(() => setLoading(false));
-  }, [fetchSummary, fetchFeatureUsage]);
+  }, [fetchDashboard]);
+
+  useEffect(
+    () =>
+      subscribeUsageStream({
+        onSnapshot: (snap) => {
+          setSummary(snap.summary);
+          setFeatureUsage(snap.feature_usage);
+        },
+        onDelta: (delta) => {
+          if (delta.summary) setSummary(delta.summary);
+          if (delta.feature_usage) setFeatureUsage((rows) => mergeFeatureUsage(rows, delta.feature_usage));
+        },
+      }),
+    []
+  );
 
   const chartData = featureUsage.map((f) => ({
     label: f.feature_name || `Feature ${f.feature_id}`,
@@ -80,6 +100,9 @@ export default function Dashboard() {
           </>
         )}
       </div>
+
+      {/* Heavy hitters from the streaming top-K summaries */}
+      <TopList top={top} loading={loading} />
     </div>
   );
 }
@@ -10,6 +10,12 @@ export async function getFeatureUsage() {
   return res.data;
 }
 
+// Several panels in one round trip: summary, feature_usage, user_activity, top, anomalies, insights, chart_data
+export async function getDashboard(panels) {
+  const res = await api.get("/analytics/dashboard", { params: { panels: panels.join(",") } });
+  return res.data.panels;
+}
+
 export async function getUserActivity(days = 30) {
   const res = await api.get("/analytics/user-activity", { params: { days } });
   return res.data;
@@ -0,0 +1,49 @@
+import api from "./apiClient.js";
+
+const RECONNECT_MS = 5000;
+
+// Live updates from GET /analytics/stream (server-sent events). EventSource cannot send an
+// Authorization header, so each connection trades the token for a short-lived stream ticket and
+// only the ticket goes in the URL. EventSource retries dropped connections with the same URL; once
+// the ticket has expired that retry is refused and the source closes, so a fresh ticket is fetched.
+// Returns an unsubscribe function.
+export function subscribeUsageStream({ onSnapshot, onDelta }) {
+  if (!localStorage.getItem("token") || typeof EventSource === "undefined") return () => {};
+  let source = null;
+  let timer = null;
+  let closed = false;
+
+  const connect = async () => {
+    let ticket = null;
+    try {
+      ({ ticket } = (await api.post("/analytics/stream/ticket")).data);
+    } catch (err) {
+      console.error(err);
+    }
+    if (closed) return;
+    if (!ticket) {
+      timer = setTimeout(connect, RECONNECT_MS);
+      return;
+    }
+    source = new EventSource(`${api.defaults.baseURL}/analytics/stream?ticket=${encodeURIComponent(ticket)}`);
+    if (onSnapshot) source.addEventListener("snapshot", (e) => onSnapshot(JSON.parse(e.data)));
+    if (onDelta) source.addEventListener("delta", (e) => onDelta(JSON.parse(e.data)));
+    source.onerror = () => {
+      if (source.readyState === EventSource.CLOSED && !closed) timer = setTimeout(connect, RECONNECT_MS);
+    };
+  };
+
+  connect();
+  return () => {
+    closed = true;
+    clearTimeout(timer);
+    if (source) source.close();
+  };
+}
+
+// Deltas carry only the feature rows that changed
+export function mergeFeatureUsage(rows, changed) {
+  const byId = new Map(rows.map((row) => [row.feature_id, row]));
+  changed.forEach((row) => byId.set(row.feature_id, row));
+  return Array.from(byId.values());
+}